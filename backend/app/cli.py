@@ -0,0 +1,54 @@
+"""command line tools.
+
+    cd backend && python -m app.cli export 12 memento.npz
+    cd backend && python -m app.cli import memento.npz [--url https://github.com/o/r] [--force]
+"""
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.core.supabase import SupabaseManager
+from app.core.sqlite import SqliteManager
+from app.services.backends import create_storage_service, is_fake, is_sqlite
+from app.services.snapshot_service import export_snapshot, import_snapshot, SnapshotError
+import argparse
+import asyncio
+import json
+import sys
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write a repository snapshot")
+    export.add_argument("repo_id", type=int)
+    export.add_argument("path")
+
+    restore = commands.add_parser("import", help="restore a repository snapshot")
+    restore.add_argument("path")
+    restore.add_argument("--url", help="restore under this url instead of the one in the snapshot")
+    restore.add_argument("--force", action="store_true", help="accept embeddings from a different model")
+    return parser.parse_args()
+
+async def run(args) -> dict:
+    if not is_fake(settings.STORAGE_BACKEND) and not is_sqlite(settings.STORAGE_BACKEND):
+        await SupabaseManager.initialize_async_client()
+    try:
+        storage = create_storage_service()
+        if args.command == "export":
+            return await export_snapshot(storage, args.repo_id, args.path)
+        return await import_snapshot(storage, args.path, url=args.url, force=args.force)
+    finally:
+        await SupabaseManager.close_async_client()
+        SqliteManager.close()
+
+def main():
+    args = parse_args()
+    setup_logging()
+    try:
+        result = asyncio.run(run(args))
+    except SnapshotError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
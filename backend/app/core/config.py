@@ -13,21 +13,155 @@ class Settings(BaseSettings):
     PORT: int = 8000
 
     #supabase
-    SUPABASE_URL: str 
-    SUPABASE_KEY: str 
+    SUPABASE_URL: str = ""
+    SUPABASE_KEY: str = ""
+    SUPABASE_TIMEOUT: int = 30
+    #repository metadata cache, misses (404s) use the negative TTL
+    REPO_CACHE_ENABLED: bool = True
+    REPO_CACHE_TTL_SECONDS: float = 15.0
+    REPO_CACHE_NEGATIVE_TTL_SECONDS: float = 3.0
+    REPO_CACHE_MAX_ENTRIES: int = 10000
+    #invalidate other workers over the pub/sub channel
+    REPO_CACHE_PUBSUB: bool = True
+    #estimated repository count reused by list pages
+    REPO_COUNT_CACHE_SECONDS: int = 60
+    #deepest offset page served, deeper pages must follow next_cursor
+    REPO_LIST_MAX_PAGE: int = 100
+    #commit upserts, batches are cut by serialized size or row count
+    COMMIT_BATCH_MAX_BYTES: int = 512 * 1024
+    COMMIT_BATCH_MAX_ROWS: int = 500
+    COMMIT_UPSERT_CONCURRENCY: int = 4
+    #statistics counters are recounted from storage this often
+    STATS_RECONCILE_SECONDS: int = 300
+    #rolling window for data layer latency percentiles
+    DB_METRICS_WINDOW: int = 500
+    #also track response bytes per operation, costs a json.dumps per query on the event
+    #loop so it is for benchmarks only (benchmarks/projection_bytes.py turns it on)
+    DB_METRICS_BYTES: bool = False
+    #event loop lag monitor
+    LOOP_LAG_INTERVAL: float = 0.5
+    LOOP_LAG_WARN_MS: int = 100
 
     #github api's
     GITHUB_TOKEN:Optional[str] =None
     
-    GEMINI_API_KEY: str
+    GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-1.5-flash"
     MAX_TOKENS: int=1000
     TEMPERATURE: float =0.7
+    LLM_MAX_CONCURRENCY: int = 8
+    #LLM circuit breaker
+    CIRCUIT_WINDOW: int = 20
+    CIRCUIT_MIN_CALLS: int = 5
+    CIRCUIT_FAILURE_RATE: float = 0.5
+    CIRCUIT_SLOW_CALL_MS: int = 20000
+    CIRCUIT_RESET_SECONDS: int = 30
+    CIRCUIT_HALF_OPEN_PROBES: int = 1
+    #provider-side caching of repeated prompt prefixes (instructions + commit context)
+    PROMPT_CACHE_ENABLED: bool = True
+    PROMPT_CACHE_TTL_SECONDS: int = 600
+    PROMPT_CACHE_MAX_ENTRIES: int = 256
+    #prefix sightings before a cached content is created
+    PROMPT_CACHE_MIN_REUSE: int = 2
+    #gemini 1.5 rejects cached contents under 32k tokens
+    PROMPT_CACHE_MIN_TOKENS: int = 32768
+    #input budget for the commit context section of a prompt
+    CONTEXT_TOKEN_BUDGET: int = 2000
+    CONTEXT_MESSAGE_MAX_CHARS: int = 600
     
     #embedding model
     EMBEDDING_MODEL: str ="sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int=384
-    
+
+    #re-ranking (cross-encoder over the vector top-N)
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_TOP_N: int = 30
+    RERANK_BATCH_SIZE: int = 8
+    RERANK_BUDGET_MS: int = 250
+
+    #diversified retrieval (MMR), candidates fetched per requested commit
+    MMR_CANDIDATE_FACTOR: int = 3
+
+    #hierarchical repository summaries
+    SUMMARY_WINDOW_DAYS: int = 7
+    SUMMARY_REDUCE_FAN_IN: int = 4
+    SUMMARY_MAX_COMMITS: int = 5000
+    SUMMARY_CACHE_MAX_ENTRIES: int = 2000
+
+    #combined insights endpoint
+    INSIGHTS_CONCURRENCY: int = 6
+    INSIGHTS_PART_TIMEOUT: float = 30.0
+
+    #speculative precomputation (follow-ups after /analyze, summary after ingestion)
+    SPECULATIVE_ENABLED: bool = True
+    SPECULATIVE_MAX_PENDING: int = 100
+    SPECULATIVE_MAX_RESULTS: int = 500
+    SPECULATIVE_TTL_SECONDS: int = 1800
+    #active LLM calls above which speculative work is skipped
+    SPECULATIVE_LOAD_THRESHOLD: int = 4
+    SPECULATIVE_SUMMARY_DAYS: int = 30
+
+    #semantic answer cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_SIMILARITY: float = 0.95
+
+    #analysis history, written behind the request in batches
+    ANALYSIS_HISTORY_ENABLED: bool = True
+    ANALYSIS_HISTORY_BATCH_SIZE: int = 50
+    ANALYSIS_HISTORY_FLUSH_SECONDS: float = 2.0
+    ANALYSIS_HISTORY_MAX_PENDING: int = 10000
+
+    #ingestion jobs, a durable queue (its own SQLite file, whatever the storage backend)
+    JOB_QUEUE_PATH: str = "data/jobs.db"
+    JOB_WORKERS: int = 2
+    #idle workers re-check the queue this often, enqueues wake them immediately
+    JOB_POLL_SECONDS: float = 5.0
+    #running jobs get this long to finish on shutdown before being requeued
+    JOB_DRAIN_SECONDS: float = 30.0
+    #runs interrupted by a crash or restart before the job is marked failed
+    JOB_MAX_ATTEMPTS: int = 3
+
+    #per-repository processing lease, shared by every worker through the storage backend
+    REPO_LEASE_TTL_SECONDS: float = 60.0
+    #renewed this often while held, must be well under the TTL
+    REPO_LEASE_HEARTBEAT_SECONDS: float = 15.0
+
+    #ingestion progress events, snapshots go out at most this often within a stage
+    PROGRESS_MIN_INTERVAL_SECONDS: float = 0.5
+    #SSE keep-alive comment interval for idle progress streams
+    PROGRESS_HEARTBEAT_SECONDS: float = 15.0
+
+    #health probes
+    HEALTH_PROBE_INTERVAL: int = 30
+    HEALTH_PROBE_TIMEOUT: float = 10.0
+
+    #backends, "fake" swaps in deterministic in-process stand-ins for load testing
+    LLM_BACKEND: str = "gemini"
+    EMBEDDING_BACKEND: str = "sentence-transformers"
+    GITHUB_BACKEND: str = "github"
+    #supabase, sqlite (embedded, zero network) or fake
+    STORAGE_BACKEND: str = "supabase"
+    #sqlite backend, a file path (WAL needs a real file, not :memory:)
+    SQLITE_PATH: str = "data/memento.db"
+    SQLITE_READ_CONNECTIONS: int = 4
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_KB: int = 65536
+    #fake backend profile, latencies are lognormal medians
+    FAKE_SEED: int = 42
+    FAKE_LATENCY_SIGMA: float = 0.5
+    FAKE_ERROR_RATE: float = 0.0
+    FAKE_LLM_LATENCY_MS: int = 800
+    FAKE_EMBEDDING_LATENCY_MS: int = 5
+    FAKE_GITHUB_LATENCY_MS: int = 150
+    FAKE_STORAGE_LATENCY_MS: int = 10
+    FAKE_PAYLOAD_SIGMA: float = 0.4
+    FAKE_LLM_RESPONSE_CHARS: int = 800
+    FAKE_COMMIT_MESSAGE_CHARS: int = 120
+    FAKE_COMMITS_PER_REPO: int = 500
+
     #CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000"]
     
@@ -0,0 +1,113 @@
+from app.core.config import settings
+from app.core.supabase import SupabaseManager
+from app.core.logging import get_logger
+from app.core.sqlite import SqliteManager
+from app.services.backends import is_fake, is_sqlite
+from typing import Optional, Dict, Any, Callable
+from datetime import datetime, timezone
+import asyncio
+import time
+
+logger = get_logger(__name__)
+
+class HealthProber:
+    """refreshes dependency status in the background so /health only reads a cached snapshot"""
+
+    def __init__(self, ai_service=None, interval: Optional[float] = None):
+        self.ai_service = ai_service
+        self.interval = interval or settings.HEALTH_PROBE_INTERVAL
+        self.timeout = settings.HEALTH_PROBE_TIMEOUT
+        self._services: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._checked_at_iso: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    async def _run_probe(self, name: str, probe: Callable[[], bool]) -> bool:
+        #probes are blocking client calls, keep them off the event loop. a timed out
+        #call keeps its thread until the client gives up, so never stack a second one
+        pending = self._pending.get(name)
+        if pending is not None and not pending.done():
+            raise asyncio.TimeoutError()
+        loop = asyncio.get_event_loop()
+        self._pending[name] = loop.run_in_executor(None, probe)
+        return await asyncio.wait_for(asyncio.shield(self._pending[name]), timeout=self.timeout)
+
+    async def _probe_database(self) -> Dict[str, Any]:
+        if is_fake(settings.STORAGE_BACKEND):
+            return {"status": "connected", "type": "fake"}
+        if is_sqlite(settings.STORAGE_BACKEND):
+            try:
+                connected = await self._run_probe("database", SqliteManager.get_database().ping)
+                return {"status": "connected" if connected else "disconnected", "type": "SQLite"}
+            except Exception as e:
+                return {"status": "error", "error": str(e) or "probe timed out", "type": "SQLite"}
+        try:
+            connected = await asyncio.wait_for(SupabaseManager.ping(), timeout=self.timeout)
+            return {"status": "connected" if connected else "disconnected", "type": "Supabase"}
+        except Exception as e:
+            return {"status": "error", "error": str(e) or "probe timed out", "type": "Supabase"}
+
+    async def _probe_ai(self) -> Dict[str, Any]:
+        if self.ai_service is None:
+            return {"status": "error", "error": "AI service not initialized", "type": "Google Gemini"}
+        try:
+            connected = await self._run_probe("ai", self.ai_service.ping)
+            return {
+                "status": "connected" if connected else "disconnected",
+                "type": "Google Gemini",
+                "model": settings.GEMINI_MODEL
+            }
+        except Exception as e:
+            return {"status": "error", "error": str(e) or "probe timed out", "type": "Google Gemini"}
+
+    async def probe_once(self) -> Dict[str, Dict[str, Any]]:
+        database, ai = await asyncio.gather(self._probe_database(), self._probe_ai())
+        self._services = {"database": database, "ai": ai}
+        self._checked_at = time.monotonic()
+        self._checked_at_iso = datetime.now(timezone.utc).isoformat()
+        logger.debug("health probes refreshed", database=database["status"], ai=ai["status"])
+        return self._services
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe_once()
+            except Exception as e:
+                logger.error("health probe round failed", error=str(e))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        services = {name: dict(service) for name, service in self._services.items()}
+        statuses = [service["status"] for service in services.values()]
+
+        status = "healthy"
+        if not services:
+            status = "starting"
+        elif "error" in statuses:
+            status = "degraded"
+        elif "disconnected" in statuses:
+            status = "partial"
+
+        return {
+            "status": status,
+            "version": settings.VERSION,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "checked_at": self._checked_at_iso,
+            "probe_age_seconds": round(time.monotonic() - self._checked_at, 2) if self._checked_at else None,
+            "probe_interval_seconds": self.interval,
+            "services": services
+        }
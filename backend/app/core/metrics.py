@@ -0,0 +1,109 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from collections import deque
+from typing import Optional, Dict, Any
+import asyncio
+import json
+import time
+
+logger = get_logger(__name__)
+
+def percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def payload_bytes(data) -> int:
+    #size of a response body as it came over the wire, near enough
+    if not settings.DB_METRICS_BYTES or data is None:
+        return 0
+    return len(json.dumps(data, default=str))
+
+class DbMetrics:
+    """per-operation latency and response size of data layer calls over a rolling window"""
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = window or settings.DB_METRICS_WINDOW
+        self._ops: Dict[str, Dict[str, Any]] = {}
+        self.in_flight = 0
+
+    def record(self, op: str, elapsed_ms: float, error: bool = False, nbytes: int = 0):
+        stats = self._ops.get(op)
+        if stats is None:
+            stats = self._ops[op] = {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                     "bytes": 0, "recent": deque(maxlen=self.window)}
+        stats["calls"] += 1
+        stats["errors"] += int(error)
+        stats["bytes"] += nbytes
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["recent"].append(elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        ops = {}
+        for op, stats in sorted(self._ops.items()):
+            ops[op] = {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 2),
+                "p50_ms": round(percentile(stats["recent"], 0.5), 2),
+                "p95_ms": round(percentile(stats["recent"], 0.95), 2),
+                "max_ms": round(stats["max_ms"], 2),
+                "bytes": stats["bytes"],
+                "avg_bytes": round(stats["bytes"] / stats["calls"])
+            }
+        return {"in_flight": self.in_flight, "operations": ops}
+
+db_metrics = DbMetrics()
+
+class LoopLagMonitor:
+    """measures how late the event loop wakes a sleeping task.
+
+    any blocking call on the loop (sync I/O, heavy CPU) shows up as lag, so this is
+    the number to watch when checking that the data layer no longer blocks.
+    """
+
+    def __init__(self, interval: Optional[float] = None, warn_ms: Optional[float] = None):
+        self.interval = interval or settings.LOOP_LAG_INTERVAL
+        self.warn_ms = warn_ms or settings.LOOP_LAG_WARN_MS
+        self._samples: deque = deque(maxlen=settings.DB_METRICS_WINDOW)
+        self._max_ms = 0.0
+        self._blocked = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _loop(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - start - self.interval) * 1000)
+            self._samples.append(lag_ms)
+            self._max_ms = max(self._max_ms, lag_ms)
+            if lag_ms > self.warn_ms:
+                self._blocked += 1
+                logger.warning("event loop lag", lag_ms=round(lag_ms, 1))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "last_ms": round(self._samples[-1], 2) if self._samples else 0.0,
+            "p50_ms": round(percentile(self._samples, 0.5), 2),
+            "p95_ms": round(percentile(self._samples, 0.95), 2),
+            "max_ms": round(self._max_ms, 2),
+            "blocked_intervals": self._blocked,
+            "samples": len(self._samples)
+        }
+
+loop_monitor = LoopLagMonitor()
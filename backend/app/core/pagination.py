@@ -0,0 +1,18 @@
+from typing import Any, Tuple
+import base64
+import json
+
+def encode_cursor(*values: Any) -> str:
+    """opaque keyset cursor for the last row of a page, e.g. (created_at, id)"""
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int = 2) -> Tuple[Any, ...]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+    return tuple(values)
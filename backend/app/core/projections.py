@@ -0,0 +1,46 @@
+"""column profiles for data layer reads.
+
+reads take a projection instead of always selecting '*', so an endpoint only pulls
+the columns it actually returns:
+
+- existence: enough to tell the row exists and gate on it (status, answer cache version)
+- list_row: one row of a listing page
+- commit_card: what CommitResponse shows for a commit, no timestamps or embedding join
+- full: every column, for detail views and anything that writes the row back
+"""
+from typing import Dict, List, Optional
+
+EXISTENCE = "existence"
+LIST_ROW = "list_row"
+COMMIT_CARD = "commit_card"
+FULL = "full"
+
+PROJECTIONS: Dict[str, Dict[str, str]] = {
+    "repositories": {
+        #name and url are required by the Repo model, the counters and updated_at make up repo_version
+        EXISTENCE: "id, name, url, status, total_commits, indexed_commits, updated_at",
+        LIST_ROW: "id, name, description, url, language, owner, stars, forks, status, "
+                  "total_commits, indexed_commits, last_analyzed_at, created_at, updated_at",
+        FULL: "*"
+    },
+    "commits": {
+        #existence rows are not validated, only these columns are set on the Commit
+        EXISTENCE: "id, repository_id, sha, embedding_id",
+        COMMIT_CARD: "id, repository_id, sha, message, author, author_email, commit_date, "
+                     "additions, deletions, files_changed, embedding_id",
+        FULL: "*"
+    }
+}
+
+def select_columns(table: str, projection: str) -> str:
+    try:
+        return PROJECTIONS[table][projection]
+    except KeyError:
+        raise ValueError(f"unknown projection {projection!r} for {table}")
+
+def column_names(table: str, projection: str) -> Optional[List[str]]:
+    #None for '*'
+    columns = select_columns(table, projection)
+    if columns == "*":
+        return None
+    return [column.strip() for column in columns.split(",")]
@@ -0,0 +1,39 @@
+from app.core.logging import get_logger
+from typing import Callable, Dict, List, Any
+import os
+import uuid
+
+logger = get_logger(__name__)
+
+#identifies this worker process in published messages
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+class LocalPubSub:
+    """in-process stand-in for a cross-worker pub/sub channel (Redis, Postgres LISTEN/NOTIFY).
+
+    publishers tag messages with their worker id so subscribers can skip their own
+    messages, exactly as they would on a shared broker. delivery is synchronous and
+    a failing subscriber never affects the publisher or other subscribers.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self.published = 0
+
+    def subscribe(self, channel: str, callback: Callable[[Dict[str, Any]], None]):
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    def unsubscribe(self, channel: str, callback: Callable[[Dict[str, Any]], None]):
+        callbacks = self._subscribers.get(channel, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, channel: str, message: Dict[str, Any], origin: str = WORKER_ID):
+        self.published += 1
+        for callback in list(self._subscribers.get(channel, [])):
+            try:
+                callback({**message, "origin": origin})
+            except Exception as e:
+                logger.warning("pubsub subscriber failed", channel=channel, error=str(e))
+
+pubsub = LocalPubSub()
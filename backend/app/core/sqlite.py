@@ -0,0 +1,189 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Any
+import asyncio
+import os
+import sqlite3
+import threading
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repositories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT,
+    url TEXT NOT NULL UNIQUE,
+    language TEXT,
+    owner TEXT,
+    default_branch TEXT,
+    github_id INTEGER,
+    stars INTEGER NOT NULL DEFAULT 0,
+    forks INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    total_commits INTEGER NOT NULL DEFAULT 0,
+    indexed_commits INTEGER NOT NULL DEFAULT 0,
+    last_analyzed_at TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS repositories_created_at_idx ON repositories (created_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS commits (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repository_id INTEGER NOT NULL REFERENCES repositories (id) ON DELETE CASCADE,
+    sha TEXT NOT NULL,
+    message TEXT NOT NULL,
+    author TEXT NOT NULL,
+    author_email TEXT,
+    commit_date TEXT NOT NULL,
+    additions INTEGER NOT NULL DEFAULT 0,
+    deletions INTEGER NOT NULL DEFAULT 0,
+    files_changed TEXT NOT NULL DEFAULT '[]',
+    embedding_id TEXT,
+    embedding_created_at TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    UNIQUE (repository_id, sha)
+);
+CREATE INDEX IF NOT EXISTS commits_repo_date_idx ON commits (repository_id, commit_date);
+
+CREATE TABLE IF NOT EXISTS embeddings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    commit_id INTEGER NOT NULL UNIQUE REFERENCES commits (id) ON DELETE CASCADE,
+    embedding_vector BLOB NOT NULL,
+    model_name TEXT NOT NULL,
+    text_content TEXT NOT NULL,
+    embedding_type TEXT NOT NULL DEFAULT 'commit_message',
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repository_id INTEGER NOT NULL REFERENCES repositories (id) ON DELETE CASCADE,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    confidence_score REAL NOT NULL DEFAULT 0,
+    processing_time REAL NOT NULL DEFAULT 0,
+    relevant_commit_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_repo_idx ON analyses (repository_id, id DESC);
+
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    operation TEXT,
+    acquired_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+"""
+
+class SqliteDatabase:
+    """embedded SQLite store used by STORAGE_BACKEND=sqlite.
+
+    WAL mode lets readers run alongside the single writer, so reads go to a small
+    pool of threads with one connection each and every write goes through one
+    writer thread (SQLite serializes writers anyway). statements are parameterized
+    and reused from each connection's statement cache.
+    """
+
+    def __init__(self, path: Optional[str] = None, read_connections: Optional[int] = None,
+                 schema: str = SCHEMA, migrate: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.path = path or settings.SQLITE_PATH
+        self.read_connections = read_connections or settings.SQLITE_READ_CONNECTIONS
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-write")
+        self._readers = ThreadPoolExecutor(max_workers=self.read_connections, thread_name_prefix="sqlite-read")
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._local.connection = self._connect()
+        connection.executescript(schema)
+        if migrate is not None:
+            #columns added after a file was created, CREATE TABLE IF NOT EXISTS won't add them
+            migrate(connection)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=256)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        connection.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        connection.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_KB)}")
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        #one connection per pool thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return fn(self._connection())
+
+    def _write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(connection)
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._readers, self._read, fn)
+
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """runs `fn` in one transaction on the writer thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, self._write, fn)
+
+    def ping(self) -> bool:
+        try:
+            self._read(lambda connection: connection.execute("SELECT 1").fetchone())
+            return True
+        except Exception as e:
+            logger.error("SQLite connection test failed", error=str(e))
+            return False
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._connections_lock:
+            for connection in self._connections:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+
+class SqliteManager:
+    _database: Optional[SqliteDatabase] = None
+
+    @classmethod
+    def initialize(cls) -> SqliteDatabase:
+        if cls._database is None:
+            cls._database = SqliteDatabase()
+            logger.info("SQLite database initialized", path=cls._database.path)
+        return cls._database
+
+    @classmethod
+    def get_database(cls) -> SqliteDatabase:
+        #lazily opened so scripts and background tasks work without the app lifespan
+        return cls.initialize()
+
+    @classmethod
+    def close(cls):
+        if cls._database is not None:
+            cls._database.close()
+            cls._database = None
@@ -0,0 +1,13 @@
+from typing import Any
+import json
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    #stop nginx-style proxies from buffering the stream
+    "X-Accel-Buffering": "no"
+}
+
+def sse_event(event: str, data: Any) -> str:
+    """format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -1,4 +1,4 @@
-from supabase import create_client,Client
+from supabase import create_client,Client, acreate_client, AsyncClient, AsyncClientOptions
 from app.core.config import settings
 from typing import Optional
 from app.core.logging import get_logger
@@ -10,6 +10,7 @@ logger = get_logger(__name__)
 class SupabaseManager:
     _instance: Optional['SupabaseManager'] = None
     _client: Optional[Client] = None
+    _async_client: Optional[AsyncClient] = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -46,6 +47,45 @@ class SupabaseManager:
             raise Exception("Supabase client not initialized")
         return instance._client
 
+    @classmethod
+    async def initialize_async_client(cls) -> AsyncClient:
+        #one client per process, created in the app lifespan. its httpx pool is shared
+        #by every request, so queries never block the event loop
+        if cls._async_client is None:
+            if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+                raise ValueError("Supabase URL and key are required")
+            cls._async_client = await acreate_client(
+                settings.SUPABASE_URL,
+                settings.SUPABASE_KEY,
+                options=AsyncClientOptions(postgrest_client_timeout=settings.SUPABASE_TIMEOUT)
+            )
+            logger.info("Supabase async client initialized successfully")
+        return cls._async_client
+
+    @classmethod
+    def get_async_client(cls) -> AsyncClient:
+        if cls._async_client is None:
+            raise Exception("Supabase async client not initialized")
+        return cls._async_client
+
+    @classmethod
+    async def close_async_client(cls):
+        if cls._async_client is not None:
+            try:
+                await cls._async_client.postgrest.aclose()
+            except Exception as e:
+                logger.warning("error closing Supabase client", error=str(e))
+            cls._async_client = None
+
+    @classmethod
+    async def ping(cls) -> bool:
+        try:
+            await cls.get_async_client().table('repositories').select('id').limit(1).execute()
+            return True
+        except Exception as e:
+            logger.error("Supabase connection test failed", error=str(e))
+            return False
+
     @classmethod
     def test_connection(cls) -> bool:
         try:
@@ -64,6 +104,10 @@ def get_supabase() ->Client:
     """FastAPI dependency to get Supabase client"""
     return SupabaseManager.get_client()
 
+def get_async_supabase() -> AsyncClient:
+    """shared async client, created in the app lifespan"""
+    return SupabaseManager.get_async_client()
+
 
 class SupabaseHealthCheck:
     """Health check utilities for Supabase"""
@@ -72,9 +116,9 @@ class SupabaseHealthCheck:
     async def check_database_connection() -> dict:
         """Check database connection health"""
         try:
-            client = SupabaseManager.get_client()
+            client = SupabaseManager.get_async_client()
             start_time = asyncio.get_event_loop().time()
-            response = client.table('repositories').select('count').execute()
+            response = await client.table('repositories').select('id').limit(1).execute()
             end_time = asyncio.get_event_loop().time()
 
             response_time = (end_time - start_time) * 1000
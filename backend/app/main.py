@@ -1,30 +1,42 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.supabase import SupabaseManager, SupabaseHealthCheck, initialize_database
+from app.core.supabase import initialize_database, SupabaseManager
+from app.core.sqlite import SqliteManager
+from app.core.metrics import db_metrics, loop_monitor
 from app.core.logging import setup_logging, get_logger
+from app.core.health import HealthProber
+from app.services.backends import is_fake, is_sqlite
 from app.services.ai_services import AIService
-from app.routers import repositories, analysis
+from app.services.answer_cache import answer_cache
+from app.services.llm_executor import llm_executor
+from app.services.summary_service import summary_cache
+from app.services.speculative import speculative_queue
+from app.services.circuit_breaker import llm_breaker
+from app.services.prompt_cache import prefix_cache
+from app.services.repo_cache import repo_cache
+from app.services.stats_service import repo_stats
+from app.services.analysis_history import analysis_history
+from app.services.job_queue import job_queue
+from app.services.progress import progress_bus
+from app.services.repo_lock import repo_locks
+from app.routers import repositories, analysis, jobs
 from contextlib import asynccontextmanager
 import uvicorn
-from datetime import datetime, timezone
 
 setup_logging()
 logger=get_logger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    loop_monitor.start()
     try:
-        if SupabaseManager.test_connection():
-            logger.info("supabase connection established")
-
-        else:
-            logger.warning("supbabse connection test failed")
-    except Exception as e:
-        logger.error("supabase connection failed", error=str(e))
-        
-    try:
-        db_ready = await initialize_database()
+        db_ready = True
+        if is_sqlite(settings.STORAGE_BACKEND):
+            SqliteManager.initialize()
+        elif not is_fake(settings.STORAGE_BACKEND):
+            await SupabaseManager.initialize_async_client()
+            db_ready = await initialize_database()
         if db_ready:
             logger.info("db initialization completed")
         else:
@@ -32,16 +44,36 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("DB initialzation failed", error=str(e))
     
+    #one AIService (and GenerativeModel) per process, shared by every request
+    app.state.ai_service = None
     try:
-        ai_service=AIService()
-        if ai_service.test_connection():
-            logger.info("AI service connection started")
-        else:
-            logger.warning("AI service test failed")
+        app.state.ai_service = AIService()
     except Exception as e:
         logger.error("AI service initialization failed", error=str(e))
 
+    app.state.health_prober = HealthProber(app.state.ai_service)
+    services = await app.state.health_prober.probe_once()
+    logger.info("startup health probes completed", database=services["database"]["status"],
+                ai=services["ai"]["status"])
+    app.state.health_prober.start()
+    speculative_queue.start(app.state.ai_service)
+    repo_stats.start()
+    analysis_history.start()
+    await job_queue.start()
+
     yield
+
+    #running ingestion gets the drain window while everything it uses is still up
+    await job_queue.stop()
+    await speculative_queue.stop()
+    #before the storage clients close
+    await analysis_history.stop()
+    await repo_stats.stop()
+    await app.state.health_prober.stop()
+    llm_executor.shutdown()
+    await SupabaseManager.close_async_client()
+    SqliteManager.close()
+    await loop_monitor.stop()
         
 
 app=FastAPI(
@@ -70,52 +102,42 @@ app.include_router(
     tags=["analysis"]
 )
 
+app.include_router(
+    jobs.router,
+    prefix="/api/jobs",
+    tags=["jobs"]
+)
+
 @app.get("/")
 async def root():
     return {"message":settings.APP_NAME, "version":settings.VERSION ,"status":"runnning"}
 
 @app.get("/health")
 async def health_check():
-    health_check={
-        "status": "healthy",
-        "version": settings.VERSION,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "services": {}
+    #cached status from the background prober, never calls dependencies inline
+    health = app.state.health_prober.snapshot()
+    if "ai" in health["services"]:
+        health["services"]["ai"]["circuit"] = llm_breaker.state
+    return health
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "answer_cache": answer_cache.stats(),
+        "llm": llm_executor.stats(),
+        "summary_cache": summary_cache.stats(),
+        "speculative": speculative_queue.stats(),
+        "llm_circuit": llm_breaker.stats(),
+        "prompt_cache": prefix_cache.stats(),
+        "db": db_metrics.stats(),
+        "repo_cache": repo_cache.stats(),
+        "stats": repo_stats.stats(),
+        "analysis_history": analysis_history.stats(),
+        "jobs": job_queue.stats(),
+        "progress": progress_bus.stats(),
+        "repo_locks": repo_locks.stats(),
+        "event_loop": loop_monitor.stats()
     }
-    #supabase
-    try:
-        health_check["services"]["database"]={
-            "status":"connected" if SupabaseManager.test_connection() else "disconnected",
-            "types":"Supabase"
-            }
-    except Exception as e:
-        health_check["services"]["database"]={
-            "status": "error",
-            "error": str(e),
-            "type": "Supabase"
-        }
-    #ai service
-    try:
-        ai_service = AIService()
-        health_check["services"]["ai"] = {
-            "status": "connected" if ai_service.test_connection() else "disconnected",
-            "type": "Google Gemini",
-            "model":settings.GEMINI_MODEL
-        }
-    except Exception as e:
-        health_check["services"]["ai"] = {
-            "status":"error",
-            "error": str(e),
-            "type": "Google Gemini"
-        }
-    
-    service_statuses = [service["status"] for service in health_check["services"].values()]
-    if "error" in service_statuses:
-        health_check["status"] ="degraded"
-    elif "disconnected" in service_statuses:
-        health_check["status"] ="partial"
-    
-    return health_check
 
 @app.get("/api/info")
 async def api_info():
@@ -128,6 +150,7 @@ async def api_info():
         "supported_endpoints": {
             "repositories": "/api/repositories",
             "analysis": "/api/analysis",
+            "jobs": "/api/jobs",
             "health": "/health",
             "docs": "/docs" if settings.DEBUG else "disabled"
         }
@@ -31,4 +31,6 @@ class EmbeddingResult(BaseModel):
     author: str
     commit_date: datetime
     similarity_score: float
-    files_changed: List[str]
\ No newline at end of file
+    files_changed: List[str]
+    additions: int = 0
+    deletions: int = 0
\ No newline at end of file
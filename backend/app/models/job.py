@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+from enum import Enum
+
+class JobStatus(str, Enum):
+    QUEUED= "queued"
+    RUNNING= "running"
+    COMPLETED= "completed"
+    FAILED= "failed"
+    CANCELLED= "cancelled"
+
+class JobKind(str, Enum):
+    INGEST= "ingest"
+    REINDEX= "reindex"
+
+#lower runs first
+JOB_PRIORITY_HIGH = 0
+JOB_PRIORITY_NORMAL = 5
+JOB_PRIORITY_LOW = 10
+
+class Job(BaseModel):
+    """ingestion job model"""
+    id: int
+    kind: JobKind
+    repository_id: int
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    priority: int = JOB_PRIORITY_NORMAL
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    error: Optional[str] = None
+
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    #a deferred job is not claimed before this
+    run_after: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    class Config:
+        use_enum_values =True
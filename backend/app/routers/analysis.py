@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from supabase import Client
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Dict, Any
+from datetime import datetime, timezone
+import asyncio
+import time
 
-from app.core.supabase import get_supabase
 from app.core.logging import get_logger
+from app.core.sse import sse_event, SSE_HEADERS
+from app.core.projections import EXISTENCE
+from app.core.pagination import encode_cursor, decode_cursor
+from app.models.repo import Repo
+from app.models.embedding import EmbeddingResult
 from app.services.supabase_service import SupabaseService
 from app.services.embedding_service import EmbeddingService
 from app.services.ai_services import AIService
+from app.services.rerank_service import RerankService
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.answer_cache import answer_cache, repo_version
+from app.services.backends import create_storage_service
+from app.services.summary_service import SummaryService
+from app.services.analysis_history import analysis_history
+from app.services.speculative import (
+    speculative_queue, speculate_follow_ups, follow_up_key, summary_key
+)
+from app.core.config import settings
 from app.schemas.analysis import (
-    AnalysisRequest, AnalysisResponse, AnalysisHistory, AnalysisHistoryList
+    AnalysisRequest, AnalysisResponse, AnalysisHistory, AnalysisHistoryList, InsightsResponse,
+    FollowUpRequest, FollowUpResponse
 )
 
 
@@ -16,45 +34,99 @@ from app.schemas.analysis import (
 logger = get_logger(__name__)
 router=APIRouter()
 
-def get_supabaseService(client: Client= Depends(get_supabase))->SupabaseService:
-    return SupabaseService (client)
+def get_supabaseService()->SupabaseService:
+    return create_storage_service()
+
+def get_embeddingService(service: SupabaseService= Depends(get_supabaseService))->EmbeddingService:
+    return EmbeddingService(service)
+
+def get_aiService(request: Request)-> AIService:
+    #shared instance created in the app lifespan
+    ai_service = getattr(request.app.state, "ai_service", None)
+    if ai_service is None:
+        raise HTTPException(status_code=503, detail="AI service unavailable")
+    return ai_service
 
-def get_embeddingService(client: Client=Depends(get_supabase))->EmbeddingService:
-    return EmbeddingService(client)
+def get_rerankService()-> Optional[RerankService]:
+    return RerankService() if settings.RERANK_ENABLED else None
+
+NO_COMMITS_ANSWER = "I couldn't find any relevant commits to answer your question. This might be because:\n\n1. The repository hasn't been fully indexed yet\n2. Your question doesn't match the available commit history\n3. The similarity threshold is too high\n\nTry rephrasing your question or check if the repository indexing is complete."
+
+async def get_ready_repo(supabase_Service: SupabaseService, repo_id: int) -> Repo:
+    repository = await supabase_Service.get_repo(repo_id, projection=EXISTENCE)
+    if not repository:
+        raise HTTPException(status_code=404, detail=" repository not found")
+    if repository.status != "completed":
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Repository is not ready for analysis. Status: {repository.status}"
+        )
+    return repository
 
-def get_aiService()-> AIService:
-    return AIService()
+def cache_variant(request: AnalysisRequest, rerank_service: Optional[RerankService]) -> tuple:
+    return (request.max_commits or 10, request.similarity_t, request.diversity, rerank_service is not None)
+
+async def question_embedding_for(request: AnalysisRequest, embedding_service: EmbeddingService):
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    return (await embedding_service.create_embeddings([request.questions]))[0]
+
+async def retrieve_commits(
+    request: AnalysisRequest,
+    embedding_service: EmbeddingService,
+    rerank_service: Optional[RerankService],
+    question_embedding=None
+) -> List[EmbeddingResult]:
+    #search for similar commits, over-fetching when a re-rank stage narrows them down
+    limit = request.max_commits or 10
+    similar_commits = await embedding_service.similar_commits(
+        query=request.questions,
+        repo_id=request.repository_id,
+        limit=max(limit, settings.RERANK_TOP_N) if rerank_service else limit,
+        threshold=request.similarity_t or 0.7,
+        diversity=request.diversity or 0.0,
+        query_embedding=question_embedding
+    )
+    if rerank_service and similar_commits:
+        similar_commits = await rerank_service.rerank(request.questions, similar_commits, limit)
+    return similar_commits
 
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_repo(
     request: AnalysisRequest,
     supabase_Service: SupabaseService= Depends(get_supabaseService),
     embedding_service: EmbeddingService= Depends(get_embeddingService),
-    ai_Service: AIService= Depends(get_aiService)
+    ai_Service: AIService= Depends(get_aiService),
+    rerank_service: Optional[RerankService]= Depends(get_rerankService)
 ):
     #anlaysis based on question
     try:
         logger.info("starting analysis", repo_id=request.repository_id, question_length=len(request.questions))
-        repository = await supabase_Service.get_repo(request.repository_id)
-        if not repository:
-            raise HTTPException(status_code=404, detail=" repository not found")
-        if repository.status != "completed":
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Repository is not ready for analysis. Status: {repository.status}"
-            )
-        #search for similar commits
-        similar_commits = await embedding_service.similar_commits(
-            query=request.questions,
-            repo_id=request.repository_id,
-            limit=request.max_commits or 10,
-            threshold=request.similarity_t or 0.7
-        )
+        repository = await get_ready_repo(supabase_Service, request.repository_id)
+
+        #semantic answer cache, scoped to the repository's current commit set
+        start_time = time.time()
+        version = repo_version(repository)
+        variant = cache_variant(request, rerank_service)
+        question_embedding = await question_embedding_for(request, embedding_service)
+        if question_embedding is not None:
+            cached = answer_cache.lookup(request.repository_id, version, variant, question_embedding)
+            if cached:
+                logger.info("Analysis served from cache", repo_id=request.repository_id)
+                cached_response = cached.model_copy(update={
+                    "question": request.questions,
+                    "processing_time": time.time() - start_time,
+                    "cached": True
+                })
+                store_analysis_session(cached_response)
+                return cached_response
+
+        similar_commits = await retrieve_commits(request, embedding_service, rerank_service, question_embedding)
         if not similar_commits:
             logger.warning("No similar commits found", repo_id=request.repository_id)
             return AnalysisResponse(
                 question=request.questions,
-                answer="I couldn't find any relevant commits to answer your question. This might be because:\n\n1. The repository hasn't been fully indexed yet\n2. Your question doesn't match the available commit history\n3. The similarity threshold is too high\n\nTry rephrasing your question or check if the repository indexing is complete.",
+                answer=NO_COMMITS_ANSWER,
                 relevant_commits=[],
                 confidence_score=0.0,
                 processing_time=0.0,
@@ -65,14 +137,14 @@ async def analyze_repo(
             relevant_commits=similar_commits,
             repo_id=request.repository_id
         )
+        if analysis_response.confidence_score > 0 and not analysis_response.degraded:
+            if question_embedding is not None:
+                answer_cache.store(request.repository_id, version, variant,
+                                   question_embedding, analysis_response)
+            speculate_follow_ups(ai_Service, request.repository_id, version, request.questions,
+                                 analysis_response.answer, len(analysis_response.relevant_commits))
         
-        try:
-            await store_analysis_session(
-                supabase_Service,
-                analysis_response
-            )
-        except Exception as e:
-            logger.warning("failed to store analysis session", error=str(e))
+        store_analysis_session(analysis_response)
         
         logger.info("Analysis completed", repo_id=request.repository_id, 
                    confidence=analysis_response.confidence_score)
@@ -85,26 +157,269 @@ async def analyze_repo(
         logger.error("Error in analysis", repo_id=request.repository_id, error=str(e))
         raise HTTPException(status_code=500, detail="analysis failed")
 
+@router.post("/analyze/stream")
+async def analyze_repo_stream(
+    request: AnalysisRequest,
+    supabase_Service: SupabaseService= Depends(get_supabaseService),
+    embedding_service: EmbeddingService= Depends(get_embeddingService),
+    ai_Service: AIService= Depends(get_aiService),
+    rerank_service: Optional[RerankService]= Depends(get_rerankService)
+):
+    """server-sent events: `commits` first, then `token` chunks, then `done` (or `error`)"""
+    logger.info("starting streamed analysis", repo_id=request.repository_id, question_length=len(request.questions))
+    #validation errors still surface as plain HTTP errors before the stream opens
+    repository = await get_ready_repo(supabase_Service, request.repository_id)
+
+    async def events():
+        start_time = time.time()
+        try:
+            version = repo_version(repository)
+            variant = cache_variant(request, rerank_service)
+            question_embedding = await question_embedding_for(request, embedding_service)
+            if question_embedding is not None:
+                cached = answer_cache.lookup(request.repository_id, version, variant, question_embedding)
+                if cached:
+                    yield sse_event("commits", [ref.model_dump() for ref in cached.relevant_commits])
+                    yield sse_event("token", {"text": cached.answer})
+                    yield sse_event("done", {
+                        "confidence_score": cached.confidence_score,
+                        "processing_time": time.time() - start_time,
+                        "cached": True
+                    })
+                    return
+
+            similar_commits = await retrieve_commits(request, embedding_service, rerank_service, question_embedding)
+            #only the commits that fit the context budget are cited and scored
+            context, packed = ai_Service.commit_context(similar_commits)
+            commit_refs = ai_Service.commit_refs(packed)
+            yield sse_event("commits", [ref.model_dump() for ref in commit_refs])
+
+            if not similar_commits:
+                yield sse_event("token", {"text": NO_COMMITS_ANSWER})
+                yield sse_event("done", {
+                    "confidence_score": 0.0,
+                    "processing_time": time.time() - start_time,
+                    "cached": False
+                })
+                return
+
+            prompt = ai_Service.analysisP(request.questions, context, request.repository_id)
+            chunks = []
+            try:
+                async for text in ai_Service.generate_stream(prompt):
+                    chunks.append(text)
+                    yield sse_event("token", {"text": text})
+            except CircuitOpenError:
+                if chunks:
+                    raise
+                degraded = ai_Service.degraded_analysis(request.questions, similar_commits,
+                                                        request.repository_id, start_time)
+                yield sse_event("token", {"text": degraded.answer})
+                yield sse_event("done", {
+                    "confidence_score": degraded.confidence_score,
+                    "processing_time": degraded.processing_time,
+                    "cached": False,
+                    "degraded": True
+                })
+                return
+
+            answer = "".join(chunks).strip()
+            analysis_response = AnalysisResponse(
+                question=request.questions,
+                answer=answer,
+                relevant_commits=commit_refs,
+                confidence_score=ai_Service.calculate_confidence(packed, answer),
+                processing_time=time.time() - start_time,
+                repository_id=request.repository_id
+            )
+            yield sse_event("done", {
+                "confidence_score": analysis_response.confidence_score,
+                "processing_time": analysis_response.processing_time,
+                "cached": False
+            })
+
+            if analysis_response.confidence_score > 0:
+                if question_embedding is not None:
+                    answer_cache.store(request.repository_id, version, variant,
+                                       question_embedding, analysis_response)
+                speculate_follow_ups(ai_Service, request.repository_id, version, request.questions,
+                                     answer, len(packed))
+            store_analysis_session(analysis_response)
+
+            logger.info("Streamed analysis completed", repo_id=request.repository_id,
+                        processing_time=analysis_response.processing_time)
+
+        except Exception as e:
+            logger.error("Error in streamed analysis", repo_id=request.repository_id, error=str(e))
+            yield sse_event("error", {"detail": "analysis failed"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/follow-ups", response_model=FollowUpResponse)
+async def follow_up_questions(
+    request: FollowUpRequest,
+    supabase_Service: SupabaseService= Depends(get_supabaseService),
+    ai_Service: AIService= Depends(get_aiService)
+):
+    try:
+        repository = await supabase_Service.get_repo(request.repository_id, projection=EXISTENCE)
+        if not repository:
+            raise HTTPException(status_code=404, detail="Repository not found")
+
+        #usually precomputed right after the /analyze call that produced the answer
+        questions = speculative_queue.get(
+            follow_up_key(request.repository_id, repo_version(repository), request.question)
+        )
+        precomputed = questions is not None
+        if not precomputed:
+            response = await ai_Service.generate_retry(
+                ai_Service.followupP(request.question, request.answer, request.commit_count)
+            )
+            questions = ai_Service.parse_questions(response)
+
+        logger.info("follow-up questions served", repo_id=request.repository_id, precomputed=precomputed)
+        return FollowUpResponse(
+            repository_id=request.repository_id,
+            question=request.question,
+            follow_up_questions=questions,
+            precomputed=precomputed
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error generating follow-up questions", repo_id=request.repository_id, error=str(e))
+        raise HTTPException(status_code=500, detail="failed to generate follow-up questions")
+
+#shared across requests so concurrent insights calls cannot flood the LLM pool
+insights_semaphore = asyncio.Semaphore(settings.INSIGHTS_CONCURRENCY)
+
+async def run_insight_part(name: str, make_part) -> Any:
+    async with insights_semaphore:
+        #the timeout covers the generation only, time queued behind other requests is not charged to the part
+        return await asyncio.wait_for(make_part(), timeout=settings.INSIGHTS_PART_TIMEOUT)
+
+@router.post("/insights", response_model=InsightsResponse)
+async def repo_insights(
+    request: AnalysisRequest,
+    supabase_Service: SupabaseService= Depends(get_supabaseService),
+    embedding_service: EmbeddingService= Depends(get_embeddingService),
+    ai_Service: AIService= Depends(get_aiService),
+    rerank_service: Optional[RerankService]= Depends(get_rerankService)
+):
+    """summary, quality analysis and follow-up questions over one retrieval, generated concurrently"""
+    start_time = time.time()
+    try:
+        await get_ready_repo(supabase_Service, request.repository_id)
+        similar_commits = await retrieve_commits(request, embedding_service, rerank_service)
+        if not similar_commits:
+            return InsightsResponse(
+                question=request.questions,
+                repository_id=request.repository_id,
+                relevant_commits=[],
+                errors={"retrieval": "no relevant commits found"},
+                partial=True,
+                processing_time=time.time() - start_time
+            )
+
+        #packed once, every prompt below shares the same cacheable prefix
+        context, packed = ai_Service.commit_context(similar_commits)
+        parts = {
+            "summary": lambda: ai_Service.generate_retry(ai_Service.summaryP(context)),
+            "quality": lambda: ai_Service.generate_retry(ai_Service.qualityP(context)),
+            "follow_up_questions": lambda: ai_Service.generate_retry(
+                ai_Service.context_followupP(request.questions, context)
+            )
+        }
+        results = await asyncio.gather(
+            *[run_insight_part(name, part) for name, part in parts.items()],
+            return_exceptions=True
+        )
+
+        payload: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for name, result in zip(parts, results):
+            if isinstance(result, asyncio.TimeoutError):
+                errors[name] = f"timed out after {settings.INSIGHTS_PART_TIMEOUT}s"
+            elif isinstance(result, Exception):
+                errors[name] = str(result)
+            else:
+                payload[name] = result
+        if errors:
+            logger.warning("insights returned partial results", repo_id=request.repository_id,
+                           failed=list(errors))
+
+        quality = None
+        if "quality" in payload:
+            quality = {
+                "analysis": payload["quality"],
+                "commit_count": len(packed),
+                "generated_at": datetime.now(timezone.utc).isoformat()
+            }
+        follow_ups = None
+        if "follow_up_questions" in payload:
+            follow_ups = ai_Service.parse_questions(payload["follow_up_questions"])
+
+        processing_time = time.time() - start_time
+        logger.info("Insights completed", repo_id=request.repository_id, processing_time=processing_time)
+        return InsightsResponse(
+            question=request.questions,
+            repository_id=request.repository_id,
+            relevant_commits=ai_Service.commit_refs(packed),
+            summary=payload.get("summary"),
+            quality=quality,
+            follow_up_questions=follow_ups,
+            errors=errors,
+            partial=bool(errors),
+            processing_time=processing_time
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error generating insights", repo_id=request.repository_id, error=str(e))
+        raise HTTPException(status_code=500, detail="insights failed")
+
 @router.get("/repository/{repo_id}/history",response_model=AnalysisHistoryList)
 async def get_analysis_history(
     repo_id: int,
-    page: int = Query(1, ge=1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    page: int = Query(1, ge=1, description="Page number, counted along the cursor chain"),
     per_page: int = Query(20, ge=1, le=50, description="Items per page"),
     supabase_service: SupabaseService = Depends(get_supabaseService)
 
 ):
     try:
-        repository= await supabase_service.get_repo(repo_id)
+        before_id = None
+        if cursor:
+            try:
+                before_id = int(decode_cursor(cursor, size=1)[0])
+            except (ValueError, TypeError):
+                raise HTTPException(status_code=400, detail="invalid cursor")
+
+        repository= await supabase_service.get_repo(repo_id, projection=EXISTENCE)
         if not repository:
             raise HTTPException(status_code=404,detail="repo not found")
-        logger.info("retrieved analysis history",repo_id=repo_id)
+
+        #read-your-writes for analyses still sitting in the write-behind buffer
+        if analysis_history.pending_for(repo_id):
+            await analysis_history.flush(supabase_service)
+
+        #keyset page newest first, one extra row tells us whether another page exists
+        rows = await supabase_service.get_analyses(repo_id, per_page + 1, before_id)
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        total = await supabase_service.count_analyses(repo_id)
+        next_cursor = encode_cursor(rows[-1]["id"]) if has_next and rows else None
+        logger.info("retrieved analysis history",repo_id=repo_id, count=len(rows))
     
         return AnalysisHistoryList(
-            analyses=[],
-            total=0,
+            analyses=[AnalysisHistory(**row) for row in rows],
+            total=total,
             page=page,
             per_page=per_page,
-            has_next=False
+            has_next=has_next,
+            next_cursor=next_cursor
         )
     except HTTPException:
         raise
@@ -115,47 +430,37 @@ async def get_analysis_history(
 @router.get("/repository/{repo_id}/summary")
 async def get_repo_summary(
     repo_id:int,
-    days: int=Query(30, ge=1, le=365, description="days to include in summary"),
+    days: int=Query(30, ge=1, le=3650, description="days to include in summary"),
     supabase_service: SupabaseService = Depends(get_supabaseService),
-    embedding_service: EmbeddingService = Depends(get_embeddingService),
     ai_service: AIService = Depends(get_aiService)
 ):
     try:
-        repository =await supabase_service.get_repo(repo_id)
+        repository =await supabase_service.get_repo(repo_id, projection=EXISTENCE)
         if not repository:
             raise HTTPException(status_code=404,detail="Repository not found")
     
-        commits =await supabase_service.get_commits(repo_id, limit=50)
-        
-        if not commits:
+        result = None
+        if days == settings.SPECULATIVE_SUMMARY_DAYS:
+            result = speculative_queue.get(summary_key(repo_id, days))
+        if result is None:
+            result = await SummaryService(supabase_service, ai_service).summarize(repo_id, days)
+        if not result["commit_count"]:
             return {
                 "repository_id": repo_id,
                 "summary": "No commits found in this repository.",
                 "period_days": days,
                 "commit_count": 0
             }
-        
-        #commit to embeddings
-        embedding_results = []
-        for commit in commits[:20]:  
-            embedding_results.append(type('EmbeddingSearchResult', (), {
-                'sha': commit.sha,
-                'message': commit.message,
-                'author': commit.author,
-                'commit_date': commit.commit_date,
-                'similarity_score': 1.0,
-                'files_changed': commit.files_changed
-            })())
-
-        summary=await ai_service.commit_summar(embedding_results)
         logger.info("repository summary generated", repo_id=repo_id)
 
         return{
             "repository_id": repo_id,
-            "summary":summary,
-            "period_days":days,
-            "commit_count": len(commit)
-
+            "summary": result["summary"],
+            "period_days": days,
+            "commit_count": result["commit_count"],
+            "window_count": result["window_count"],
+            "llm_calls": result["llm_calls"],
+            "cached_parts": result["cached_parts"]
         }
     except HTTPException:
         raise
@@ -169,12 +474,13 @@ async def search_commit(
     query: str = Query(..., min_length=1, description="search query"),
     limit: int = Query(10, ge=1, le=50, description="Number of results"),
     threshold: float = Query(0.7, ge=0.0, le=1.0, description="Similarity threshold"),
+    diversity: float = Query(0.0, ge=0.0, le=1.0, description="MMR diversity, 0 disables"),
     supabase_service: SupabaseService = Depends(get_supabaseService),
     embedding_service: EmbeddingService = Depends(get_embeddingService)
 ):
 
     try:
-        repository = await supabase_service.get_repo(repo_id)
+        repository = await supabase_service.get_repo(repo_id, projection=EXISTENCE)
         if not repository:
             raise HTTPException(status_code=404,detail="Repository not found")
         
@@ -182,7 +488,8 @@ async def search_commit(
             query=query,
             repo_id=repo_id,
             limit=limit,
-            threshold=threshold
+            threshold=threshold,
+            diversity=diversity
         )
         results = []
         for commit in similar_commits:
@@ -211,10 +518,10 @@ async def search_commit(
         logger.error("Error searching commits", repo_id=repo_id, error=str(e))
         raise HTTPException(status_code=500, detail="Search failed")
 
-async def store_analysis_session(supabase_serice: SupabaseService, analysis: AnalysisResponse)-> None:
+def store_analysis_session(analysis: AnalysisResponse)-> None:
+    #queued for the write-behind buffer, never blocks or fails the request
     try:
-        logger.debug(" Analysis session stored", repo_id=analysis.repository_id)
-        pass
+        if analysis_history.add(analysis):
+            logger.debug("Analysis session queued", repo_id=analysis.repository_id)
     except Exception as e:
-        logger.error("failed to store analysis session", error=str(e))
-        raise
\ No newline at end of file
+        logger.warning("failed to store analysis session", error=str(e))
\ No newline at end of file
@@ -0,0 +1,50 @@
+from app.core.logging import get_logger
+from app.models.job import JobStatus
+from app.services.job_queue import job_queue
+from app.schemas.job import JobResponse, JobList
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+@router.get("/", response_model=JobList)
+async def list_jobs(
+    repository_id: Optional[int] = Query(None),
+    status: Optional[JobStatus] = Query(None),
+    limit: int = Query(50, ge=1, le=500)
+):
+    try:
+        jobs = await job_queue.list_jobs(repository_id, status.value if status else None, limit)
+        return JobList(jobs=[JobResponse(**job.model_dump()) for job in jobs])
+    except Exception as e:
+        logger.error("error listing jobs", error=str(e))
+        raise HTTPException(status_code=500, detail="internal server error")
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int):
+    try:
+        job = await job_queue.get(job_id)
+    except Exception as e:
+        logger.error("error fetching job", job_id=job_id, error=str(e))
+        raise HTTPException(status_code=500, detail="internal server error")
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return JobResponse(**job.model_dump())
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: int):
+    try:
+        job = await job_queue.cancel(job_id)
+    except Exception as e:
+        logger.error("error cancelling job", job_id=job_id, error=str(e))
+        raise HTTPException(status_code=500, detail="internal server error")
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+        raise HTTPException(status_code=409, detail=f"job already {job.status}")
+    if job.status == JobStatus.RUNNING:
+        #claimed by another process (only that one can stop it) or still unwinding
+        raise HTTPException(status_code=409, detail="job is still running")
+    logger.info("job cancel requested", job_id=job_id, status=job.status)
+    return JobResponse(**job.model_dump())
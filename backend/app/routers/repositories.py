@@ -1,35 +1,49 @@
-from app.core.supabase import get_supabase
-from supabase import Client
+from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.sse import sse_event, SSE_HEADERS
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.projections import EXISTENCE
 from app.services.supabase_service import SupabaseService
 from app.services.github_service import Github_service
 from app.services.embedding_service import EmbeddingService, EmbeddingResult, Embeddings
+from app.services.answer_cache import answer_cache
+from app.services.backends import create_storage_service, create_github_service
+from app.services.speculative import speculate_summary
+from app.services.stats_service import repo_stats
+from app.services.snapshot_service import export_snapshot, import_snapshot, SnapshotError
+from app.services.job_queue import job_queue, JobSuperseded, JobRetry
+from app.services.repo_lock import repo_locks, LeaseHeld
+from app.services.progress import progress_bus, TERMINAL_STAGES
 from app.schemas.repo import (
-    RepoCreate, RepoResponse, RepoList, RepoStats
+    RepoCreate, RepoResponse, RepoList, RepoStats, GlobalStats
 )
 from app.schemas.commit import CommitResponse, CommitList
 from app.models.repo import RepoStatus, Repo
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from app.models.job import JobKind, JobStatus, JOB_PRIORITY_HIGH, JOB_PRIORITY_NORMAL, JOB_PRIORITY_LOW
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from typing import Optional, List
 from datetime import datetime,timezone
 import asyncio
+import os
+import tempfile
 
 logger = get_logger(__name__)
 router = APIRouter()
 
-def get_supabaseService(client:Client =Depends(get_supabase))->SupabaseService:
-    return SupabaseService(client)
+def get_supabaseService()->SupabaseService:
+    return create_storage_service()
 
 def get_githubService()->Github_service:
-    return Github_service()
+    return create_github_service()
 
-def get_embeddingService(client: Client=Depends(get_supabase))->EmbeddingService:
-    return EmbeddingService(client)
+def get_embeddingService(service: SupabaseService=Depends(get_supabaseService))->EmbeddingService:
+    return EmbeddingService(service)
 
 @router.post("/", response_model=RepoResponse)
 async def create_repository(
     repo_data: RepoCreate,
-    background_tasks: BackgroundTasks,
     supabase_service: SupabaseService = Depends(get_supabaseService),
     github_service: Github_service = Depends(get_githubService)
 
@@ -69,12 +83,11 @@ async def create_repository(
             "status": RepoStatus.PENDING.value
         })
         logger.info("repositor record created",repo_id=repo_record.id)
-        background_tasks.add_task(
-            process_repoCommits,
-            repo_record.id,
-            str(repo_data.url),
-            repo_data.max_commits or 100
-        )
+        #someone is waiting on a fresh repository, ahead of reindexes
+        await job_queue.enqueue(JobKind.INGEST.value, repo_record.id, {
+            "repo_url": str(repo_data.url),
+            "max_commits": repo_data.max_commits or 100
+        }, priority=JOB_PRIORITY_HIGH)
         
         logger.info("Repository created successfully", repo_id=repo_record.id)
         return RepoResponse(**repo_record.model_dump())
@@ -93,30 +106,34 @@ def is_valid_github_url(url:str)-> bool:
 
 @router.get("/", response_model=RepoList)
 async def list_repositories(
-    page: int =Query(1, ge=1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    page: int =Query(1, ge=1, le=settings.REPO_LIST_MAX_PAGE, description="Page number (offset paging, prefer cursor)"),
     per_page:int = Query(20, ge=1, le=100, description="Items per page"),
     service:SupabaseService = Depends(get_supabaseService)
 ):
     try:
-        offset =(page-1) * per_page
-        all_repositories=await service.list_repo()
-        total =len(all_repositories)
-        start_idx= offset
-        end_idx =offset + per_page
-        repositories= all_repositories[start_idx:end_idx]
-        
-        has_next = end_idx < total
-        
-        logger.info("listed repositories",page=page, count=len(repositories))
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="invalid cursor")
 
-        
+        #one extra row tells us whether another page exists
+        if after or page == 1:
+            repositories = await service.list_repo_page(per_page + 1, after)
+        else:
+            repositories = await service.list_repo(limit=per_page + 1, offset=(page - 1) * per_page)
         has_next = len(repositories) > per_page
-        if has_next:
-            repositories = repositories[:-1] 
-        
-        total=offset + len(repositories) + (1 if has_next else 0)
+        repositories = repositories[:per_page]
+        total = await service.count_repos()
+
+        next_cursor = None
+        if has_next and repositories:
+            last = repositories[-1]
+            next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
         
-        logger.info("Listed repositories", page=page, count=len(repositories))
+        logger.info("Listed repositories", page=page, count=len(repositories), cursor=bool(cursor))
         
         repo_responses = []
         for repo in repositories:
@@ -136,12 +153,27 @@ async def list_repositories(
             total=total,
             page=page,
             per_page=per_page,
-            has_next=has_next
+            has_next=has_next,
+            next_cursor=next_cursor
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("error listing repo", error=str(e))
         raise HTTPException(status_code=500, detail="internal server error")
     
+@router.get("/stats", response_model=GlobalStats)
+async def get_globalStats(
+    service: SupabaseService=Depends(get_supabaseService)
+):
+    #declared before /{repo_id} so "stats" is not parsed as a repo id
+    try:
+        stats = await repo_stats.global_stats(service)
+        return GlobalStats(last_updated=datetime.now(timezone.utc), **stats)
+    except Exception as e:
+        logger.error("Error fetching global stats", error=str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/{repo_id}",response_model=RepoResponse)
 async def get_repo(
     repo_id: int,
@@ -163,24 +195,22 @@ async def get_repo(
 @router.get("/{repo_id}/stats", response_model=RepoStats)
 async def get_repoStats(
     repo_id:int,
-    service: SupabaseService=Depends(get_supabaseService),
-    embedding_service: EmbeddingService=Depends(get_embeddingService)
+    service: SupabaseService=Depends(get_supabaseService)
 ):
-    #get repo statistics
+    #get repo statistics, served from incrementally maintained counters
     try:
-        repository=await service.get_repo(repo_id)
+        repository=await service.get_repo(repo_id, projection=EXISTENCE)
         if not repository:
             raise HTTPException(status_code=404, detail="Repository not found")
         
-        stats = await embedding_service.get_embedding_stats(repo_id)
+        stats = await repo_stats.repo_stats(service, repo_id)
         
         logger.info("repository stats retrieved", repo_id=repo_id)
         return RepoStats(
             repository_id=repo_id,
-            total_commits=stats.get("total_commits", 0),
-            recent_commits=0,  #  need separate query
-            embedding_progress=stats.get("embedding_progress", 0.0),
-            last_updated=datetime.now(timezone.utc)
+            recent_commits=stats["commits_7d"],
+            last_updated=datetime.now(timezone.utc),
+            **stats
         )
         
     except HTTPException:
@@ -199,7 +229,7 @@ async def get_commits(
 ):
     #get commits of repo
     try:
-        repository = await service.get_repo(repo_id)
+        repository = await service.get_repo(repo_id, projection=EXISTENCE)
         if not repository:
             raise HTTPException(status_code=404, detail="Repository not found")
         
@@ -245,22 +275,20 @@ async def get_commits(
 @router.post("/{repo_id}/reindex")
 async def reindex_repo(
     repo_id: int,
-    background_tasks: BackgroundTasks,
-    service: SupabaseService=Depends(get_supabaseService),
-    embedding_service: EmbeddingService=Depends(get_embeddingService)
+    service: SupabaseService=Depends(get_supabaseService)
 
 ):
     try:
-        repository= await service.get_repo(repo_id)
+        repository= await service.get_repo(repo_id, projection=EXISTENCE)
         if not repository:
             raise HTTPException(status_code=404, detail="repository not found")
-        background_tasks.add_task(
-            reindex_repoEmbedding,
-            repo_id,
-            embedding_service
-        )
-        logger.info("repository reindexing started",repo_id=repo_id)
-        return {"message":"reindexing started","repo_id": repo_id}
+        running = await running_job(service, repo_id, JobKind.REINDEX)
+        if running:
+            return {"message": "reindexing already running", "repo_id": repo_id, **running}
+        job, created = await job_queue.enqueue(JobKind.REINDEX.value, repo_id, priority=JOB_PRIORITY_LOW)
+        logger.info("repository reindexing queued",repo_id=repo_id, job_id=job.id)
+        return {"message":"reindexing queued" if created else "reindexing already queued",
+                "repo_id": repo_id, "job_id": job.id, "job_status": job.status}
     
     except HTTPException:
         raise
@@ -271,30 +299,38 @@ async def reindex_repo(
 @router.post("/{repo_id}/debug-process")
 async def debug_process_repository(
     repo_id: int,
-    background_tasks: BackgroundTasks,
     service: SupabaseService = Depends(get_supabaseService)
 ):
     """Debug endpoint to manually trigger repository processing"""
     try:
-        repository = await service.get_repo(repo_id)
+        repository = await service.get_repo(repo_id, projection=EXISTENCE)
         if not repository:
             raise HTTPException(status_code=404, detail="Repository not found")
         
         logger.info("Manually triggering repository processing", repo_id=repo_id)
         
-        # Add background task
-        background_tasks.add_task(
-            process_repoCommits,
-            repo_id,
-            repository.url,
-            100  # max_commits
-        )
+        running = await running_job(service, repo_id, JobKind.INGEST)
+        if running:
+            return {
+                "message": "Processing already running",
+                "repo_id": repo_id,
+                "url": repository.url,
+                "current_status": repository.status,
+                **running
+            }
+
+        job, created = await job_queue.enqueue(JobKind.INGEST.value, repo_id, {
+            "repo_url": repository.url,
+            "max_commits": 100
+        }, priority=JOB_PRIORITY_NORMAL)
         
         return {
-            "message": "Processing started",
+            "message": "Processing queued" if created else "Processing already queued",
             "repo_id": repo_id,
             "url": repository.url,
-            "current_status": repository.status
+            "current_status": repository.status,
+            "job_id": job.id,
+            "job_status": job.status
         }
         
     except HTTPException:
@@ -303,6 +339,119 @@ async def debug_process_repository(
         logger.error("Error starting debug processing", repo_id=repo_id, error=str(e))
         raise HTTPException(status_code=500, detail="Failed to start processing")
 
+async def progress_live(repo_id: int) -> bool:
+    """whether anything will still publish progress for the repository"""
+    if progress_bus.active(repo_id):
+        return True
+    try:
+        #a job waiting in this host's queue, or a run holding the lease on any worker or
+        #replica (running jobs always hold it)
+        if await job_queue.list_jobs(repo_id, JobStatus.QUEUED.value, limit=1):
+            return True
+        return await repo_locks.holder(repo_id) is not None
+    except Exception as e:
+        logger.warning("progress liveness check failed", repo_id=repo_id, error=str(e))
+        #keep the stream open, the next heartbeat checks again
+        return True
+
+@router.get("/{repo_id}/progress")
+async def stream_repoProgress(
+    repo_id: int,
+    service: SupabaseService = Depends(get_supabaseService)
+):
+    """server-sent `progress` events while the repository is ingested or reindexed, then `done`"""
+    repository = await service.get_repo(repo_id, projection=EXISTENCE)
+    if not repository:
+        raise HTTPException(status_code=404, detail="repository not found")
+
+    def status_snapshot(repository) -> dict:
+        return {"repo_id": repo_id, "stage": repository.status,
+                "total_commits": repository.total_commits, "indexed_commits": repository.indexed_commits}
+
+    async def events():
+        #subscribed before the first snapshot so nothing published in between is missed
+        with progress_bus.subscribe(repo_id) as queue:
+            latest = progress_bus.latest(repo_id) or status_snapshot(repository)
+            finished = latest["stage"] in TERMINAL_STAGES + (RepoStatus.COMPLETED.value, RepoStatus.ERROR.value)
+            #nothing running or queued for it (finished, cancelled back to pending, lost in
+            #a restart), no point holding the connection
+            if not await progress_live(repo_id):
+                final = latest if finished else status_snapshot(repository)
+                yield sse_event("progress", final)
+                yield sse_event("done", final)
+                return
+            if finished:
+                #a newer run this worker hasn't heard from, e.g. on another replica
+                latest = {"repo_id": repo_id, "stage": "queued",
+                          "updated_at": datetime.now(timezone.utc).isoformat()}
+            yield sse_event("progress", latest)
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), timeout=settings.PROGRESS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if not await progress_live(repo_id):
+                        #the run ended where this worker can't hear it, report the stored state
+                        current = await service.get_repo(repo_id, projection=EXISTENCE)
+                        final = status_snapshot(current) if current else {"repo_id": repo_id, "stage": "deleted"}
+                        yield sse_event("done", final)
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event("progress", snapshot)
+                if snapshot["stage"] in TERMINAL_STAGES:
+                    yield sse_event("done", snapshot)
+                    return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/{repo_id}/snapshot")
+async def export_repoSnapshot(
+    repo_id: int,
+    service: SupabaseService = Depends(get_supabaseService)
+):
+    """commits and embeddings as a columnar .npz snapshot"""
+    fd, path = tempfile.mkstemp(suffix=".npz")
+    os.close(fd)
+    try:
+        meta = await export_snapshot(service, repo_id, path)
+    except SnapshotError as e:
+        os.unlink(path)
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        os.unlink(path)
+        logger.error("error exporting snapshot", repo_id=repo_id, error=str(e))
+        raise HTTPException(status_code=500, detail="internal server error")
+    filename = f"{meta['repository']['owner'] or 'repo'}-{meta['repository']['name']}.npz"
+    return FileResponse(path, media_type="application/octet-stream", filename=filename,
+                        background=BackgroundTask(os.unlink, path))
+
+@router.post("/snapshot")
+async def import_repoSnapshot(
+    request: Request,
+    url: Optional[str] = Query(None, description="restore under this url instead of the one in the snapshot"),
+    force: bool = Query(False, description="accept embeddings from a different model"),
+    service: SupabaseService = Depends(get_supabaseService)
+):
+    """restore a snapshot sent as the raw request body"""
+    fd, path = tempfile.mkstemp(suffix=".npz")
+    try:
+        #spooled to disk, a snapshot can be far bigger than we want in memory
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                f.write(chunk)
+        if url and not is_valid_github_url(url):
+            raise HTTPException(status_code=400, detail="invalid github repo url format")
+        return await import_snapshot(service, path, url=url, force=force)
+    except HTTPException:
+        raise
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("error importing snapshot", error=str(e))
+        raise HTTPException(status_code=500, detail="internal server error")
+    finally:
+        os.unlink(path)
+
 @router.delete("/{repo_id}")
 async def delete_repo(
     repo_id:int,
@@ -310,11 +459,14 @@ async def delete_repo(
     embedding_service: EmbeddingService=Depends(get_embeddingService)
 ):
     try:
-        repository = await service.get_repo(repo_id)
+        repository = await service.get_repo(repo_id, projection=EXISTENCE)
         if not repository:
             raise HTTPException(status_code=404, detail="repo not found")
-        await embedding_service.delete_repoEmbeddings(repo_id)
+        #nothing should be writing to it while it goes
+        await job_queue.cancel_repo(repo_id)
+        await embedding_service.delete_repository_embeddings(repo_id)
         success = await service.delete_repo(repo_id)
+        answer_cache.invalidate_repo(repo_id)
 
         if success:
             logger.info("repository deleted successfully")
@@ -331,14 +483,13 @@ async def process_repoCommits(repo_id: int, repo_url: str, max_commits: int):
     try:
         # Import here to avoid circular imports in background tasks
         from app.core.config import settings
-        from app.core.supabase import get_supabase
         
         # Create new service instances for background task
-        supabase_client = get_supabase()
-        supabase_service = SupabaseService(supabase_client)
-        github_service = Github_service()
+        supabase_service = create_storage_service()
+        github_service = create_github_service()
 
         logger.info("Starting repository processing", repo_id=repo_id, url=repo_url, max_commits=max_commits)
+        progress_bus.begin(repo_id, "ingest")
         
         # Update status to indexing
         await supabase_service.update_repoStatus(repo_id, RepoStatus.INDEXING)
@@ -352,7 +503,10 @@ async def process_repoCommits(repo_id: int, repo_url: str, max_commits: int):
         while retry_count < max_retries and not commits:
             try:
                 logger.info(f"Fetching commits (attempt {retry_count + 1})", repo_id=repo_id, repo_url=repo_url)
-                commits = await github_service.get_commits(repo_url, max_commits)
+                progress_bus.stage(repo_id, "fetching", total=max_commits)
+                commits = await github_service.get_commits(
+                    repo_url, max_commits, on_progress=lambda fetched: progress_bus.advance(repo_id, fetched=fetched)
+                )
 
                 if commits:
                     logger.info("Commits fetched successfully", repo_id=repo_id, commit_count=len(commits))
@@ -372,23 +526,30 @@ async def process_repoCommits(repo_id: int, repo_url: str, max_commits: int):
         if commits:
             # Store commits in database
             logger.info("Storing commits in database", repo_id=repo_id, commit_count=len(commits))
+            progress_bus.advance(repo_id, fetched=len(commits))
+            progress_bus.stage(repo_id, "storing", total=len(commits))
             stored_commits = await supabase_service.store_commits(repo_id, commits)
+            #already-known commits count as stored, they are in the database
+            progress_bus.advance(repo_id, stored=len(commits))
+            if stored_commits:
+                answer_cache.invalidate_repo(repo_id)
+
+            #re-ingesting an unchanged repo inserts nothing and is still a success
+            total_commits = await repo_stats.exact_total(supabase_service, repo_id)
+            await supabase_service.update_repoStatus(
+                repo_id,
+                RepoStatus.COMPLETED,
+                total_commits=total_commits,
+                indexed_commits=total_commits,
+                last_analyzed_at=datetime.now(timezone.utc).isoformat()
+            )
             
-            # Update repository with commit count
+            progress_bus.finish(repo_id)
+            logger.info("Repository processing completed successfully", repo_id=repo_id, 
+                       fetched=len(commits), inserted=len(stored_commits), total=total_commits)
             if stored_commits:
-                await supabase_service.update_repoStatus(
-                    repo_id,
-                    RepoStatus.COMPLETED,
-                    total_commits=len(stored_commits),
-                    indexed_commits=len(stored_commits),
-                    last_analyzed_at=datetime.now(timezone.utc).isoformat()
-                )
-                
-                logger.info("Repository processing completed successfully", repo_id=repo_id, 
-                           commit_count=len(stored_commits))
-            else:
-                await supabase_service.update_repoStatus(repo_id, RepoStatus.ERROR)
-                logger.error("Failed to store commits in database", repo_id=repo_id)
+                #the default summary is almost always the next request on a fresh repo
+                speculate_summary(repo_id)
 
         else:
             logger.warning("No commits found for repository", repo_id=repo_id)
@@ -399,30 +560,86 @@ async def process_repoCommits(repo_id: int, repo_url: str, max_commits: int):
                 indexed_commits=0,
                 last_analyzed_at=datetime.now(timezone.utc).isoformat()
             )
+            progress_bus.finish(repo_id)
 
+    except asyncio.CancelledError:
+        #cancelled or requeued on shutdown, nothing is indexing it now
+        logger.warning("Repository processing interrupted", repo_id=repo_id)
+        progress_bus.finish(repo_id, "interrupted")
+        try:
+            await create_storage_service().update_repoStatus(repo_id, RepoStatus.PENDING)
+        except Exception as update_error:
+            logger.error("Failed to update repository status to PENDING",
+                        repo_id=repo_id, error=str(update_error))
+        raise
     except Exception as e:
         logger.error("Error processing repository", repo_id=repo_id, error=str(e), exc_info=True)
+        progress_bus.finish(repo_id, "failed", error=str(e))
         try:
             # Try to update status to error, but don't fail if this also fails
-            from app.core.supabase import get_supabase
-            supabase_client = get_supabase()
-            supabase_service = SupabaseService(supabase_client)
+            supabase_service = create_storage_service()
             await supabase_service.update_repoStatus(repo_id, RepoStatus.ERROR)
         except Exception as update_error:
             logger.error("Failed to update repository status to ERROR", 
                         repo_id=repo_id, error=str(update_error))
+        #recorded on the job
+        raise
 
-async def reindex_repoEmbedding(repo_id: int, embedding_service: EmbeddingService):
+async def reindex_repoEmbedding(repo_id: int, embedding_service: Optional[EmbeddingService] = None):
+    embedding_service = embedding_service or EmbeddingService(create_storage_service())
     try:
         logger.info("starting embedding reindex", repo_id=repo_id)
+        progress_bus.begin(repo_id, "reindex")
         #delete existing embeddings
         await embedding_service.delete_repository_embeddings(repo_id)
         success=await embedding_service.index_repoCommmits(repo_id)
 
         if success:
            logger.info("embedding reindex completed", repo_id=repo_id)
+           progress_bus.finish(repo_id)
         else:
             logger.error("embedding reindex failed", repo_id=repo_id)
+            raise RuntimeError("embedding reindex failed")
             
+    except asyncio.CancelledError:
+        progress_bus.finish(repo_id, "interrupted")
+        raise
     except Exception as e:
-        logger.error("error reindexing embeddings",repo_id=repo_id, error=str(e)) 
\ No newline at end of file
+        logger.error("error reindexing embeddings",repo_id=repo_id, error=str(e))
+        progress_bus.finish(repo_id, "failed", error=str(e))
+        raise
+
+async def running_job(service: SupabaseService, repo_id: int, kind: JobKind) -> Optional[dict]:
+    """the run of `kind` holding the repository's lease on any worker, for a duplicate request to attach to"""
+    lease = await repo_locks.holder(repo_id, service)
+    if not lease or lease.get("operation") != kind.value:
+        return None
+    #the job row is only visible when the holder shares this host's queue
+    jobs = await job_queue.list_jobs(repo_id, JobStatus.RUNNING.value, limit=1)
+    return {"attached": True, "holder": lease["holder"], "job_id": jobs[0].id if jobs else None,
+            "job_status": JobStatus.RUNNING.value}
+
+async def run_locked(repo_id: int, kind: JobKind, work):
+    """runs work() holding the repository's lease.
+
+    the same operation already running elsewhere makes this job redundant, a different
+    one (reindex while ingesting) sends the job back on the queue to try again later
+    instead of holding a worker while it waits.
+    """
+    try:
+        async with repo_locks.hold(repo_id, kind.value):
+            return await work()
+    except LeaseHeld as e:
+        if e.lease.get("operation") == kind.value:
+            raise JobSuperseded(f"attached to the {kind.value} already running on {e.lease.get('holder')}")
+        raise JobRetry(f"waiting for the {e.lease.get('operation')} running on {e.lease.get('holder')}",
+                       repo_locks.heartbeat_seconds)
+
+async def ingest_job(repo_id: int, repo_url: str, max_commits: int):
+    await run_locked(repo_id, JobKind.INGEST, lambda: process_repoCommits(repo_id, repo_url, max_commits))
+
+async def reindex_job(repo_id: int):
+    await run_locked(repo_id, JobKind.REINDEX, lambda: reindex_repoEmbedding(repo_id))
+
+job_queue.register(JobKind.INGEST.value, ingest_job)
+job_queue.register(JobKind.REINDEX.value, reindex_job) 
\ No newline at end of file
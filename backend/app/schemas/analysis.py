@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 class AnalysisRequest(BaseModel):
@@ -7,6 +7,7 @@ class AnalysisRequest(BaseModel):
     questions: str =Field(..., min_length=1, max_length=1000)
     max_commits: Optional[int] =Field(10, ge=1, le=50)
     similarity_t: Optional[float] =Field(0.7, ge=0.0, le=1.0)
+    diversity: Optional[float] =Field(0.0, ge=0.0, le=1.0, description="0 keeps pure relevance order, higher values penalise near-duplicate commits")
 
 class Commit_refrence(BaseModel):
     sha: str
@@ -24,6 +25,33 @@ class AnalysisResponse(BaseModel):
     confidence_score: float
     processing_time: float
     repository_id: int
+    cached: bool = False
+    #answered from retrieval only because the LLM circuit was open
+    degraded: bool = False
+
+class InsightsResponse(BaseModel):
+    question: str
+    repository_id: int
+    relevant_commits: List[Commit_refrence]
+    summary: Optional[str] = None
+    quality: Optional[Dict[str, Any]] = None
+    follow_up_questions: Optional[List[str]] = None
+    #part name -> reason, for parts that failed or timed out
+    errors: Dict[str, str] = {}
+    partial: bool = False
+    processing_time: float
+
+class FollowUpRequest(BaseModel):
+    repository_id: int =Field(..., gt=0)
+    question: str =Field(..., min_length=1, max_length=1000)
+    answer: str =Field("", max_length=20000)
+    commit_count: int =Field(0, ge=0)
+
+class FollowUpResponse(BaseModel):
+    repository_id: int
+    question: str
+    follow_up_questions: List[str]
+    precomputed: bool = False
 
 class AnalysisHistory(BaseModel):
     id: int
@@ -36,7 +64,9 @@ class AnalysisHistory(BaseModel):
 
 class AnalysisHistoryList(BaseModel):
     analyses: List[AnalysisHistory]
-    total: str
-    page: str
+    total: int
+    page: int
     per_page: int
-    has_next: float
+    has_next: bool
+    #pass back as ?cursor= for the next page
+    next_cursor: Optional[str] = None
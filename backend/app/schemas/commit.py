@@ -3,15 +3,16 @@ from typing import Optional, List
 from datetime import datetime
 
 class CommitResponse(BaseModel):
-    id: str
+    #built from the commit_card projection
+    id: int
     sha: str
     message: str
     author: str
     author_email: Optional[str]
     commit_date: datetime
-    additions: str
-    deletions: str
-    files_changed: str
+    additions: int
+    deletions: int
+    files_changed: List[str]
     has_embedding: bool
 
 class CommitList(BaseModel):
@@ -22,5 +23,6 @@ class CommitList(BaseModel):
     has_next: bool
 
 class CommitDetail(CommitResponse):
+    #needs the full projection
     diff_content: Optional[str] =None
     embedding_created_at: Optional[datetime] =None
\ No newline at end of file
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    repository_id: int
+    payload: Dict[str, Any]
+    priority: int
+    status: str
+    attempts: int
+    error: Optional[str] = None
+
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    run_after: Optional[datetime] = None
+
+class JobList(BaseModel):
+    jobs: List[JobResponse]
@@ -61,10 +61,24 @@ class RepoList(BaseModel):
     page: int
     per_page: int
     has_next: bool
+    #pass back as ?cursor= for the next page
+    next_cursor: Optional[str] = None
 
 class RepoStats(BaseModel):
     repository_id: int
     total_commits: int
-    recent_commits: int
+    recent_commits: int  # last 7 days
     embedding_progress: float  # 0.0 to 1.0
+    embedded_commits: int = 0
+    commits_7d: int = 0
+    commits_30d: int = 0
+    additions: int = 0
+    deletions: int = 0
+    last_updated: datetime
+
+class GlobalStats(BaseModel):
+    total_repositories: int
+    total_commits: int
+    total_embeddings: int
+    last_reconciled_at: Optional[datetime] = None
     last_updated: datetime
\ No newline at end of file
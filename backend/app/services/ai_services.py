@@ -1,10 +1,17 @@
 import google.generativeai as genai
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.services.backends import create_generative_model, create_cached_model, cache_min_tokens, is_fake
 from app.models.embedding import EmbeddingResult
 from app.schemas.analysis import AnalysisResponse, Commit_refrence
-from typing import List, Dict, Any, Optional
+from app.services.llm_executor import llm_executor
+from app.services.context_packer import ContextPacker, estimate_tokens
+from app.services.prompt_cache import SplitPrompt, prefix_cache, prompt_text
+from app.services.circuit_breaker import llm_breaker, CircuitOpenError, OPEN
+from typing import List, Dict, Any, Optional, AsyncIterator, Union, Tuple
 import asyncio
+import hashlib
+import threading
 import time
 from datetime import datetime, timezone
 
@@ -15,62 +22,41 @@ class AIService:
         self.model_name=settings.GEMINI_MODEL
         self.max_tokens=settings.MAX_TOKENS
         self.temperature = settings.TEMPERATURE
-        
-        #gemini config
-        if not settings.GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY is required")
-        
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.packer = ContextPacker()
         
         try:
-            self.model =genai.GenerativeModel(
-                model_name=self.model_name,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=self.max_tokens,
-                    temperature=self.temperature
-                )
-            )
-            logger.info(" ai service initialised", model=self.model_name)
+            self.model = create_generative_model(self.model_name, self.max_tokens, self.temperature)
+            logger.info(" ai service initialised", model=self.model_name, backend=settings.LLM_BACKEND)
         except Exception as e:
             logger.error("Failed to initialize AI service", error=str(e))
             raise  
         
-    def commit_context(self, commits: List[EmbeddingResult]) -> str:
+    def commit_context(self, commits: List[EmbeddingResult]) -> Tuple[str, List[EmbeddingResult]]:
+        """(context text, the commits that made it into the budget)"""
         if not commits:
-            return "No relevant commits found."
+            return "No relevant commits found.", []
         
-        context_parts = []
-        for i, commit in enumerate(commits, 1):
-            commit_info = [
-                f"Commit {i}:",
-                f"  SHA: {commit.sha}",
-                f"  Author: {commit.author}",
-                f"  Date: {commit.commit_date.strftime('%Y-%m-%d %H:%M:%S')}",
-                f"  Message: {commit.message}",
-                f"  Similarity Score: {commit.similarity_score:.2f}",
-                f"  Changes: +{commit.additions} -{commit.deletions}",
-            ]
-            
-            if commit.files_changed:
-                files_str = ", ".join(commit.files_changed[:5])
-                if len(commit.files_changed) > 5:
-                    files_str += f" and {len(commit.files_changed) - 5} more files"
-                commit_info.append(f"  Files: {files_str}")
-            
-            context_parts.append("\n".join(commit_info))
-        
-        return "\n\n".join(context_parts)
+        #retrieval order (rerank/MMR) kept, within the input token budget
+        context, packed = self.packer.pack(commits)
+        if settings.DEBUG:
+            logger.debug("commit context packed", commits=len(commits), packed=len(packed),
+                         estimated_tokens=estimate_tokens(context))
+        return context, packed
     
-    def analysisP(self, question:str, context:str, repo_id:int)-> str:
+    def context_prefix(self, context: str) -> str:
+        #shared by every prompt over the same commits, so it can be cached provider-side
         return f"""You are MementoAI, an expert code archaeologist and repository analyst. Your task is to analyze commit history and provide insightful answers about code evolution, patterns, and development practices.
 
-REPOSITORY ANALYSIS REQUEST:
-Repository ID: {repo_id}
-Question: "{question}"
-
 RELEVANT COMMIT HISTORY:
 {context}
 
+"""
+
+    def analysisP(self, question:str, context:str, repo_id:int)-> SplitPrompt:
+        return SplitPrompt(self.context_prefix(context), f"""REPOSITORY ANALYSIS REQUEST:
+Repository ID: {repo_id}
+Question: "{question}"
+
 ANALYSIS INSTRUCTIONS:
 1. Analyze the provided commits in relation to the specific question asked
 2. Look for patterns, trends, and significant changes across the commits
@@ -90,34 +76,36 @@ Provide a comprehensive analysis that:
 
 If the commits don't contain enough information to fully answer the question, explain what you can determine and suggest what additional information might be helpful.
 
-ANALYSIS:"""
+ANALYSIS:""")
+    def commit_refs(self, commits: List[EmbeddingResult]) -> List[Commit_refrence]:
+        return [
+            Commit_refrence(
+                sha=commit.sha,
+                message=commit.message,
+                author=commit.author,
+                commit_date=commit.commit_date.isoformat(),
+                files_changes=", ".join(commit.files_changed),
+                additions=str(commit.additions),
+                deletions=str(commit.deletions)
+            )
+            for commit in commits
+        ]
+
     async def analyze_commits(self, question:str,relevant_commits: List[EmbeddingResult], repo_id:int)-> AnalysisResponse:
-        start_time= time.time
+        start_time= time.time()
         try:
             logger.info("starting ai analysis", repo_id = repo_id, commit_count=len(relevant_commits), question_length=len(question))
-            #context
-            context=self.commit_context(relevant_commits)
+            #context, only the commits that fit are scored and cited
+            context, packed=self.commit_context(relevant_commits)
             prompt=self.analysisP(question, context, repo_id)
 
             if settings.DEBUG:
-                logger.debug("AI prompt created",prompt_length=len(prompt))
+                logger.debug("AI prompt created",prompt_length=len(prompt.text))
 
             response =await self.generate_retry(prompt)
-            confidence_score=self.calculate_confidence(relevant_commits, response)
-
-            Commit_refrence=[]
-            for commit in relevant_commits:
-                commit_ref= Commit_refrence(
-                    sha=commit.sha,
-                    message=commit.message,
-                    author=commit.author,
-                    commit_date=commit.commit_date,
-                    similarity_score=commit.similarity_score,
-                    files_changed=commit.files_changed,
-                    additions=commit.additions,
-                    deletions=commit.deletions
-                )
-                Commit_refrence.append(commit_ref)
+            confidence_score=self.calculate_confidence(packed, response)
+
+            commit_refs=self.commit_refs(packed)
             
             processing_time = time.time() - start_time
             
@@ -127,12 +115,15 @@ ANALYSIS:"""
             return AnalysisResponse(
                 question=question,
                 answer=response,
-                relevant_commits=Commit_refrence,
+                relevant_commits=commit_refs,
                 confidence_score=confidence_score,
                 processing_time=processing_time,
                 repository_id=repo_id
             )
             
+        except CircuitOpenError:
+            logger.warning("AI circuit open, returning retrieval-only analysis", repo_id=repo_id)
+            return self.degraded_analysis(question, relevant_commits, repo_id, start_time)
         except Exception as e:
             logger.error("AI analysis failed", repo_id=repo_id, error=str(e))
             #fallback response
@@ -144,27 +135,151 @@ ANALYSIS:"""
                 processing_time=time.time() - start_time,
                 repository_id=repo_id
             )
-    async def generate_retry(self, prompt: str, max_retries: int = 3) -> str:
+    def prompt_key(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{self.max_tokens}:{self.temperature}:{digest}"
+
+    def cached_model(self, prefix: str, ttl_seconds: int):
+        return create_cached_model(self.model, self.model_name, prefix, ttl_seconds,
+                                   self.max_tokens, self.temperature)
+
+    def generate_content(self, prompt: Union[str, SplitPrompt], stream: bool = False):
+        #blocking, runs on an LLM worker thread. split prompts reuse a cached prefix when possible
+        if isinstance(prompt, SplitPrompt):
+            handle = prefix_cache.resolve(prompt.prefix, self.cached_model, cache_min_tokens(self.model))
+            if handle is not None:
+                try:
+                    return handle.generate_content(prompt.suffix, stream=stream)
+                except Exception as e:
+                    #expired or evicted upstream, retry once with the full prompt
+                    prefix_cache.drop(prompt.prefix)
+                    logger.warning("cached prefix rejected, retrying without it", error=str(e))
+        return self.model.generate_content(prompt_text(prompt), stream=stream)
+
+    async def generate_retry(self, prompt: Union[str, SplitPrompt], max_retries: int = 3) -> str:
         for attempt in range(max_retries):
+            #fails fast while the provider is known to be down instead of sleeping through backoff
+            llm_breaker.before_call()
+            start_time = time.monotonic()
+            recorded = False
             try:
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None, self.model.generate_content, prompt
+                #identical prompts in flight share one upstream call
+                response = await llm_executor.run(
+                    self.generate_content, prompt, key=self.prompt_key(prompt_text(prompt))
                 )
                 
                 if response.text:
+                    recorded = True
+                    llm_breaker.record_success((time.monotonic() - start_time) * 1000)
                     return response.text.strip()
                 else:
                     raise Exception("empty response from AI model")
                     
             except Exception as e:
+                recorded = True
+                llm_breaker.record_failure()
                 logger.warning(f"AI generation attempt {attempt + 1} failed", error=str(e))
+                if llm_breaker.state == OPEN:
+                    raise CircuitOpenError(f"{llm_breaker.name} circuit opened: {str(e)}")
                 if attempt == max_retries - 1:
                     raise Exception(f"AI generation failed after {max_retries} attempts: {str(e)}")
                 await asyncio.sleep(2 ** attempt)
+            finally:
+                #cancelled mid-call, no outcome to record, free its probe slot
+                if not recorded:
+                    llm_breaker.release()
         
         raise Exception(" AI geeneration failed")
 
+    async def generate_stream(self, prompt: Union[str, SplitPrompt]) -> AsyncIterator[str]:
+        #the sdk stream is a blocking iterator, drain it on a worker thread into a queue
+        llm_breaker.before_call()
+        loop = asyncio.get_event_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+        start_time = time.monotonic()
+        recorded = False
+
+        def produce():
+            try:
+                for chunk in self.generate_content(prompt, stream=True):
+                    if stop.is_set():
+                        break
+                    if chunk.text:
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        def producer_finished(task: asyncio.Task):
+            #produce() reports its own errors, this only fires if it never got to run
+            if not task.cancelled() and task.exception() is not None:
+                queue.put_nowait(task.exception())
+                queue.put_nowait(done)
+
+        #a stream holds one LLM slot until it finishes
+        producer = asyncio.ensure_future(llm_executor.run(produce))
+        producer.add_done_callback(producer_finished)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    if not recorded:
+                        recorded = True
+                        llm_breaker.record_failure()
+                    raise Exception(f"AI streaming failed: {str(item)}")
+                if not recorded:
+                    #streams are judged on time to first token
+                    recorded = True
+                    llm_breaker.record_success((time.monotonic() - start_time) * 1000)
+                yield item
+        finally:
+            #client went away or we are done, the worker thread stops at the next chunk
+            stop.set()
+            if not recorded:
+                llm_breaker.release()
+
+    def degraded_analysis(self, question: str, commits: List[EmbeddingResult], repo_id: int,
+                          start_time: float) -> AnalysisResponse:
+        """retrieval-only answer used while the LLM circuit is open.
+
+        commits are listed in retrieval order, which already reflects rerank/MMR.
+        """
+        lines = [
+            "The AI model is temporarily unavailable, so this answer was assembled directly "
+            "from the most relevant commits without AI analysis.",
+            "",
+            "Most relevant commits:"
+        ]
+        for commit in commits[:5]:
+            subject = commit.message.strip().split("\n", 1)[0]
+            lines.append(f"- {commit.sha[:8]} ({commit.commit_date.strftime('%Y-%m-%d')}, {commit.author}): {subject}")
+
+        areas: Dict[str, int] = {}
+        for commit in commits:
+            for path in commit.files_changed:
+                area = path.split("/", 1)[0] if "/" in path else path
+                areas[area] = areas.get(area, 0) + 1
+        if areas:
+            top_areas = sorted(areas, key=areas.get, reverse=True)[:5]
+            lines += ["", f"Most touched areas: {', '.join(top_areas)}"]
+
+        avg_similarity = sum(commit.similarity_score for commit in commits) / len(commits) if commits else 0.0
+        return AnalysisResponse(
+            question=question,
+            answer="\n".join(lines),
+            relevant_commits=self.commit_refs(commits),
+            #only the retrieval share of calculate_confidence applies
+            confidence_score=min(max(avg_similarity * 0.4, 0.0), 1.0),
+            processing_time=time.time() - start_time,
+            repository_id=repo_id,
+            degraded=True
+        )
+
     def calculate_confidence  (self, commits:List[EmbeddingResult], response:str)-> float:
         if not commits or not response:
             return 0.0
@@ -193,14 +308,8 @@ ANALYSIS:"""
         )
         
         return min(max(confidence, 0.0), 1.0)    
-    async def commit_summar(self, commits:List[EmbeddingResult])-> str:
-        if not commits:
-            return " no commits availabe for summary"
-        try:
-            context=self.commit_context(commits)
-            prompt= f"""You are MementoAI, analyzing repository commit history. Generate a concise summary of the development activity shown in these commits:
-
-{context}
+    def summaryP(self, context: str) -> SplitPrompt:
+        return SplitPrompt(self.context_prefix(context), """Generate a concise summary of the development activity shown in these commits.
 
 Provide a summary that covers:
 1. Main development themes and focus areas
@@ -211,8 +320,31 @@ Provide a summary that covers:
 
 Keep the summary informative but concise (3-5 paragraphs).
 
+SUMMARY:""")
+
+    def reduceP(self, summaries: List[str]) -> str:
+        periods = "\n\n".join(f"Period {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+        return f"""You are MementoAI, analyzing repository commit history. Below are summaries of consecutive periods of development activity, oldest first:
+
+{periods}
+
+Combine them into a single summary of the whole span that covers:
+1. Main development themes and how they shifted over time
+2. Key contributors and their contributions
+3. Types of changes (features, fixes, refactoring, etc.)
+4. Code quality and architectural trends
+5. Overall development velocity and patterns
+
+Keep the summary informative but concise (3-5 paragraphs).
+
 SUMMARY:"""
-            response= await self.generate_retry(prompt)
+
+    async def commit_summar(self, commits:List[EmbeddingResult])-> str:
+        if not commits:
+            return " no commits availabe for summary"
+        try:
+            context, _=self.commit_context(commits)
+            response= await self.generate_retry(self.summaryP(context))
             logger.info("commit summary generated", commit_count=len(commits))
             return response
             
@@ -220,16 +352,8 @@ SUMMARY:"""
             logger.error("failed to generate commit summary", error=str(e))
             return f"Unable to generate summary: {str(e)}"
     
-    async def code_quality(self, commits: List[EmbeddingResult]) -> Dict[str, Any]:
-        if not commits:
-            return {"error": "No commits available for analysis"}
-        
-        try:
-            context = self.commit_context(commits)
-            
-            prompt = f"""Analyze the code quality trends from these commits:
-
-{context}
+    def qualityP(self, context: str) -> SplitPrompt:
+        return SplitPrompt(self.context_prefix(context), """Analyze the code quality trends from these commits.
 
 Provide analysis in the following categories:
 1. Technical debt indicators
@@ -241,29 +365,33 @@ Provide analysis in the following categories:
 
 Respond in a structured format with specific examples from the commits.
 
-QUALITY ANALYSIS:"""
-            
-            response = await self.generate_retry(prompt)
+QUALITY ANALYSIS:""")
+
+    async def code_quality(self, commits: List[EmbeddingResult]) -> Dict[str, Any]:
+        if not commits:
+            return {"error": "No commits available for analysis"}
+        
+        try:
+            context, packed = self.commit_context(commits)
+            response = await self.generate_retry(self.qualityP(context))
             
             return {
                 "analysis": response,
-                "commit_count": len(commits),
+                "commit_count": len(packed),
                 "generated_at": datetime.now(timezone.utc).isoformat()
             }
         except Exception as e:
             logger.error("Failed to analyze code quality", error=str(e))
             return {"error": f"Analysis failed: {str(e)}"}
     
-    async def follow_up_ques(self, question: str, analysis: str, 
-                                        commits: List[EmbeddingResult]) -> List[str]:
-        try:
-            prompt = f"""Based on this repository analysis, suggest 3-5 relevant follow-up questions that would provide deeper insights:
+    def followupP(self, question: str, analysis: str, commit_count: int) -> str:
+        return f"""Based on this repository analysis, suggest 3-5 relevant follow-up questions that would provide deeper insights:
 
 Original Question: "{question}"
 
 Analysis Result: "{analysis[:500]}..."
 
-Commits Analyzed: {len(commits)} commits
+Commits Analyzed: {commit_count} commits
 
 Generate specific, actionable follow-up questions that would help understand:
 - Code evolution patterns
@@ -273,21 +401,42 @@ Generate specific, actionable follow-up questions that would help understand:
 - Quality improvements
 
 SUGGESTED QUESTIONS:"""
-            response = await self.generate_retry(prompt)
-            
-            #line parsing
-            questions = []
-            for line in response.split('\n'):
-                line = line.strip()
-                if line and (line.startswith('-') or line.startswith('•') or 
-                           line.startswith('1.') or line.startswith('2.') or 
-                           line.startswith('3.') or line.startswith('4.') or 
-                           line.startswith('5.')):
-                    question_text = line.lstrip('-•123456789. ').strip()
-                    if question_text and question_text.endswith('?'):
-                        questions.append(question_text)
-            
-            return questions[:5]
+
+    def context_followupP(self, question: str, context: str) -> SplitPrompt:
+        #follow-ups grounded in the commits themselves, shares the analysis prefix
+        return SplitPrompt(self.context_prefix(context), f"""Based on these commits, suggest 3-5 relevant follow-up questions to this question that would provide deeper insights:
+
+Original Question: "{question}"
+
+Generate specific, actionable follow-up questions that would help understand:
+- Code evolution patterns
+- Development practices
+- Technical decisions
+- Architecture changes
+- Quality improvements
+
+SUGGESTED QUESTIONS:""")
+
+    def parse_questions(self, response: str) -> List[str]:
+        #line parsing
+        questions = []
+        for line in response.split('\n'):
+            line = line.strip()
+            if line and (line.startswith('-') or line.startswith('•') or 
+                       line.startswith('1.') or line.startswith('2.') or 
+                       line.startswith('3.') or line.startswith('4.') or 
+                       line.startswith('5.')):
+                question_text = line.lstrip('-•123456789. ').strip()
+                if question_text and question_text.endswith('?'):
+                    questions.append(question_text)
+        
+        return questions[:5]
+
+    async def follow_up_ques(self, question: str, analysis: str, 
+                                        commits: List[EmbeddingResult]) -> List[str]:
+        try:
+            response = await self.generate_retry(self.followupP(question, analysis, len(commits)))
+            return self.parse_questions(response)
             
         except Exception as e:
             logger.error("failed to generate follow-up questions", error=str(e))
@@ -301,6 +450,17 @@ SUGGESTED QUESTIONS:"""
             logger.error("AI service connection test failed", error=str(e))
             return False
     
+    def ping(self) -> bool:
+        #model metadata lookup, cheap enough for periodic health probes (no tokens generated)
+        if is_fake(settings.LLM_BACKEND):
+            return True
+        try:
+            genai.get_model(f"models/{self.model_name}")
+            return True
+        except Exception as e:
+            logger.error("AI service ping failed", error=str(e))
+            return False
+    
     def get_model_info(self) -> Dict[str, Any]:
         return {
             "model_name": self.model_name,
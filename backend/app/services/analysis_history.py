@@ -0,0 +1,122 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from collections import deque
+from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+import asyncio
+
+logger = get_logger(__name__)
+
+def history_row(analysis) -> Dict[str, Any]:
+    #analyses table row for an AnalysisResponse
+    return {
+        "repository_id": analysis.repository_id,
+        "question": analysis.question,
+        "answer": analysis.answer,
+        "confidence_score": analysis.confidence_score,
+        "processing_time": analysis.processing_time,
+        "relevant_commit_count": len(analysis.relevant_commits),
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+class AnalysisHistoryBuffer:
+    """write-behind buffer for analysis history.
+
+    /analyze only appends to an in-memory queue; a background task writes the rows
+    in batches once `batch_size` are waiting or every `flush_seconds`, whichever
+    comes first. a failed batch goes back on the queue for the next flush. the queue
+    is bounded, when storage falls behind the oldest rows are dropped rather than
+    growing without limit. stop() drains what is left on shutdown.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, flush_seconds: Optional[float] = None,
+                 max_pending: Optional[int] = None):
+        self.batch_size = batch_size or settings.ANALYSIS_HISTORY_BATCH_SIZE
+        self.flush_seconds = flush_seconds or settings.ANALYSIS_HISTORY_FLUSH_SECONDS
+        self.max_pending = max_pending or settings.ANALYSIS_HISTORY_MAX_PENDING
+        self._pending: deque = deque()
+        self._full: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._metrics = {"queued": 0, "written": 0, "batches": 0, "failed_batches": 0, "dropped": 0}
+
+    def add(self, analysis) -> bool:
+        if not settings.ANALYSIS_HISTORY_ENABLED:
+            return False
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self._metrics["dropped"] += 1
+        self._pending.append(history_row(analysis))
+        self._metrics["queued"] += 1
+        if self._full is not None and len(self._pending) >= self.batch_size:
+            self._full.set()
+        return True
+
+    def pending_for(self, repo_id: int) -> bool:
+        return any(row["repository_id"] == repo_id for row in self._pending)
+
+    async def flush(self, storage=None) -> int:
+        """write everything queued so far, returns rows written"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if storage is None:
+                from app.services.backends import create_storage_service
+                storage = create_storage_service()
+            written = 0
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    await storage.store_analyses(batch)
+                except asyncio.CancelledError:
+                    self._pending.extendleft(reversed(batch))
+                    raise
+                except Exception as e:
+                    #back in front, in order, for the next flush
+                    self._pending.extendleft(reversed(batch))
+                    while len(self._pending) > self.max_pending:
+                        self._pending.popleft()
+                        self._metrics["dropped"] += 1
+                    self._metrics["failed_batches"] += 1
+                    logger.warning("analysis history flush failed", rows=len(batch), error=str(e))
+                    break
+                written += len(batch)
+                self._metrics["batches"] += 1
+            self._metrics["written"] += written
+            return written
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            if self._pending:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error("analysis history flush failed", error=str(e))
+
+    def start(self):
+        if self._task is None:
+            self._full = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending:
+            written = await self.flush()
+            logger.info("analysis history drained", written=written, left=len(self._pending))
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._metrics, "pending": len(self._pending)}
+
+analysis_history = AnalysisHistoryBuffer()
@@ -0,0 +1,127 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.repo import Repo
+from app.schemas.analysis import AnalysisResponse
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Set
+import numpy as np
+import itertools
+import time
+
+logger = get_logger(__name__)
+
+def repo_version(repository: Repo) -> str:
+    #changes whenever ingestion or indexing touches the repository record
+    updated_at = repository.updated_at.isoformat() if repository.updated_at else ""
+    return f"{repository.indexed_commits}:{repository.total_commits}:{updated_at}"
+
+class AnswerCache:
+    """semantic cache of analysis answers.
+
+    entries are keyed on (repo_id, commit-set version, request variant) and matched
+    by cosine similarity of the question embedding, so paraphrased questions about an
+    unchanged repository reuse a stored AnalysisResponse.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 similarity_threshold: Optional[float] = None):
+        self.max_entries = max_entries or settings.ANSWER_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.ANSWER_CACHE_TTL_SECONDS
+        self.similarity_threshold = similarity_threshold or settings.ANSWER_CACHE_SIMILARITY
+
+        #entry id -> entry, in LRU order
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._by_repo: Dict[int, Set[int]] = {}
+        self._ids = itertools.count(1)
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            repo_entries = self._by_repo.get(entry["repo_id"])
+            if repo_entries is not None:
+                repo_entries.discard(entry_id)
+                if not repo_entries:
+                    del self._by_repo[entry["repo_id"]]
+
+    def lookup(self, repo_id: int, version: str, variant: Tuple,
+               question_embedding: np.ndarray) -> Optional[AnalysisResponse]:
+        now = time.monotonic()
+        candidates = []
+        for entry_id in list(self._by_repo.get(repo_id, ())):
+            entry = self._entries[entry_id]
+            if now - entry["stored_at"] > self.ttl_seconds:
+                self._remove(entry_id)
+                self._metrics["expirations"] += 1
+            elif entry["version"] != version:
+                #commit set moved on since this answer was generated
+                self._remove(entry_id)
+                self._metrics["invalidations"] += 1
+            elif entry["variant"] == variant:
+                candidates.append(entry_id)
+
+        if candidates:
+            matrix = np.stack([self._entries[entry_id]["embedding"] for entry_id in candidates])
+            similarities = matrix @ self._normalize(question_embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                entry_id = candidates[best]
+                self._entries.move_to_end(entry_id)
+                self._metrics["hits"] += 1
+                logger.debug("answer cache hit", repo_id=repo_id,
+                             similarity=round(float(similarities[best]), 4))
+                return self._entries[entry_id]["response"]
+
+        self._metrics["misses"] += 1
+        return None
+
+    def store(self, repo_id: int, version: str, variant: Tuple,
+              question_embedding: np.ndarray, response: AnalysisResponse):
+        entry_id = next(self._ids)
+        self._entries[entry_id] = {
+            "repo_id": repo_id,
+            "version": version,
+            "variant": variant,
+            "embedding": self._normalize(question_embedding),
+            "response": response,
+            "stored_at": time.monotonic()
+        }
+        self._by_repo.setdefault(repo_id, set()).add(entry_id)
+        self._metrics["stores"] += 1
+
+        while len(self._entries) > self.max_entries:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+            self._metrics["evictions"] += 1
+
+    def invalidate_repo(self, repo_id: int):
+        entry_ids = self._by_repo.pop(repo_id, set())
+        for entry_id in entry_ids:
+            self._entries.pop(entry_id, None)
+        if entry_ids:
+            self._metrics["invalidations"] += len(entry_ids)
+            logger.debug("answer cache invalidated", repo_id=repo_id, entries=len(entry_ids))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._metrics["hits"] + self._metrics["misses"]
+        return {
+            **self._metrics,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(self._metrics["hits"] / lookups, 4) if lookups else 0.0
+        }
+
+answer_cache = AnswerCache()
@@ -0,0 +1,100 @@
+"""backend selection for external dependencies (LLM, embeddings, GitHub, storage).
+
+everything that talks to Gemini, sentence-transformers, the GitHub API or Supabase
+is built here, so LLM_BACKEND / EMBEDDING_BACKEND / GITHUB_BACKEND / STORAGE_BACKEND
+can swap in the deterministic fakes from fake_backends without touching callers.
+STORAGE_BACKEND=sqlite selects the embedded local database instead of Supabase.
+"""
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.supabase_service import SupabaseService
+from app.services.github_service import Github_service
+from datetime import timedelta
+
+logger = get_logger(__name__)
+
+FAKE = "fake"
+SQLITE = "sqlite"
+
+def is_fake(backend: str) -> bool:
+    return backend.lower() == FAKE
+
+def is_sqlite(backend: str) -> bool:
+    return backend.lower() == SQLITE
+
+def create_storage_service() -> SupabaseService:
+    if is_fake(settings.STORAGE_BACKEND):
+        from app.services.fake_backends import FakeSupabaseService
+        return FakeSupabaseService()
+    if is_sqlite(settings.STORAGE_BACKEND):
+        from app.core.sqlite import SqliteManager
+        from app.services.sqlite_service import SqliteService
+        return SqliteService(SqliteManager.get_database())
+    from app.core.supabase import get_async_supabase
+    return SupabaseService(get_async_supabase())
+
+def create_github_service() -> Github_service:
+    if is_fake(settings.GITHUB_BACKEND):
+        from app.services.fake_backends import FakeGithubService
+        return FakeGithubService()
+    return Github_service()
+
+def create_generative_model(model_name: str, max_tokens: int, temperature: float):
+    if is_fake(settings.LLM_BACKEND):
+        from app.services.fake_backends import FakeGenerativeModel
+        return FakeGenerativeModel(model_name)
+    import google.generativeai as genai
+
+    if not settings.GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY is required")
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    return genai.GenerativeModel(
+        model_name=model_name,
+        generation_config=genai.types.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature
+        )
+    )
+
+def cache_min_tokens(model) -> int:
+    #providers refuse cached contents below a minimum size
+    return getattr(model, "min_cache_tokens", settings.PROMPT_CACHE_MIN_TOKENS)
+
+def create_cached_model(model, model_name: str, prefix: str, ttl_seconds: int,
+                        max_tokens: int, temperature: float):
+    """model bound to a provider-side cache of `prefix`, or None if caching is unavailable"""
+    if hasattr(model, "create_cached_content"):
+        return model.create_cached_content(prefix, ttl_seconds)
+    import google.generativeai as genai
+
+    caching = getattr(genai, "caching", None)
+    if caching is None:
+        #context caching needs google-generativeai>=0.7
+        return None
+    cached = caching.CachedContent.create(
+        model=f"models/{model_name}",
+        contents=[prefix],
+        ttl=timedelta(seconds=ttl_seconds)
+    )
+    return genai.GenerativeModel.from_cached_content(
+        cached,
+        generation_config=genai.types.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature
+        )
+    )
+
+def create_embedding_model(model_name: str):
+    if is_fake(settings.EMBEDDING_BACKEND):
+        from app.services.fake_backends import FakeEmbeddingModel
+        return FakeEmbeddingModel()
+    #imported lazily, torch takes seconds to load
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def create_cross_encoder(model_name: str):
+    if is_fake(settings.EMBEDDING_BACKEND):
+        from app.services.fake_backends import FakeCrossEncoder
+        return FakeCrossEncoder()
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name)
@@ -0,0 +1,107 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from collections import deque
+from typing import Optional, Dict, Any
+import time
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """raised instead of calling a dependency whose circuit is open"""
+
+class CircuitBreaker:
+    """rolling-window circuit breaker.
+
+    errors and calls slower than `slow_call_ms` both count as failures. once the
+    failure rate over the last `window` calls reaches `failure_rate` the circuit
+    opens and calls fail fast. after `reset_seconds` a limited number of half-open
+    probes are let through; one success closes the circuit, one failure reopens it.
+    """
+
+    def __init__(self, name: str, window: Optional[int] = None, min_calls: Optional[int] = None,
+                 failure_rate: Optional[float] = None, slow_call_ms: Optional[int] = None,
+                 reset_seconds: Optional[float] = None, half_open_probes: Optional[int] = None):
+        self.name = name
+        self.window = window or settings.CIRCUIT_WINDOW
+        self.min_calls = min_calls or settings.CIRCUIT_MIN_CALLS
+        self.failure_rate = failure_rate or settings.CIRCUIT_FAILURE_RATE
+        self.slow_call_ms = slow_call_ms or settings.CIRCUIT_SLOW_CALL_MS
+        self.reset_seconds = reset_seconds or settings.CIRCUIT_RESET_SECONDS
+        self.half_open_probes = half_open_probes or settings.CIRCUIT_HALF_OPEN_PROBES
+
+        self._state = CLOSED
+        self._outcomes: deque = deque(maxlen=self.window)
+        self._opened_at: Optional[float] = None
+        self._probes_in_flight = 0
+        self._metrics = {"opened": 0, "rejected": 0, "slow_calls": 0, "failures": 0, "successes": 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str):
+        if state == self._state:
+            return
+        logger.warning("circuit state changed", circuit=self.name, previous=self._state, state=state)
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._metrics["opened"] += 1
+        elif state == CLOSED:
+            self._outcomes.clear()
+        self._probes_in_flight = 0
+
+    def before_call(self):
+        state = self.state
+        if state == OPEN:
+            self._metrics["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self._metrics["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} circuit is half-open, probe in flight")
+            self._probes_in_flight += 1
+
+    def release(self):
+        #call abandoned without an outcome (e.g. client disconnected), free its probe slot
+        if self._state == HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    def record_success(self, duration_ms: float):
+        if duration_ms > self.slow_call_ms:
+            self._metrics["slow_calls"] += 1
+            self.record_failure()
+            return
+        self._metrics["successes"] += 1
+        if self._state == HALF_OPEN:
+            self._transition(CLOSED)
+            return
+        self._outcomes.append(True)
+
+    def record_failure(self):
+        self._metrics["failures"] += 1
+        if self._state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        self._outcomes.append(False)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            **self._metrics,
+            "state": state,
+            "window_calls": len(self._outcomes),
+            "window_failures": self._outcomes.count(False),
+            "open_for_seconds": round(time.monotonic() - self._opened_at, 2) if state != CLOSED and self._opened_at else 0.0
+        }
+
+llm_breaker = CircuitBreaker("llm")
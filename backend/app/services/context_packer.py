@@ -0,0 +1,107 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.embedding import EmbeddingResult
+from typing import List, Optional, Tuple, Dict
+import math
+import posixpath
+
+logger = get_logger(__name__)
+
+#rough average for English prose and code identifiers with Gemini-style tokenizers
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+def truncate_message(message: str, max_chars: int) -> str:
+    """keep the subject line whole and as much of the body as fits"""
+    message = message.strip()
+    if len(message) <= max_chars:
+        return message
+    subject, _, body = message.partition("\n")
+    if len(subject) >= max_chars:
+        return subject[:max_chars].rstrip() + "..."
+    body = " ".join(body.split())
+    room = max_chars - len(subject) - 4
+    if room <= 0 or not body:
+        return subject
+    return f"{subject}\n{body[:room].rstrip()}..."
+
+def compress_paths(files: List[str], max_groups: int = 4) -> str:
+    """group files by directory: src/api/{a.py,b.py}, README.md (+N more files)"""
+    groups: Dict[str, List[str]] = {}
+    for path in files:
+        directory, name = posixpath.split(path)
+        groups.setdefault(directory, []).append(name)
+
+    #biggest directories first, they say the most about where the change landed
+    ordered = sorted(groups.items(), key=lambda item: len(item[1]), reverse=True)
+    parts = []
+    for directory, names in ordered[:max_groups]:
+        if len(names) == 1:
+            parts.append(posixpath.join(directory, names[0]))
+        else:
+            shown = names[:4]
+            more = f",+{len(names) - 4}" if len(names) > 4 else ""
+            parts.append(f"{directory}/{{{','.join(shown)}{more}}}" if directory else f"{{{','.join(shown)}{more}}}")
+
+    hidden = sum(len(names) for _, names in ordered[max_groups:])
+    if hidden:
+        parts.append(f"+{hidden} more files")
+    return ", ".join(parts)
+
+class ContextPacker:
+    """packs retrieved commits into a prompt section under an input-token budget"""
+
+    def __init__(self, token_budget: Optional[int] = None, message_max_chars: Optional[int] = None):
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        self.message_max_chars = message_max_chars or settings.CONTEXT_MESSAGE_MAX_CHARS
+
+    def format_commit(self, index: int, commit: EmbeddingResult, compact: bool = False) -> str:
+        if compact:
+            #subject line only, used when the full entry no longer fits
+            subject = commit.message.strip().split("\n", 1)[0]
+            return (f"Commit {index}: {commit.sha[:12]} by {commit.author} "
+                    f"on {commit.commit_date.strftime('%Y-%m-%d')}: {truncate_message(subject, 120)}")
+
+        commit_info = [
+            f"Commit {index}:",
+            f"  SHA: {commit.sha}",
+            f"  Author: {commit.author}",
+            f"  Date: {commit.commit_date.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"  Message: {truncate_message(commit.message, self.message_max_chars)}",
+            f"  Similarity Score: {commit.similarity_score:.2f}",
+            f"  Changes: +{commit.additions} -{commit.deletions}",
+        ]
+        if commit.files_changed:
+            commit_info.append(f"  Files: {compress_paths(commit.files_changed)}")
+        return "\n".join(commit_info)
+
+    def pack(self, commits: List[EmbeddingResult]) -> Tuple[str, List[EmbeddingResult]]:
+        """greedily pack commits in the order retrieval ranked them.
+
+        the incoming order is kept as-is, it already reflects rerank/MMR and the raw
+        similarity score does not. a commit that does not fit in full is retried in
+        compact form before it is dropped. returns the context text and the commits
+        that made it in.
+        """
+        parts: List[str] = []
+        packed: List[EmbeddingResult] = []
+        used = 0
+
+        for commit in commits:
+            index = len(packed) + 1
+            for compact in (False, True):
+                entry = self.format_commit(index, commit, compact=compact)
+                #+1 for the blank line separating entries
+                cost = estimate_tokens(entry) + 1
+                if used + cost <= self.token_budget:
+                    parts.append(entry)
+                    packed.append(commit)
+                    used += cost
+                    break
+
+        if len(packed) < len(commits):
+            logger.debug("context budget reached", packed=len(packed), dropped=len(commits) - len(packed),
+                         budget=self.token_budget, used=used)
+        return "\n\n".join(parts), packed
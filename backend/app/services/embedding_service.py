@@ -1,10 +1,13 @@
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.projections import EXISTENCE
 from app.models.embedding import Embeddings, EmbeddingResult
 from app.models.commit import Commit
 from app.services.supabase_service import SupabaseService
-from sentence_transformers import SentenceTransformer
-from supabase import Client
+from app.services.answer_cache import answer_cache
+from app.services.stats_service import repo_stats
+from app.services.progress import progress_bus
+from app.services.backends import create_embedding_model
 from typing import Optional, List, Dict, Any
 import numpy as np
 import asyncio
@@ -12,10 +15,48 @@ from datetime import datetime, timezone
 
 logger=get_logger(__name__)
 
+def commit_text(message: str, files_changed: List[str]) -> str:
+    #what gets embedded for a commit
+    return f"{message} {' '.join(files_changed[:5])}"
+
+def mmr_select(relevance: np.ndarray, vectors: np.ndarray, k: int, diversity: float) -> List[int]:
+    """greedy maximal-marginal-relevance selection.
+
+    relevance is each candidate's similarity to the query and vectors holds one
+    embedding per row. pairwise similarity is computed once as a single matrix
+    product; each step then only updates a running max-similarity vector.
+    returns row indices in selection order.
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    k = min(k, n)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    normalized = vectors / np.where(norms == 0, 1.0, norms)
+    pairwise = normalized @ normalized.T
+
+    weight = 1.0 - diversity
+    available = np.ones(n, dtype=bool)
+    first = int(np.argmax(relevance))
+    selected = [first]
+    available[first] = False
+    max_similarity = pairwise[first].copy()
+
+    while len(selected) < k:
+        scores = weight * relevance - diversity * max_similarity
+        scores[~available] = -np.inf
+        idx = int(np.argmax(scores))
+        selected.append(idx)
+        available[idx] = False
+        np.maximum(max_similarity, pairwise[idx], out=max_similarity)
+
+    return selected
+
 class EmbeddingService:
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_service: SupabaseService):
     
-        self.supabase_service = SupabaseService(supabase_client)
+        self.supabase_service = supabase_service
         self.model = None 
         self.model_name = settings.EMBEDDING_MODEL
     
@@ -23,7 +64,7 @@ class EmbeddingService:
         #lazy load the embedding model
         if self.model is None:
             logger.info("Loading embedding model", model=self.model_name)
-            self.model = SentenceTransformer(self.model_name)
+            self.model = create_embedding_model(self.model_name)
             logger.info("Embedding model loaded successfully")
     
     async def create_embeddings(self, texts: List[str]) -> np.ndarray:
@@ -44,7 +85,7 @@ class EmbeddingService:
     
     async def embed_commit_message(self, commit: Commit) -> Embeddings:
         #create embedding for commit message
-        text_content = f"{commit.message} {' '.join(commit.files_changed[:5])}"
+        text_content = commit_text(commit.message, commit.files_changed)
         
         embeddings = await self.create_embeddings([text_content])
         
@@ -65,8 +106,7 @@ class EmbeddingService:
         
         texts = []
         for commit in commits:
-            text_content = f"{commit.message} {' '.join(commit.files_changed[:5])}"
-            texts.append(text_content)
+            texts.append(commit_text(commit.message, commit.files_changed))
         
         embeddings_array = await self.create_embeddings(texts)
         
@@ -104,6 +144,7 @@ class EmbeddingService:
                 return True
             
             logger.info("Commits to embed", repo_id=repo_id, count=len(commits_to_embed))
+            progress_bus.stage(repo_id, "embedding", total=len(commits_to_embed))
             
             batch_size = 50
             total_embedded = 0
@@ -115,8 +156,10 @@ class EmbeddingService:
                     embeddings = await self.embed_commitBatch(batch)
                     for embedding in embeddings:
                         await self.supabase_service.store_embedding(embedding)
+                        repo_stats.record_embeddings(repo_id, 1)
                     
                     total_embedded += len(embeddings)
+                    progress_bus.advance(repo_id, embedded=total_embedded)
                     
                     logger.info("Batch processed", repo_id=repo_id, 
                               batch=i//batch_size + 1, embedded=len(embeddings))
@@ -126,6 +169,8 @@ class EmbeddingService:
                                batch=i//batch_size + 1, error=str(e))
                     continue
             
+            if total_embedded:
+                answer_cache.invalidate_repo(repo_id)
             logger.info("embedding indexing completed", 
                        repo_id=repo_id, total_embedded=total_embedded)
             return True
@@ -135,16 +180,25 @@ class EmbeddingService:
             return False
     
     async def similar_commits(self,query: str, repo_id: int, 
-                                   limit: int = 10, threshold: float = 0.7) -> List[EmbeddingResult]:
+                                   limit: int = 10, threshold: float = 0.7,
+                                   diversity: float = 0.0,
+                                   query_embedding: Optional[np.ndarray] = None) -> List[EmbeddingResult]:
         try:
             logger.info("searching similar commits", repo_id=repo_id, query_length=len(query))
             
-            query_embeddings =await self.create_embeddings([query])
-            query_embedding = query_embeddings[0].tolist()
+            #callers that already encoded the query (answer cache) pass it in
+            if query_embedding is None:
+                query_embeddings =await self.create_embeddings([query])
+                query_embedding = query_embeddings[0]
+            query_embedding = np.asarray(query_embedding).tolist()
             
-            similar_commits = await self.supabase_service.search_similar_commits(
-                query_embedding, repo_id, limit, threshold
+            #over-fetch so MMR has near-duplicates to choose between
+            fetch_limit = limit * settings.MMR_CANDIDATE_FACTOR if diversity > 0 else limit
+            similar_commits = await self.supabase_service.search_similarCommits(
+                query_embedding, repo_id, fetch_limit, threshold
             )
+            if diversity > 0 and len(similar_commits) > limit:
+                similar_commits = await self.diversify(similar_commits, limit, diversity)
             
             # Convert to EmbeddingResult objects
             results = []
@@ -156,7 +210,9 @@ class EmbeddingService:
                     author=commit_data["author"],
                     commit_date=datetime.fromisoformat(commit_data["commit_date"]),
                     similarity_score=commit_data["similarity"],
-                    files_changed=commit_data["files_changed"] or []
+                    files_changed=commit_data["files_changed"] or [],
+                    additions=commit_data.get("additions") or 0,
+                    deletions=commit_data.get("deletions") or 0
                 )
                 results.append(result)
             
@@ -166,6 +222,30 @@ class EmbeddingService:
             logger.error("Error searching similar commits", repo_id=repo_id, error=str(e))
             return []
     
+    async def diversify(self, candidates: List[Dict[str, Any]], limit: int,
+                        diversity: float) -> List[Dict[str, Any]]:
+        #maximal marginal relevance over the candidate rows
+        vectors = await self.supabase_service.get_commit_embeddings(
+            [row["commit_id"] for row in candidates]
+        )
+        if not vectors:
+            logger.warning("no candidate vectors for MMR, keeping relevance order")
+            return candidates[:limit]
+
+        dimension = len(next(iter(vectors.values())))
+        #candidates without a stored vector get a zero row, i.e. no redundancy penalty
+        matrix = np.zeros((len(candidates), dimension), dtype=np.float32)
+        for i, row in enumerate(candidates):
+            vector = vectors.get(row["commit_id"])
+            if vector is not None:
+                matrix[i] = vector
+        relevance = np.array([row["similarity"] for row in candidates], dtype=np.float32)
+
+        selected = mmr_select(relevance, matrix, limit, diversity)
+        logger.debug("MMR selection", candidates=len(candidates), selected=len(selected),
+                     diversity=diversity)
+        return [candidates[i] for i in selected]
+
     async def get_embedding_stats(self, repo_id: int) -> Dict[str, Any]:
         try:
             stats = await self.supabase_service.get_repository_stats(repo_id)
@@ -186,7 +266,8 @@ class EmbeddingService:
         try:
             logger.info("Deleting repository embeddings", repo_id=repo_id)
             
-            commits =await self.supabase_service.get_commits(repo_id)
+            #ids and embedding ids are all this needs
+            commits =await self.supabase_service.get_commits(repo_id, projection=EXISTENCE)
             
             if not commits:
                 logger.info("no commits found for repository", repo_id=repo_id)
@@ -199,6 +280,7 @@ class EmbeddingService:
                     if success:
                         deleted_count +=1
             
+            repo_stats.record_embeddings(repo_id, -deleted_count)
             logger.info("repository embeddings deleted", repo_id=repo_id, 
                        deleted=deleted_count)
             return True
@@ -0,0 +1,584 @@
+"""deterministic in-process stand-ins for Gemini, GitHub, Supabase and the embedding models.
+
+selected through the *_BACKEND settings. content is a pure function of the input
+(same prompt, same answer; same repo url, same commits), while latency, errors and
+payload sizes are drawn from seeded distributions configured by the FAKE_* settings.
+"""
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import db_metrics, payload_bytes
+from app.core.projections import LIST_ROW, COMMIT_CARD, FULL, column_names
+from app.models.repo import Repo, RepoStatus
+from app.models.commit import Commit
+from app.models.embedding import Embeddings
+from app.services.supabase_service import SupabaseService, commit_from_row
+from app.services.repo_cache import repo_cache
+from app.services.stats_service import repo_stats
+from app.services.github_service import Github_service
+from typing import Optional, List, Dict, Any, Iterator, Callable, Tuple
+from datetime import datetime, timezone, timedelta
+import numpy as np
+import asyncio
+import hashlib
+import itertools
+import random
+import re
+import threading
+import time
+
+logger = get_logger(__name__)
+
+WORDS = [
+    "refactor", "fix", "add", "remove", "update", "improve", "optimize", "handle", "support",
+    "parser", "cache", "router", "schema", "client", "worker", "config", "logging", "tests",
+    "function", "class", "method", "pattern", "architecture", "design", "implementation",
+    "bug", "feature", "enhancement", "security", "performance", "validation", "timeout",
+    "retry", "pagination", "embedding", "index", "query", "migration", "endpoint", "build"
+]
+PATHS = [
+    "src/api/routes.py", "src/api/schemas.py", "src/core/config.py", "src/core/cache.py",
+    "src/services/search.py", "src/services/indexer.py", "src/models/user.py",
+    "tests/test_api.py", "tests/test_search.py", "docs/README.md", "frontend/app/page.tsx",
+    "frontend/components/list.tsx", "scripts/deploy.sh", "pyproject.toml"
+]
+AUTHORS = [("Ada Lovelace", "ada@example.com"), ("Grace Hopper", "grace@example.com"),
+           ("Alan Turing", "alan@example.com"), ("Linus Torvalds", "linus@example.com")]
+
+class FakeProfile:
+    """seeded latency / error / payload-size distributions shared by every fake"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self._rng = random.Random(settings.FAKE_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+
+    def latency(self, median_ms: float) -> float:
+        #lognormal around the median, FAKE_LATENCY_SIGMA=0 gives a constant delay
+        if median_ms <= 0:
+            return 0.0
+        with self._lock:
+            factor = self._rng.lognormvariate(0.0, settings.FAKE_LATENCY_SIGMA) if settings.FAKE_LATENCY_SIGMA > 0 else 1.0
+        return median_ms * factor / 1000
+
+    def should_fail(self) -> bool:
+        if settings.FAKE_ERROR_RATE <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < settings.FAKE_ERROR_RATE
+
+    def size(self, mean: int) -> int:
+        with self._lock:
+            factor = self._rng.lognormvariate(0.0, settings.FAKE_PAYLOAD_SIGMA) if settings.FAKE_PAYLOAD_SIGMA > 0 else 1.0
+        return max(1, int(mean * factor))
+
+    def block(self, median_ms: float, what: str):
+        #for fakes called on worker threads
+        time.sleep(self.latency(median_ms))
+        if self.should_fail():
+            raise Exception(f"fake {what} error")
+
+    async def wait(self, median_ms: float, what: str):
+        await asyncio.sleep(self.latency(median_ms))
+        if self.should_fail():
+            raise Exception(f"fake {what} error")
+
+fake_profile = FakeProfile()
+
+def seeded_rng(*parts: Any) -> random.Random:
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+#--- LLM ---------------------------------------------------------------------
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeGenerativeModel:
+    """duck-types google.generativeai.GenerativeModel.generate_content"""
+    min_cache_tokens = 0
+
+    def __init__(self, model_name: str = "fake-llm"):
+        self.model_name = model_name
+        self.cached_contents = 0
+
+    def _answer(self, prompt: str) -> str:
+        if "Respond with 'OK'" in prompt:
+            return "OK"
+        rng = seeded_rng(self.model_name, prompt)
+        if "SUGGESTED QUESTIONS" in prompt:
+            return "\n".join(
+                f"{i}. How did the {rng.choice(WORDS)} {rng.choice(WORDS)} change over time?"
+                for i in range(1, 5)
+            )
+        #echo a few SHAs so answers look like they reference the context
+        shas = re.findall(r"\b[0-9a-f]{40}\b", prompt)[:3]
+        target = fake_profile.size(settings.FAKE_LLM_RESPONSE_CHARS)
+        words = []
+        length = 0
+        while length < target:
+            word = rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        if shas:
+            words += ["see"] + [sha[:8] for sha in shas]
+        return " ".join(words).capitalize() + "."
+
+    def generate_content(self, prompt: str, stream: bool = False, latency_ms: Optional[float] = None):
+        fake_profile.block(settings.FAKE_LLM_LATENCY_MS if latency_ms is None else latency_ms, "llm")
+        text = self._answer(prompt)
+        if not stream:
+            return FakeResponse(text)
+        return self._stream(text)
+
+    def create_cached_content(self, prefix: str, ttl_seconds: int) -> "FakeCachedModel":
+        fake_profile.block(settings.FAKE_LLM_LATENCY_MS / 4, "llm cache")
+        self.cached_contents += 1
+        return FakeCachedModel(self, prefix)
+
+    def _stream(self, text: str) -> Iterator[FakeResponse]:
+        chunk_size = 40
+        for i in range(0, len(text), chunk_size):
+            time.sleep(fake_profile.latency(settings.FAKE_LLM_LATENCY_MS) / 20)
+            yield FakeResponse(text[i:i + chunk_size])
+
+class FakeCachedModel:
+    """fake model bound to a cached prefix, answers exactly as the uncached prompt would"""
+
+    def __init__(self, model: FakeGenerativeModel, prefix: str):
+        self.model = model
+        self.prefix = prefix
+
+    def generate_content(self, suffix: str, stream: bool = False):
+        #about half the latency is prefill, which only has to cover the suffix now
+        share = len(suffix) / max(1, len(self.prefix) + len(suffix))
+        latency_ms = settings.FAKE_LLM_LATENCY_MS * (0.5 + 0.5 * share)
+        return self.model.generate_content(self.prefix + suffix, stream=stream, latency_ms=latency_ms)
+
+#--- embeddings --------------------------------------------------------------
+
+class FakeEmbeddingModel:
+    """hashed bag-of-words vectors, so texts sharing words land close together"""
+
+    def __init__(self, dimension: Optional[int] = None):
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+        self._common = np.zeros(self.dimension, dtype=np.float32)
+        self._common[0] = 1.0
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "big") % self.dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        #shared component keeps unrelated texts around 0.75 cosine, roughly where real
+        #sentence embeddings sit, so the default 0.7 threshold still returns results
+        vector = np.sqrt(0.25) * vector + np.sqrt(0.75) * self._common
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        fake_profile.block(settings.FAKE_EMBEDDING_LATENCY_MS, "embedding")
+        return np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+
+class FakeCrossEncoder:
+    """token-overlap relevance in place of a cross-encoder"""
+
+    def predict(self, pairs: List[tuple], **kwargs) -> List[float]:
+        fake_profile.block(settings.FAKE_EMBEDDING_LATENCY_MS, "rerank")
+        scores = []
+        for query, text in pairs:
+            query_tokens = set(re.findall(r"[a-z0-9]+", query.lower()))
+            text_tokens = set(re.findall(r"[a-z0-9]+", text.lower()))
+            union = query_tokens | text_tokens
+            scores.append(len(query_tokens & text_tokens) / len(union) if union else 0.0)
+        return scores
+
+#--- GitHub ------------------------------------------------------------------
+
+class FakeGithubService(Github_service):
+    """generates repository metadata and commit history from the repo url"""
+
+    def __init__(self):
+        self.base_url = "fake://github"
+        self.headers = {}
+        logger.info("github service initialized (fake backend)")
+
+    async def get_repoInfo(self, repo_url: str) -> Dict:
+        owner, repo = self.github_url(repo_url)
+        await fake_profile.wait(settings.FAKE_GITHUB_LATENCY_MS, "github")
+        rng = seeded_rng("repo", owner, repo)
+        return {
+            "name": repo,
+            "owner": owner,
+            "description": f"Fake repository {owner}/{repo}",
+            "default_branch": "main",
+            "github_id": rng.randint(1, 10 ** 9),
+            "stars": rng.randint(0, 50000),
+            "forks": rng.randint(0, 5000),
+            "language": rng.choice(["Python", "TypeScript", "Go", "Rust"]),
+            "is_private": False
+        }
+
+    def fake_commit(self, owner: str, repo: str, index: int, anchor: datetime) -> Dict:
+        sha = hashlib.sha1(f"{owner}/{repo}:{index}".encode("utf-8")).hexdigest()
+        rng = seeded_rng("commit", sha)
+        author, email = rng.choice(AUTHORS)
+        subject = f"{rng.choice(WORDS[:9])} {rng.choice(WORDS[9:])} {rng.choice(WORDS[9:])}"
+        body_words = fake_profile.size(settings.FAKE_COMMIT_MESSAGE_CHARS) // 8
+        body = " ".join(rng.choice(WORDS) for _ in range(body_words))
+        return {
+            "sha": sha,
+            "message": f"{subject}\n\n{body}" if body else subject,
+            "author": author,
+            "author_email": email,
+            "commit_date": anchor - timedelta(hours=index * 7 + rng.randint(0, 6)),
+            "additions": rng.randint(0, 400),
+            "deletions": rng.randint(0, 200),
+            "files_changed": rng.sample(PATHS, rng.randint(1, 5))
+        }
+
+    async def get_commits(self, repo_url: str, max_commits: int = 100,
+                          on_progress: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        owner, repo = self.github_url(repo_url)
+        count = min(max_commits, settings.FAKE_COMMITS_PER_REPO)
+        #anchored to today so "last N days" windows always have data
+        anchor = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        commits = []
+        for page_start in range(0, count, 100):
+            await fake_profile.wait(settings.FAKE_GITHUB_LATENCY_MS, "github")
+            for index in range(page_start, min(page_start + 100, count)):
+                commits.append(self.fake_commit(owner, repo, index, anchor))
+            if on_progress:
+                on_progress(len(commits))
+        logger.info("fake commit fetch completed", owner=owner, repo=repo, total_commits=len(commits))
+        return commits
+
+    async def get_commitDiff(self, repo_url: str, sha: str) -> Optional[str]:
+        await fake_profile.wait(settings.FAKE_GITHUB_LATENCY_MS, "github")
+        return f"diff --git a/{PATHS[0]} b/{PATHS[0]}\n+fake change for {sha[:8]}\n"
+
+    async def get_rateLimit(self) -> Dict:
+        return {"rate": {"limit": 5000, "remaining": 5000, "reset": 0}}
+
+    async def search_repo(self, query: str, limit: int = 10) -> List[Dict]:
+        await fake_profile.wait(settings.FAKE_GITHUB_LATENCY_MS, "github")
+        return [{"full_name": f"fake/{query}-{i}", "stargazers_count": 0} for i in range(limit)]
+
+#--- storage -----------------------------------------------------------------
+
+class FakeStore:
+    """process-wide in-memory tables"""
+
+    def __init__(self):
+        self.repositories: Dict[int, Dict[str, Any]] = {}
+        self.commits: Dict[int, Dict[str, Any]] = {}
+        self.embeddings: Dict[int, Dict[str, Any]] = {}
+        self.analyses: Dict[int, Dict[str, Any]] = {}
+        self.leases: Dict[str, Dict[str, Any]] = {}
+        self.ids = {name: itertools.count(1) for name in ("repositories", "commits", "embeddings", "analyses")}
+
+    def reset(self):
+        self.__init__()
+
+fake_store = FakeStore()
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def project(table: str, row: Dict[str, Any], projection: str) -> Dict[str, Any]:
+    #copy of the row with only the columns the projection selects
+    columns = column_names(table, projection)
+    if columns is None:
+        return dict(row)
+    return {column: row[column] for column in columns if column in row}
+
+
+class FakeSupabaseService(SupabaseService):
+    """SupabaseService over in-memory tables, same method contract"""
+
+    def __init__(self, store: Optional[FakeStore] = None):
+        super().__init__(None)
+        self.store = store or fake_store
+
+    async def _io(self, op: str, payload: Any = None):
+        #same per-operation metrics as the real data layer, payload is what a read sends back
+        start = time.perf_counter()
+        try:
+            await fake_profile.wait(settings.FAKE_STORAGE_LATENCY_MS, "storage")
+        except Exception:
+            db_metrics.record(op, (time.perf_counter() - start) * 1000, error=True)
+            raise
+        db_metrics.record(op, (time.perf_counter() - start) * 1000, nbytes=payload_bytes(payload))
+
+    async def create_repo(self, repo_data: Dict[str, Any]) -> Repo:
+        await self._io("create_repo")
+        repo_id = next(self.store.ids["repositories"])
+        row = {**repo_data, "id": repo_id, "created_at": now_iso(), "updated_at": now_iso()}
+        self.store.repositories[repo_id] = row
+        logger.info("repository created", repo_id=repo_id)
+        repo = Repo(**row)
+        repo_cache.put(repo_id, repo, publish=True)
+        repo_stats.record_repo_created()
+        return repo
+
+    async def get_repoURL(self, url: str, projection: str = FULL) -> Optional[Repo]:
+        rows = [project("repositories", row, projection)
+                for row in self.store.repositories.values() if row["url"] == str(url)]
+        await self._io("get_repoURL", rows)
+        return Repo(**rows[0]) if rows else None
+
+    async def fetch_repo(self, repo_id: int, projection: str = FULL) -> Optional[Repo]:
+        row = self.store.repositories.get(repo_id)
+        row = project("repositories", row, projection) if row else None
+        await self._io("get_repo" if projection == FULL else f"get_repo:{projection}", [row] if row else [])
+        return Repo(**row) if row else None
+
+    async def update_repoStatus(self, repo_id: int, status: RepoStatus, **kwargs) -> bool:
+        await self._io("update_repoStatus")
+        row = self.store.repositories.get(repo_id)
+        if row is None:
+            repo_cache.invalidate(repo_id)
+            return False
+        row.update({"status": status.value, "updated_at": now_iso(), **kwargs})
+        repo_cache.put(repo_id, Repo(**row), publish=True)
+        return True
+
+    async def delete_repo(self, repo_id: int) -> bool:
+        repo_cache.invalidate(repo_id)
+        await self._io("delete_repo")
+        if self.store.repositories.pop(repo_id, None) is None:
+            return False
+        commit_ids = [cid for cid, row in self.store.commits.items() if row["repository_id"] == repo_id]
+        for commit_id in commit_ids:
+            del self.store.commits[commit_id]
+            self.store.embeddings.pop(commit_id, None)
+        for analysis_id in [aid for aid, row in self.store.analyses.items() if row["repository_id"] == repo_id]:
+            del self.store.analyses[analysis_id]
+        repo_stats.record_repo_deleted(repo_id)
+        return True
+
+    async def list_repo(self, limit: int = None, offset: int = 0, projection: str = LIST_ROW) -> List[Repo]:
+        rows = sorted(self.store.repositories.values(),
+                      key=lambda row: (datetime.fromisoformat(row["created_at"]), row["id"]), reverse=True)
+        rows = rows[offset:offset + limit] if limit else rows[offset:]
+        rows = [project("repositories", row, projection) for row in rows]
+        await self._io("list_repo", rows)
+        return [Repo(**row) for row in rows]
+
+    async def list_repo_page(self, limit: int, after: Optional[tuple] = None,
+                             projection: str = LIST_ROW) -> List[Repo]:
+        def key(row):
+            return (datetime.fromisoformat(row["created_at"]), row["id"])
+        rows = sorted(self.store.repositories.values(), key=key, reverse=True)
+        if after:
+            bound = (datetime.fromisoformat(after[0]), int(after[1]))
+            rows = [row for row in rows if key(row) < bound]
+        rows = [project("repositories", row, projection) for row in rows[:limit]]
+        await self._io("list_repo_page", rows)
+        return [Repo(**row) for row in rows]
+
+    async def count_repos(self) -> int:
+        await self._io("count_repos")
+        return len(self.store.repositories)
+
+    async def _upsert_commit_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        await self._io("store_commits")
+        existing = {(row["repository_id"], row["sha"]) for row in self.store.commits.values()}
+        inserted = []
+        for row in batch:
+            if (row["repository_id"], row["sha"]) in existing:
+                continue
+            existing.add((row["repository_id"], row["sha"]))
+            row = {**row, "id": next(self.store.ids["commits"]), "embedding_id": None}
+            self.store.commits[row["id"]] = row
+            inserted.append(dict(row))
+        return inserted
+
+    def _repo_commits(self, repo_id: int) -> List[Dict[str, Any]]:
+        return [row for row in self.store.commits.values() if row["repository_id"] == repo_id]
+
+    async def get_commits(self, repo_id: int, limit: int = 100, offset: int = 0,
+                          projection: str = COMMIT_CARD) -> List[Commit]:
+        rows = sorted(self._repo_commits(repo_id), key=lambda row: row["commit_date"], reverse=True)
+        rows = [project("commits", row, projection) for row in rows[offset:offset + limit]]
+        await self._io("get_commits", rows)
+        return [commit_from_row(row, projection) for row in rows]
+
+    async def get_commit_page(self, repo_id: int, after_id: int = 0, limit: int = 1000,
+                              projection: str = COMMIT_CARD) -> List[Commit]:
+        rows = sorted((row for row in self._repo_commits(repo_id) if row["id"] > after_id), key=lambda row: row["id"])
+        rows = [project("commits", row, projection) for row in rows[:limit]]
+        await self._io("get_commit_page", rows)
+        return [commit_from_row(row, projection) for row in rows]
+
+    async def get_commits_since(self, repo_id: int, since: datetime, page_size: int = 1000,
+                                max_commits: Optional[int] = None, projection: str = COMMIT_CARD) -> List[Commit]:
+        since_iso = since.isoformat()
+        rows = sorted((row for row in self._repo_commits(repo_id) if row["commit_date"] >= since_iso),
+                      key=lambda row: (row["commit_date"], row["id"]), reverse=True)
+        rows = [project("commits", row, projection) for row in reversed(rows[:max_commits])]
+        await self._io("get_commits_since", rows)
+        return [commit_from_row(row, projection) for row in rows]
+
+    async def get_commit_stat_rows(self, repo_id: int, page_size: int = 1000) -> List[Dict[str, Any]]:
+        await self._io("get_commit_stat_rows")
+        return [{"commit_date": row["commit_date"], "additions": row["additions"], "deletions": row["deletions"],
+                 "embedding_id": row["embedding_id"]} for row in self._repo_commits(repo_id)]
+
+    async def get_commit_by_sha(self, repo_id: int, sha: str, projection: str = FULL) -> Optional[Commit]:
+        rows = [project("commits", row, projection) for row in self._repo_commits(repo_id) if row["sha"] == sha]
+        await self._io("get_commit_by_sha", rows)
+        return commit_from_row(rows[0], projection) if rows else None
+
+    async def store_embedding(self, embedding: Embeddings) -> Embeddings:
+        await self._io("store_embedding")
+        embedding_id = next(self.store.ids["embeddings"])
+        row = {**embedding.model_dump(exclude={"id", "created_at"}), "id": embedding_id, "created_at": now_iso()}
+        #one embedding per commit, keyed by commit id
+        self.store.embeddings[embedding.commit_id] = row
+        commit = self.store.commits.get(embedding.commit_id)
+        if commit is not None:
+            commit["embedding_id"] = str(embedding_id)
+        return Embeddings(**row)
+
+    async def store_embeddings(self, repo_id: int, commit_ids: List[int], vectors: np.ndarray, model_name: str,
+                               text_contents: List[str], embedding_type: str = "commit_message") -> int:
+        await self._io("store_embeddings")
+        for commit_id, vector, text_content in zip(commit_ids, vectors, text_contents):
+            embedding_id = next(self.store.ids["embeddings"])
+            self.store.embeddings[int(commit_id)] = {
+                "id": embedding_id, "commit_id": int(commit_id), "embedding_vector": vector.tolist(),
+                "model_name": model_name, "text_content": text_content, "embedding_type": embedding_type,
+                "created_at": now_iso()
+            }
+            commit = self.store.commits.get(int(commit_id))
+            if commit is not None:
+                commit["embedding_id"] = str(embedding_id)
+        return len(commit_ids)
+
+    async def delete_embedding(self, commit_id: int) -> bool:
+        await self._io("delete_embedding")
+        commit = self.store.commits.get(commit_id)
+        if commit is not None:
+            commit["embedding_id"] = None
+        return self.store.embeddings.pop(commit_id, None) is not None
+
+    async def update_commit_embedding(self, commit_id: int, embedding_id: int) -> bool:
+        await self._io("update_commit_embedding")
+        commit = self.store.commits.get(commit_id)
+        if commit is None:
+            return False
+        commit["embedding_id"] = str(embedding_id)
+        return True
+
+    async def search_similarCommits(self, query_embedding: List[float], repo_id: int,
+                                    limit: int = 10, threshold: float = 0.7) -> List[Dict]:
+        await self._io("search_similarCommits")
+        rows = [row for row in self._repo_commits(repo_id) if row["id"] in self.store.embeddings]
+        if not rows:
+            return []
+        matrix = np.array([self.store.embeddings[row["id"]]["embedding_vector"] for row in rows], dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        similarities = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+        order = np.argsort(-similarities)
+        results = []
+        for idx in order[:limit]:
+            if similarities[idx] < threshold:
+                break
+            row = rows[idx]
+            results.append({
+                "commit_id": row["id"],
+                "sha": row["sha"],
+                "message": row["message"],
+                "author": row["author"],
+                "commit_date": row["commit_date"],
+                "similarity": float(similarities[idx]),
+                "files_changed": row["files_changed"],
+                "additions": row["additions"],
+                "deletions": row["deletions"]
+            })
+        return results
+
+    async def get_commit_embeddings(self, commit_ids: List[int]) -> Dict[int, List[float]]:
+        await self._io("get_commit_embeddings")
+        return {cid: self.store.embeddings[cid]["embedding_vector"]
+                for cid in commit_ids if cid in self.store.embeddings}
+
+    async def store_analyses(self, rows: List[Dict[str, Any]]) -> int:
+        await self._io("store_analyses")
+        for row in rows:
+            analysis_id = next(self.store.ids["analyses"])
+            self.store.analyses[analysis_id] = {**row, "id": analysis_id}
+        return len(rows)
+
+    async def get_analyses(self, repo_id: int, limit: int, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = sorted((dict(row) for row in self.store.analyses.values()
+                       if row["repository_id"] == repo_id and (before_id is None or row["id"] < before_id)),
+                      key=lambda row: row["id"], reverse=True)[:limit]
+        await self._io("get_analyses", rows)
+        return rows
+
+    async def count_analyses(self, repo_id: int) -> int:
+        await self._io("count_analyses")
+        return sum(1 for row in self.store.analyses.values() if row["repository_id"] == repo_id)
+
+    #leases, process-local so they only exclude work within this process
+    async def acquire_lease(self, key: str, holder: str, operation: str,
+                            ttl_seconds: float) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        await self._io("acquire_lease")
+        now = datetime.now(timezone.utc)
+        lease = self.store.leases.get(key)
+        if lease is None or lease["expires_at"] < now.isoformat() or lease["holder"] == holder:
+            lease = self.store.leases[key] = {
+                "key": key, "holder": holder, "operation": operation, "acquired_at": now.isoformat(),
+                "expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat()
+            }
+            return True, dict(lease)
+        return False, dict(lease)
+
+    async def renew_lease(self, key: str, holder: str, ttl_seconds: float) -> bool:
+        await self._io("renew_lease")
+        lease = self.store.leases.get(key)
+        if lease is None or lease["holder"] != holder:
+            return False
+        lease["expires_at"] = (datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)).isoformat()
+        return True
+
+    async def release_lease(self, key: str, holder: str) -> bool:
+        await self._io("release_lease")
+        lease = self.store.leases.get(key)
+        if lease is None or lease["holder"] != holder:
+            return False
+        del self.store.leases[key]
+        return True
+
+    async def get_lease(self, key: str) -> Optional[Dict[str, Any]]:
+        await self._io("get_lease")
+        lease = self.store.leases.get(key)
+        if lease is None or lease["expires_at"] < now_iso():
+            return None
+        return dict(lease)
+
+    async def get_repository_stats(self, repo_id: int) -> Dict[str, Any]:
+        await self._io("get_repository_stats")
+        rows = self._repo_commits(repo_id)
+        total_commits = len(rows)
+        total_embeddings = sum(1 for row in rows if row["id"] in self.store.embeddings)
+        return {
+            "total_commits": total_commits,
+            "total_embeddings": total_embeddings,
+            "embedding_progress": total_embeddings / total_commits if total_commits > 0 else 0.0,
+            "last_updated": now_iso()
+        }
+
+    async def get_global(self) -> Dict[str, Any]:
+        await self._io("get_global")
+        return {
+            "total_repositories": len(self.store.repositories),
+            "total_commits": len(self.store.commits),
+            "total_embeddings": len(self.store.embeddings),
+            "last_updated": now_iso()
+        }
@@ -3,7 +3,7 @@ from app.core.logging import get_logger
 from app.models.commit import Commit
 from datetime import datetime
 import httpx
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Callable
 from urllib.parse import urlparse
 
 logger= get_logger(__name__)
@@ -73,8 +73,9 @@ class Github_service:
                 "is_private": data.get("private", False)
             }
     
-    async def get_commits(self, repo_url: str, max_commits: int =100)-> List[Dict]:
-        #fetch commit history from github
+    async def get_commits(self, repo_url: str, max_commits: int =100,
+                          on_progress: Optional[Callable[[int], None]] = None)-> List[Dict]:
+        #fetch commit history from github, on_progress gets the running count
         owner, repo =self.github_url(repo_url)
 
         logger.info("starting commit fetch", owner=owner, repo= repo, max_commits= max_commits)
@@ -112,6 +113,8 @@ class Github_service:
                     commit_detail = await self.get_commitDetails(client, owner, repo, commit_data["sha"])
                     if commit_detail:
                         commits.append(commit_detail)
+                        if on_progress:
+                            on_progress(len(commits))
                 
                 page += 1
                 
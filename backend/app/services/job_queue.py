@@ -0,0 +1,378 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.sqlite import SqliteDatabase
+from app.models.job import Job, JobStatus, JOB_PRIORITY_NORMAL
+from app.services.progress import progress_bus
+from app.services.repo_lock import repo_locks
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+from datetime import datetime, timezone, timedelta
+import asyncio
+import json
+
+logger = get_logger(__name__)
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    repository_id INTEGER NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 5,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    run_after TEXT
+);
+-- one live job per kind and repository, enqueueing a duplicate returns the live one
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_live_idx ON jobs (kind, repository_id) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS jobs_queue_idx ON jobs (status, priority, id);
+CREATE INDEX IF NOT EXISTS jobs_repo_idx ON jobs (repository_id, id DESC);
+"""
+
+LIVE = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+def migrate_jobs(connection):
+    columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+    if "run_after" not in columns:
+        connection.execute("ALTER TABLE jobs ADD COLUMN run_after TEXT")
+
+#next queued job that is due, skipping repositories that already have one running
+CLAIM_JOB = """
+UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1, error = NULL
+WHERE id = (
+    SELECT id FROM jobs
+    WHERE status = 'queued'
+      AND (run_after IS NULL OR run_after <= ?)
+      AND repository_id NOT IN (SELECT repository_id FROM jobs WHERE status = 'running')
+    ORDER BY priority, id
+    LIMIT 1
+)
+RETURNING *
+"""
+
+Handler = Callable[..., Awaitable[Any]]
+
+class JobSuperseded(Exception):
+    """raised by a handler when another run is already doing the same work"""
+
+class JobRetry(Exception):
+    """raised by a handler that can't run yet, the job goes back on the queue for `delay_seconds`"""
+
+    def __init__(self, reason: str, delay_seconds: float):
+        self.delay_seconds = delay_seconds
+        super().__init__(reason)
+
+def now_iso() -> str:
+    #fixed width, started_at is compared as text
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+def job_from_row(row) -> Job:
+    data = dict(row)
+    data["payload"] = json.loads(data["payload"])
+    return Job(**data)
+
+class JobQueue:
+    """durable queue for ingestion work.
+
+    jobs live in their own SQLite file so they survive restarts whatever the storage
+    backend is. a fixed pool of workers claims them by priority then age; at most one
+    job runs per repository and a repository has at most one live job of each kind,
+    so enqueueing a duplicate hands back the existing one. jobs left running by a
+    worker that died are found by a periodic sweep once their repository lease has
+    lapsed and go back on the queue (or fail after `max_attempts`). a handler that
+    has to wait (the repository is busy with other work) raises JobRetry and frees
+    its worker, the job is requeued and not claimed again before its delay. stop() lets
+    running jobs finish for `drain_seconds`, then cancels and requeues whatever is left.
+    """
+
+    def __init__(self, path: Optional[str] = None, workers: Optional[int] = None,
+                 poll_seconds: Optional[float] = None, drain_seconds: Optional[float] = None,
+                 max_attempts: Optional[int] = None):
+        self.path = path or settings.JOB_QUEUE_PATH
+        self.workers = workers or settings.JOB_WORKERS
+        self.poll_seconds = poll_seconds or settings.JOB_POLL_SECONDS
+        self.drain_seconds = drain_seconds if drain_seconds is not None else settings.JOB_DRAIN_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self._db: Optional[SqliteDatabase] = None
+        self._handlers: Dict[str, Handler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self._running: Dict[int, asyncio.Task] = {}
+        #set once a job's final status is written
+        self._done: Dict[int, asyncio.Event] = {}
+        self._cancel_requested: set = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._metrics = {"enqueued": 0, "deduplicated": 0, "completed": 0, "failed": 0, "cancelled": 0,
+                         "superseded": 0, "deferred": 0, "requeued": 0, "recovered": 0}
+
+    @property
+    def db(self) -> SqliteDatabase:
+        #lazily opened so scripts can enqueue without the app lifespan
+        if self._db is None:
+            self._db = SqliteDatabase(self.path, read_connections=1, schema=JOBS_SCHEMA, migrate=migrate_jobs)
+        return self._db
+
+    def register(self, kind: str, handler: Handler):
+        """`handler(repository_id, **payload)` runs a job of this kind"""
+        self._handlers[kind] = handler
+
+    async def enqueue(self, kind: str, repo_id: int, payload: Optional[Dict[str, Any]] = None,
+                      priority: int = JOB_PRIORITY_NORMAL) -> Tuple[Job, bool]:
+        """returns (job, created), created is False when a live duplicate was returned"""
+        def insert(connection):
+            live = connection.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND repository_id = ? AND status IN (?, ?)",
+                (kind, repo_id, *LIVE)
+            ).fetchone()
+            if live is not None:
+                if live["status"] == JobStatus.QUEUED.value and priority < live["priority"]:
+                    live = connection.execute("UPDATE jobs SET priority = ? WHERE id = ? RETURNING *",
+                                              (priority, live["id"])).fetchone()
+                return live, False
+            row = connection.execute(
+                "INSERT INTO jobs (kind, repository_id, payload, priority, created_at) VALUES (?, ?, ?, ?, ?) "
+                "RETURNING *",
+                (kind, repo_id, json.dumps(payload or {}), priority, now_iso())
+            ).fetchone()
+            return row, True
+
+        row, created = await self.db.write(insert)
+        job = job_from_row(row)
+        if created:
+            self._metrics["enqueued"] += 1
+            logger.info("job enqueued", job_id=job.id, kind=kind, repo_id=repo_id, priority=priority)
+            progress_bus.queued(repo_id, kind)
+            if self._wake is not None:
+                self._wake.set()
+        else:
+            self._metrics["deduplicated"] += 1
+            logger.info("job already live", job_id=job.id, kind=kind, repo_id=repo_id, status=job.status)
+        return job, created
+
+    async def get(self, job_id: int) -> Optional[Job]:
+        row = await self.db.read(lambda connection: connection.execute(
+            "SELECT * FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone())
+        return job_from_row(row) if row else None
+
+    async def list_jobs(self, repo_id: Optional[int] = None, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        clauses, params = [], []
+        if repo_id is not None:
+            clauses.append("repository_id = ?")
+            params.append(repo_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        rows = await self.db.read(lambda connection: connection.execute(
+            f"SELECT * FROM jobs {where}ORDER BY id DESC LIMIT ?", (*params, limit)
+        ).fetchall())
+        return [job_from_row(row) for row in rows]
+
+    async def cancel(self, job_id: int) -> Optional[Job]:
+        """cancel a queued job, or a running one owned by this process. returns None if unknown"""
+        def cancel_queued(connection):
+            cancelled = connection.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (now_iso(), job_id)
+            ).rowcount
+            return connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone(), cancelled
+
+        row, cancelled = await self.db.write(cancel_queued)
+        if row is None:
+            return None
+        if cancelled:
+            self._metrics["cancelled"] += 1
+            logger.info("job cancelled", job_id=job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            #the worker records the cancellation once the handler has unwound
+            done = self._done[job_id]
+            self._cancel_requested.add(job_id)
+            task.cancel()
+            try:
+                await asyncio.wait_for(done.wait(), timeout=self.drain_seconds)
+            except asyncio.TimeoutError:
+                pass
+            return await self.get(job_id)
+        return job_from_row(row)
+
+    async def cancel_repo(self, repo_id: int) -> int:
+        """cancel every live job of a repository, returns how many"""
+        jobs = await self.list_jobs(repo_id=repo_id, status=JobStatus.QUEUED.value)
+        jobs += await self.list_jobs(repo_id=repo_id, status=JobStatus.RUNNING.value)
+        for job in jobs:
+            await self.cancel(job.id)
+        return len(jobs)
+
+    async def _claim(self) -> Optional[Job]:
+        now = now_iso()
+        row = await self.db.write(lambda connection: connection.execute(CLAIM_JOB, (now, now)).fetchone())
+        return job_from_row(row) if row else None
+
+    async def _finish(self, job_id: int, status: JobStatus, error: Optional[str] = None,
+                      run_after: Optional[str] = None):
+        def finish(connection):
+            if status == JobStatus.QUEUED:
+                #interrupted by shutdown or deferred, the run does not count as an attempt
+                connection.execute("UPDATE jobs SET status = 'queued', started_at = NULL, error = ?, run_after = ?, "
+                                   "attempts = MAX(attempts - 1, 0) WHERE id = ?", (error, run_after, job_id))
+            else:
+                connection.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                                   (status.value, error, now_iso(), job_id))
+        await self.db.write(finish)
+
+    async def _run(self, job: Job):
+        handler = self._handlers.get(job.kind)
+        if handler is None:
+            await self._finish(job.id, JobStatus.FAILED, f"no handler for {job.kind} jobs")
+            self._metrics["failed"] += 1
+            return
+
+        logger.info("job started", job_id=job.id, kind=job.kind, repo_id=job.repository_id, attempt=job.attempts)
+        done = self._done[job.id] = asyncio.Event()
+        task = self._running[job.id] = asyncio.create_task(handler(job.repository_id, **job.payload))
+        error = run_after = None
+        try:
+            await task
+            status = JobStatus.COMPLETED
+        except JobSuperseded as e:
+            status, error = JobStatus.CANCELLED, str(e)
+            self._metrics["superseded"] += 1
+        except JobRetry as e:
+            status, error = JobStatus.QUEUED, str(e)
+            run_after = (datetime.now(timezone.utc) + timedelta(seconds=e.delay_seconds)).isoformat(
+                timespec="microseconds")
+        except asyncio.CancelledError:
+            if job.id in self._cancel_requested or not self._stopping:
+                status = JobStatus.CANCELLED
+            else:
+                status = JobStatus.QUEUED
+        except Exception as e:
+            status, error = JobStatus.FAILED, str(e) or type(e).__name__
+        finally:
+            self._running.pop(job.id, None)
+            self._cancel_requested.discard(job.id)
+
+        try:
+            await self._finish(job.id, status, error, run_after)
+        finally:
+            self._done.pop(job.id, None)
+            done.set()
+        if run_after is not None:
+            self._metrics["deferred"] += 1
+            logger.info("job deferred", job_id=job.id, kind=job.kind, repo_id=job.repository_id, reason=error,
+                        run_after=run_after)
+        else:
+            self._metrics["requeued" if status == JobStatus.QUEUED else status.value] += 1
+            logger.info("job finished", job_id=job.id, kind=job.kind, repo_id=job.repository_id, status=status.value,
+                        error=error)
+        #another job of the same repository may be claimable now
+        self._wake.set()
+
+    async def _worker(self):
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error("job claim failed", error=str(e))
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error("job bookkeeping failed", job_id=job.id, error=str(e))
+
+    async def recover(self) -> int:
+        """requeue jobs whose worker died, fail those out of attempts.
+
+        a job is orphaned when it is marked running, this process isn't running it, it
+        started more than a lease TTL ago and its repository's lease has lapsed; a live
+        worker keeps renewing that lease for as long as the job runs.
+        """
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=settings.REPO_LEASE_TTL_SECONDS)).isoformat(
+            timespec="microseconds")
+        rows = await self.db.read(lambda connection: connection.execute(
+            "SELECT id, repository_id FROM jobs WHERE status = 'running' AND started_at < ?", (cutoff,)
+        ).fetchall())
+        orphaned = []
+        for row in rows:
+            if row["id"] in self._running:
+                continue
+            try:
+                if await repo_locks.holder(row["repository_id"]) is None:
+                    orphaned.append(row["id"])
+            except Exception as e:
+                logger.warning("job lease check failed", job_id=row["id"], error=str(e))
+        if not orphaned:
+            return 0
+
+        def recover(connection):
+            marks = ", ".join("?" * len(orphaned))
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', error = 'interrupted too many times', finished_at = ? "
+                f"WHERE status = 'running' AND attempts >= ? AND id IN ({marks})",
+                (now_iso(), self.max_attempts, *orphaned)
+            )
+            return connection.execute(
+                f"UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running' AND id IN ({marks})",
+                orphaned
+            ).rowcount
+
+        recovered = await self.db.write(recover)
+        if recovered:
+            self._metrics["recovered"] += recovered
+            logger.warning("interrupted jobs requeued", count=recovered)
+            self._wake.set()
+        return recovered
+
+    async def _sweep(self):
+        while True:
+            try:
+                await self.recover()
+            except Exception as e:
+                logger.error("job recovery failed", error=str(e))
+            await asyncio.sleep(settings.REPO_LEASE_TTL_SECONDS)
+
+    async def start(self):
+        if self._workers:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._sweeper = asyncio.create_task(self._sweep())
+        logger.info("job workers started", workers=self.workers, path=self.path)
+
+    async def stop(self):
+        if not self._workers:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._sweeper.cancel()
+        running = list(self._running.values())
+        if running:
+            logger.info("draining jobs", running=len(running), timeout=self.drain_seconds)
+            _, pending = await asyncio.wait(running, timeout=self.drain_seconds)
+            for task in pending:
+                task.cancel()
+        await asyncio.gather(self._sweeper, *self._workers, return_exceptions=True)
+        self._workers = []
+        self._sweeper = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._metrics, "workers": len(self._workers), "running": len(self._running)}
+
+job_queue = JobQueue()
@@ -0,0 +1,102 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Dict, Any, Callable
+import asyncio
+import time
+
+logger = get_logger(__name__)
+
+class LLMExecutor:
+    """dedicated pool for blocking LLM client calls.
+
+    calls are capped per process and queue behind a semaphore instead of competing
+    with embedding encodes on the default executor. calls submitted with the same
+    key while one is in flight share that single upstream call (singleflight).
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiting = 0
+        self._active = 0
+        self._metrics = {
+            "submitted": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+            "total_wait_ms": 0.0,
+            "total_call_ms": 0.0
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def _call(self, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_event_loop()
+        queued_at = time.monotonic()
+        self._waiting += 1
+        self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        started_at = time.monotonic()
+        self._metrics["total_wait_ms"] += (started_at - queued_at) * 1000
+        self._active += 1
+        try:
+            result = await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+            self._metrics["completed"] += 1
+            return result
+        except Exception:
+            self._metrics["failed"] += 1
+            raise
+        finally:
+            self._active -= 1
+            self._metrics["total_call_ms"] += (time.monotonic() - started_at) * 1000
+            self._semaphore.release()
+
+    async def run(self, fn: Callable, *args, key: Optional[str] = None, **kwargs) -> Any:
+        self._metrics["submitted"] += 1
+        if key is None:
+            return await self._call(fn, *args, **kwargs)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._metrics["coalesced"] += 1
+            logger.debug("coalesced LLM call", in_flight=len(self._inflight))
+        else:
+            task = asyncio.ensure_future(self._call(fn, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        #shielded so one cancelled caller does not cancel the call the others share
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self._metrics["completed"] + self._metrics["failed"]
+        return {
+            **{name: round(value, 2) if isinstance(value, float) else value
+               for name, value in self._metrics.items()},
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self._waiting,
+            "active": self._active,
+            "in_flight_keys": len(self._inflight),
+            "avg_wait_ms": round(self._metrics["total_wait_ms"] / calls, 2) if calls else 0.0,
+            "avg_call_ms": round(self._metrics["total_call_ms"] / calls, 2) if calls else 0.0
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+llm_executor = LLMExecutor()
@@ -0,0 +1,175 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.pubsub import LocalPubSub, pubsub, WORKER_ID
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Set
+from datetime import datetime, timezone
+import asyncio
+import time
+
+logger = get_logger(__name__)
+
+PROGRESS_CHANNEL = "ingestion-progress"
+TERMINAL_STAGES = ("completed", "failed", "interrupted")
+#snapshots kept for late subscribers, oldest dropped first
+MAX_TRACKED = 1000
+
+class ProgressRun:
+    """counters of one ingestion or reindex run, lives in the worker doing the work"""
+
+    def __init__(self, repo_id: int, operation: str):
+        self.repo_id = repo_id
+        self.operation = operation
+        self.stage = "starting"
+        self.total: Optional[int] = None
+        self.counts = {"fetched": 0, "stored": 0, "embedded": 0}
+        self.error: Optional[str] = None
+        self.started = time.monotonic()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.stage_started = self.started
+        self.stage_start_count = 0
+        self.published = 0.0
+
+    def stage_count(self) -> int:
+        #what the current stage is counting
+        return {"fetching": self.counts["fetched"], "storing": self.counts["stored"],
+                "embedding": self.counts["embedded"]}.get(self.stage, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        done = self.stage_count()
+        elapsed = now - self.stage_started
+        rate = (done - self.stage_start_count) / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate > 0 and self.stage not in TERMINAL_STAGES:
+            eta = round(max(self.total - done, 0) / rate, 1)
+        return {
+            "repo_id": self.repo_id,
+            "operation": self.operation,
+            "stage": self.stage,
+            **self.counts,
+            "total": self.total,
+            "rate": round(rate, 2),
+            "eta_seconds": eta,
+            "elapsed_seconds": round(now - self.started, 2),
+            "started_at": self.started_at,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "error": self.error
+        }
+
+class ProgressBus:
+    """in-process event bus for ingestion progress.
+
+    the worker running a job updates its run's counters; snapshots (counts, rate of
+    the current stage, ETA) go out over the pub/sub channel, so subscribers on any
+    worker see them, at most every `min_interval` seconds except stage changes,
+    which always go out. each worker keeps the latest snapshot per repository for
+    subscribers that join mid-run. subscriber queues are bounded, a slow reader
+    loses intermediate snapshots rather than holding memory.
+    """
+
+    def __init__(self, min_interval: Optional[float] = None, queue_size: int = 64,
+                 bus: Optional[LocalPubSub] = None):
+        self.min_interval = min_interval if min_interval is not None else settings.PROGRESS_MIN_INTERVAL_SECONDS
+        self.queue_size = queue_size
+        self.bus = bus or pubsub
+        self._runs: Dict[int, ProgressRun] = {}
+        self._latest: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._metrics = {"runs": 0, "published": 0, "throttled": 0, "delivered": 0, "dropped": 0}
+        self.bus.subscribe(PROGRESS_CHANNEL, self._on_message)
+
+    #publishing side
+    def begin(self, repo_id: int, operation: str):
+        self._runs[repo_id] = ProgressRun(repo_id, operation)
+        self._metrics["runs"] += 1
+        self._publish(self._runs[repo_id], force=True)
+
+    def queued(self, repo_id: int, operation: str):
+        #a run is on its way, replaces a finished run's snapshot so subscribers wait for it
+        if repo_id in self._runs:
+            return
+        self._metrics["published"] += 1
+        self.bus.publish(PROGRESS_CHANNEL, {
+            "repo_id": repo_id,
+            "operation": operation,
+            "stage": "queued",
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }, origin=WORKER_ID)
+
+    def stage(self, repo_id: int, stage: str, total: Optional[int] = None):
+        run = self._runs.get(repo_id)
+        if run is None:
+            return
+        run.stage, run.total = stage, total
+        run.stage_started = time.monotonic()
+        run.stage_start_count = run.stage_count()
+        self._publish(run, force=True)
+
+    def advance(self, repo_id: int, **counts: int):
+        """set absolute counts (fetched, stored, embedded)"""
+        run = self._runs.get(repo_id)
+        if run is None:
+            return
+        run.counts.update(counts)
+        self._publish(run)
+
+    def finish(self, repo_id: int, stage: str = "completed", error: Optional[str] = None):
+        run = self._runs.pop(repo_id, None)
+        if run is None:
+            return
+        run.stage, run.error = stage, error
+        run.total = None
+        self._publish(run, force=True)
+
+    def _publish(self, run: ProgressRun, force: bool = False):
+        now = time.monotonic()
+        if not force and now - run.published < self.min_interval:
+            self._metrics["throttled"] += 1
+            return
+        run.published = now
+        self._metrics["published"] += 1
+        self.bus.publish(PROGRESS_CHANNEL, run.snapshot(), origin=WORKER_ID)
+
+    #subscribing side
+    def _on_message(self, message: Dict[str, Any]):
+        snapshot = {key: value for key, value in message.items() if key != "origin"}
+        repo_id = snapshot["repo_id"]
+        self._latest[repo_id] = snapshot
+        self._latest.move_to_end(repo_id)
+        while len(self._latest) > MAX_TRACKED:
+            self._latest.popitem(last=False)
+        for queue in self._subscribers.get(repo_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self._metrics["dropped"] += 1
+            queue.put_nowait(snapshot)
+            self._metrics["delivered"] += 1
+
+    def active(self, repo_id: int) -> bool:
+        #a run in this worker is publishing for the repository
+        return repo_id in self._runs
+
+    def latest(self, repo_id: int) -> Optional[Dict[str, Any]]:
+        return self._latest.get(repo_id)
+
+    @contextmanager
+    def subscribe(self, repo_id: int):
+        """queue of snapshots for one repository while the block runs"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(repo_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(repo_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[repo_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._metrics, "active_runs": len(self._runs),
+                "subscribers": sum(len(queues) for queues in self._subscribers.values())}
+
+progress_bus = ProgressBus()
@@ -0,0 +1,145 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.context_packer import estimate_tokens
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, NamedTuple, Union
+import hashlib
+import threading
+import time
+
+logger = get_logger(__name__)
+
+class SplitPrompt(NamedTuple):
+    """prompt with a stable prefix (instructions + commit context) and a per-request suffix"""
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.suffix
+
+def prompt_text(prompt: Union[str, SplitPrompt]) -> str:
+    return prompt.text if isinstance(prompt, SplitPrompt) else prompt
+
+class PrefixCache:
+    """provider-side cached-content handles for repeated prompt prefixes.
+
+    a prefix gets a handle once it has been seen `min_reuse` times within the TTL,
+    so one-off prompts never pay for cache creation. handles expire locally a little
+    before the provider drops them. `create` is the provider hook; returning None
+    means the provider (or installed SDK) has no context caching and turns it off.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None,
+                 min_reuse: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or settings.PROMPT_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.PROMPT_CACHE_MAX_ENTRIES
+        self.min_reuse = min_reuse or settings.PROMPT_CACHE_MIN_REUSE
+        self.supported = settings.PROMPT_CACHE_ENABLED
+
+        #called from LLM worker threads
+        self._lock = threading.Lock()
+        self._handles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._seen: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._creating: set = set()
+        self._metrics = {
+            "requests": 0,
+            "prefix_repeats": 0,
+            "handle_hits": 0,
+            "handles_created": 0,
+            "create_failures": 0,
+            "handle_errors": 0,
+            "below_min_tokens": 0,
+            "prefix_tokens": 0,
+            "prefix_tokens_saved": 0
+        }
+
+    @staticmethod
+    def _digest(prefix: str) -> str:
+        return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    def _sighting(self, digest: str, now: float) -> int:
+        seen = self._seen.get(digest)
+        if seen is None or now - seen["first_seen"] > self.ttl_seconds:
+            seen = {"first_seen": now, "count": 0}
+        else:
+            self._metrics["prefix_repeats"] += 1
+        seen["count"] += 1
+        self._seen[digest] = seen
+        self._seen.move_to_end(digest)
+        while len(self._seen) > self.max_entries * 4:
+            self._seen.popitem(last=False)
+        return seen["count"]
+
+    def resolve(self, prefix: str, create: Callable[[str, int], Optional[Any]],
+                min_tokens: int = 0) -> Optional[Any]:
+        """cached handle for `prefix`, creating one if it is reused enough; None means send it inline"""
+        tokens = estimate_tokens(prefix)
+        digest = self._digest(prefix)
+        now = time.monotonic()
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["prefix_tokens"] += tokens
+            count = self._sighting(digest, now)
+            entry = self._handles.get(digest)
+            if entry is not None:
+                if entry["expires_at"] > now:
+                    self._handles.move_to_end(digest)
+                    self._metrics["handle_hits"] += 1
+                    self._metrics["prefix_tokens_saved"] += tokens
+                    return entry["handle"]
+                del self._handles[digest]
+            if not self.supported or count < self.min_reuse:
+                return None
+            if tokens < min_tokens:
+                self._metrics["below_min_tokens"] += 1
+                return None
+            if digest in self._creating:
+                #another call is creating it, go inline rather than wait
+                return None
+            self._creating.add(digest)
+
+        #created outside the lock, it is a provider round trip
+        try:
+            handle = create(prefix, self.ttl_seconds)
+        except Exception as e:
+            with self._lock:
+                self._metrics["create_failures"] += 1
+            logger.warning("prompt prefix cache creation failed", error=str(e))
+            return None
+        finally:
+            with self._lock:
+                self._creating.discard(digest)
+        if handle is None:
+            if self.supported:
+                logger.info("provider has no context caching, sending prompt prefixes inline")
+            self.supported = False
+            return None
+
+        with self._lock:
+            #expire a bit ahead of the provider so we never hand out a dead handle
+            self._handles[digest] = {"handle": handle, "expires_at": now + self.ttl_seconds * 0.9}
+            self._handles.move_to_end(digest)
+            while len(self._handles) > self.max_entries:
+                self._handles.popitem(last=False)
+            self._metrics["handles_created"] += 1
+        return handle
+
+    def drop(self, prefix: str):
+        #a handle the provider rejected (expired or deleted upstream)
+        with self._lock:
+            if self._handles.pop(self._digest(prefix), None) is not None:
+                self._metrics["handle_errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._metrics["requests"]
+            return {
+                **self._metrics,
+                "supported": self.supported,
+                "handles": len(self._handles),
+                "hit_rate": round(self._metrics["handle_hits"] / requests, 4) if requests else 0.0,
+                "repeat_rate": round(self._metrics["prefix_repeats"] / requests, 4) if requests else 0.0
+            }
+
+prefix_cache = PrefixCache()
@@ -0,0 +1,93 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.pubsub import LocalPubSub, pubsub, WORKER_ID
+from app.core.projections import FULL
+from app.models.repo import Repo
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import time
+
+logger = get_logger(__name__)
+
+INVALIDATION_CHANNEL = "repo-cache-invalidate"
+
+class RepoCache:
+    """short-TTL cache of repository rows, keyed by id.
+
+    misses are cached too (with a shorter TTL) so repeated lookups of a missing repo
+    don't each hit the database. writes go through: create/update store the fresh
+    row, delete evicts it and tells other workers over the pub/sub channel. a row read
+    with a lean projection only answers lookups for that projection, full rows answer all.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, negative_ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None, bus: Optional[LocalPubSub] = None,
+                 worker_id: str = WORKER_ID):
+        self.ttl_seconds = ttl_seconds or settings.REPO_CACHE_TTL_SECONDS
+        self.negative_ttl_seconds = negative_ttl_seconds or settings.REPO_CACHE_NEGATIVE_TTL_SECONDS
+        self.max_entries = max_entries or settings.REPO_CACHE_MAX_ENTRIES
+        self.worker_id = worker_id
+        self.bus = bus
+        #repo id -> (expires_at, repo or None for a cached miss, projection it was read with)
+        self._entries: "OrderedDict[int, Tuple[float, Optional[Repo], str]]" = OrderedDict()
+        self._metrics = {"hits": 0, "negative_hits": 0, "misses": 0, "writes": 0,
+                         "invalidations": 0, "remote_invalidations": 0}
+        if self.bus is not None:
+            self.bus.subscribe(INVALIDATION_CHANNEL, self._on_invalidate)
+
+    def get(self, repo_id: int, projection: str = FULL) -> Tuple[bool, Optional[Repo]]:
+        """(found, repo); found with repo None is a cached 404"""
+        if not settings.REPO_CACHE_ENABLED:
+            return False, None
+        entry = self._entries.get(repo_id)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[repo_id]
+            self._metrics["misses"] += 1
+            return False, None
+        if entry[1] is not None and entry[2] not in (FULL, projection):
+            self._metrics["misses"] += 1
+            return False, None
+        self._entries.move_to_end(repo_id)
+        repo = entry[1]
+        if repo is None:
+            self._metrics["negative_hits"] += 1
+            return True, None
+        self._metrics["hits"] += 1
+        #callers may mutate what they get back
+        return True, repo.model_copy()
+
+    def put(self, repo_id: int, repo: Optional[Repo], publish: bool = False, projection: str = FULL):
+        #publish=True for writes, other workers drop their copy and refetch
+        if publish and self.bus is not None:
+            self.bus.publish(INVALIDATION_CHANNEL, {"repo_id": repo_id}, origin=self.worker_id)
+        if not settings.REPO_CACHE_ENABLED:
+            return
+        ttl = self.ttl_seconds if repo is not None else self.negative_ttl_seconds
+        self._entries[repo_id] = (time.monotonic() + ttl, repo.model_copy() if repo is not None else None, projection)
+        self._entries.move_to_end(repo_id)
+        self._metrics["writes"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, repo_id: int, publish: bool = True):
+        self._entries.pop(repo_id, None)
+        self._metrics["invalidations"] += 1
+        if publish and self.bus is not None:
+            self.bus.publish(INVALIDATION_CHANNEL, {"repo_id": repo_id}, origin=self.worker_id)
+
+    def _on_invalidate(self, message: Dict[str, Any]):
+        if message.get("origin") == self.worker_id:
+            return
+        self._entries.pop(message["repo_id"], None)
+        self._metrics["remote_invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._metrics["hits"] + self._metrics["negative_hits"] + self._metrics["misses"]
+        return {
+            **self._metrics,
+            "size": len(self._entries),
+            "hit_rate": round((lookups - self._metrics["misses"]) / lookups, 4) if lookups else 0.0
+        }
+
+repo_cache = RepoCache(bus=pubsub if settings.REPO_CACHE_PUBSUB else None)
@@ -0,0 +1,104 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.pubsub import WORKER_ID
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+import asyncio
+import time
+import uuid
+
+logger = get_logger(__name__)
+
+class LeaseHeld(Exception):
+    """someone else holds the repository's lease"""
+
+    def __init__(self, lease: Optional[Dict[str, Any]]):
+        self.lease = lease or {}
+        super().__init__(f"repository is being processed by {self.lease.get('holder', 'another worker')}")
+
+def lease_key(repo_id: int) -> str:
+    return f"repo:{repo_id}"
+
+class RepoLockService:
+    """lease-based lock per repository, held for the duration of ingestion or reindexing.
+
+    the lease is a row in the storage backend (Supabase or SQLite, an in-memory table
+    for the fake backend) so every worker process and replica sees it. the holder
+    renews it every `heartbeat_seconds`; if the holder dies the lease expires after
+    `ttl_seconds` and the next caller takes it over. a holder that can't renew
+    (lease taken over, or storage unreachable until the lease would have expired)
+    cancels its own work rather than run alongside the new holder.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, heartbeat_seconds: Optional[float] = None,
+                 worker_id: str = WORKER_ID):
+        self.ttl_seconds = ttl_seconds or settings.REPO_LEASE_TTL_SECONDS
+        self.heartbeat_seconds = heartbeat_seconds or settings.REPO_LEASE_HEARTBEAT_SECONDS
+        self.worker_id = worker_id
+        self._held: Dict[int, str] = {}
+        self._metrics = {"acquired": 0, "contended": 0, "renewed": 0, "renew_errors": 0, "lost": 0, "released": 0}
+
+    def storage(self):
+        from app.services.backends import create_storage_service
+        return create_storage_service()
+
+    async def holder(self, repo_id: int, storage=None) -> Optional[Dict[str, Any]]:
+        """the live lease on a repository, None when nobody holds it"""
+        return await (storage or self.storage()).get_lease(lease_key(repo_id))
+
+    @asynccontextmanager
+    async def hold(self, repo_id: int, operation: str, storage=None):
+        """hold the repository's lease for the block, raises LeaseHeld if it is taken"""
+        storage = storage or self.storage()
+        key = lease_key(repo_id)
+        #unique per hold, two runs in one process exclude each other too
+        holder = f"{self.worker_id}:{uuid.uuid4().hex[:8]}"
+        acquired, lease = await storage.acquire_lease(key, holder, operation, self.ttl_seconds)
+        if not acquired:
+            self._metrics["contended"] += 1
+            logger.info("repository lease held elsewhere", repo_id=repo_id, operation=operation,
+                        holder=lease.get("holder") if lease else None)
+            raise LeaseHeld(lease)
+
+        self._metrics["acquired"] += 1
+        self._held[repo_id] = holder
+        logger.info("repository lease acquired", repo_id=repo_id, operation=operation, holder=holder)
+        heartbeat = asyncio.create_task(self._heartbeat(storage, repo_id, key, holder, asyncio.current_task()))
+        try:
+            yield lease
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            self._held.pop(repo_id, None)
+            try:
+                if await storage.release_lease(key, holder):
+                    self._metrics["released"] += 1
+            except Exception as e:
+                #it expires on its own
+                logger.warning("repository lease release failed", repo_id=repo_id, error=str(e))
+
+    async def _heartbeat(self, storage, repo_id: int, key: str, holder: str, owner: asyncio.Task):
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                if await storage.renew_lease(key, holder, self.ttl_seconds):
+                    self._metrics["renewed"] += 1
+                    renewed_at = time.monotonic()
+                    continue
+                reason = "taken over"
+            except Exception as e:
+                self._metrics["renew_errors"] += 1
+                logger.warning("repository lease renewal failed", repo_id=repo_id, error=str(e))
+                if time.monotonic() - renewed_at < self.ttl_seconds:
+                    continue
+                reason = "expired"
+            self._metrics["lost"] += 1
+            logger.error("repository lease lost, stopping work", repo_id=repo_id, holder=holder, reason=reason)
+            owner.cancel()
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._metrics, "held": len(self._held)}
+
+repo_locks = RepoLockService()
@@ -1,4 +1,4 @@
-from supabase import Client
+from supabase import AsyncClient
 from typing import List, Optional
 from datetime import datetime, timezone
 from app.models.repo import Repo
@@ -6,7 +6,7 @@ from app.models.repo import Repo
 class RepoServices():
     """service for repo operations"""
 
-    def __init__(self, supabase:Client):
+    def __init__(self, supabase:AsyncClient):
         self.supabase =supabase
         self.table ="repositories"
     
@@ -15,7 +15,7 @@ class RepoServices():
         repo_data['created_at'] = datetime.now(timezone.utc).isoformat()
         repo_data['updated_at'] = datetime.now(timezone.utc).isoformat()
 
-        response = self.supabase.table(self.table).insert(repo_data).execute()
+        response = await self.supabase.table(self.table).insert(repo_data).execute()
         if response.data:
             return Repo(**response.data[0])
         else:
@@ -23,7 +23,7 @@ class RepoServices():
         
     async def get_repo(self, repo_id:int)->Optional[Repo]:
         """get repo by id"""
-        response = self.supabase.table(self.table).select('*').eq('id', repo_id).execute()
+        response = await self.supabase.table(self.table).select('*').eq('id', repo_id).execute()
         
         if response.data:
             return Repo(**response.data[0])
@@ -31,7 +31,7 @@ class RepoServices():
     
     async def get_repos(self, limit: int = 50) -> List[Repo]:
         """get list of repositories"""
-        response = (
+        response = await (
             self.supabase.table(self.table)
             .select('*')
             .order('created_at', desc=True)
@@ -43,5 +43,5 @@ class RepoServices():
     
     async def repo_exists(self, url: str) -> bool:
         """Check if repo exist """
-        response = self.supabase.table(self.table).select('id').eq('url', url).execute()
+        response = await self.supabase.table(self.table).select('id').eq('url', url).execute()
         return len(response.data) > 0
\ No newline at end of file
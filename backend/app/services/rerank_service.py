@@ -0,0 +1,98 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.embedding import EmbeddingResult
+from app.services.backends import create_cross_encoder
+from typing import List, Optional
+import asyncio
+import time
+
+logger = get_logger(__name__)
+
+class RerankService:
+    """cross-encoder re-ranking of vector search candidates under a time budget"""
+    _model = None
+    #set once a load has failed, later requests skip the stage instead of retrying
+    _load_failed = False
+    _load_lock: Optional[asyncio.Lock] = None
+
+    def __init__(self):
+        self.model_name = settings.RERANK_MODEL
+        self.batch_size = settings.RERANK_BATCH_SIZE
+        self.budget_ms = settings.RERANK_BUDGET_MS
+
+    async def _load_model(self) -> bool:
+        """load the shared model once, off the event loop. False when it is unavailable"""
+        #shared across instances, loading is far more expensive than scoring
+        if RerankService._model is not None or RerankService._load_failed:
+            return RerankService._model is not None
+        if RerankService._load_lock is None:
+            RerankService._load_lock = asyncio.Lock()
+        async with RerankService._load_lock:
+            if RerankService._model is None and not RerankService._load_failed:
+                logger.info("Loading rerank model", model=self.model_name)
+                try:
+                    loop = asyncio.get_event_loop()
+                    RerankService._model = await loop.run_in_executor(None, create_cross_encoder, self.model_name)
+                    logger.info("Rerank model loaded successfully")
+                except Exception as e:
+                    RerankService._load_failed = True
+                    logger.error("Failed to load rerank model, keeping vector order", model=self.model_name, error=str(e))
+        return RerankService._model is not None
+
+    @staticmethod
+    def commit_text(commit: EmbeddingResult) -> str:
+        #same text the commit was embedded with
+        return f"{commit.message} {' '.join(commit.files_changed[:5])}"
+
+    async def rerank(self, query: str, commits: List[EmbeddingResult],
+                     limit: int, budget_ms: Optional[int] = None) -> List[EmbeddingResult]:
+        """score candidates in vector order, batch by batch, until the budget runs out.
+
+        scored candidates are re-ordered by cross-encoder score; anything left unscored
+        keeps its vector order behind them, so an exhausted budget degrades to plain
+        vector ranking.
+        """
+        if len(commits) <= 1:
+            return commits[:limit]
+
+        budget = (budget_ms if budget_ms is not None else self.budget_ms) / 1000
+        if not await self._load_model():
+            return commits[:limit]
+
+        loop = asyncio.get_event_loop()
+        start_time = time.monotonic()
+        scores: List[float] = []
+
+        for i in range(0, len(commits), self.batch_size):
+            remaining = budget - (time.monotonic() - start_time)
+            if remaining <= 0:
+                break
+
+            batch = commits[i:i + self.batch_size]
+            pairs = [(query, self.commit_text(commit)) for commit in batch]
+            try:
+                batch_scores = await asyncio.wait_for(
+                    loop.run_in_executor(None, self._model.predict, pairs),
+                    timeout=remaining
+                )
+            except asyncio.TimeoutError:
+                logger.debug("rerank batch exceeded budget", batch=i // self.batch_size + 1)
+                break
+            except Exception as e:
+                logger.warning("rerank batch failed, keeping vector order", error=str(e))
+                break
+
+            scores.extend(float(score) for score in batch_scores)
+
+        scored = len(scores)
+        elapsed_ms = (time.monotonic() - start_time) * 1000
+        if scored == 0:
+            logger.info("rerank budget exhausted before first batch", budget_ms=budget * 1000)
+            return commits[:limit]
+
+        order = sorted(range(scored), key=lambda idx: scores[idx], reverse=True)
+        reranked = [commits[idx] for idx in order] + commits[scored:]
+
+        logger.info("commits reranked", candidates=len(commits), scored=scored,
+                    elapsed_ms=round(elapsed_ms, 2), kept=min(limit, len(reranked)))
+        return reranked[:limit]
@@ -0,0 +1,237 @@
+"""columnar snapshots of a repository's commits and embeddings.
+
+a snapshot is one .npz file (numpy arrays only, loaded with allow_pickle=False):
+
+- strings (sha, message, author, author_email, files_changed as json) are stored
+  arrow-style as one utf-8 byte buffer plus an int64 offsets column
+- commit_date is int64 microseconds since the epoch, additions/deletions int64
+- embedded is a bool mask over the commits, embeddings the float32 matrix with one
+  row per embedded commit in commit order
+- meta is a json document (format version, repository fields, embedding model)
+
+restoring from one skips GitHub and the embedding model entirely: commits go in
+through the idempotent bulk upsert and vectors straight from the matrix.
+"""
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.projections import EXISTENCE, COMMIT_CARD
+from app.models.repo import RepoStatus
+from app.services.answer_cache import answer_cache
+from app.services.embedding_service import commit_text
+from app.services.stats_service import repo_stats
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timezone
+import asyncio
+import json
+import numpy as np
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
+PAGE_SIZE = 1000
+#ids per embeddings lookup, keeps the in.(...) filter well inside URL limits
+EMBEDDING_CHUNK = 500
+#lookups in flight at once, bounds the vectors held as python lists before they are copied out
+EMBEDDING_CONCURRENCY = 4
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+class SnapshotError(ValueError):
+    pass
+
+def pack_strings(values: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [(value or "").encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def unpack_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+def to_micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+def from_micros(value: int) -> str:
+    return datetime.fromtimestamp(value / 1_000_000, tz=timezone.utc).isoformat()
+
+async def scan_commits(storage, repo_id: int, projection: str) -> List[Any]:
+    #every commit of the repository, keyset paged so ties in commit_date can't skip or repeat rows
+    commits: List[Any] = []
+    after_id = 0
+    while True:
+        page = await storage.get_commit_page(repo_id, after_id=after_id, limit=PAGE_SIZE, projection=projection)
+        commits.extend(page)
+        if len(page) < PAGE_SIZE:
+            return commits
+        after_id = page[-1].id
+
+async def fetch_embeddings(storage, commit_ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(found mask over commit_ids, float32 matrix with a row per found id in order)"""
+    found = np.zeros(len(commit_ids), dtype=bool)
+    matrix: Optional[np.ndarray] = None
+    rows = {commit_id: row for row, commit_id in enumerate(commit_ids)}
+    chunks = [commit_ids[i:i + EMBEDDING_CHUNK] for i in range(0, len(commit_ids), EMBEDDING_CHUNK)]
+    for start in range(0, len(chunks), EMBEDDING_CONCURRENCY):
+        batch = chunks[start:start + EMBEDDING_CONCURRENCY]
+        for vectors in await asyncio.gather(*[storage.get_commit_embeddings(chunk) for chunk in batch]):
+            for commit_id, vector in vectors.items():
+                if matrix is None:
+                    #filled in place, the lists are dropped as soon as they are copied
+                    matrix = np.empty((len(commit_ids), len(vector)), dtype=np.float32)
+                matrix[rows[commit_id]] = vector
+                found[rows[commit_id]] = True
+    if matrix is None:
+        return found, np.zeros((0, settings.EMBEDDING_DIMENSION), dtype=np.float32)
+    return found, matrix if found.all() else matrix[found]
+
+def write_snapshot(path: str, meta: Dict[str, Any], commits: List[Any], embedded: np.ndarray,
+                   embeddings: np.ndarray):
+    #blocking, run in a thread. embedded is the mask over commits, embeddings one row per set entry
+    arrays: Dict[str, np.ndarray] = {}
+    for name in ("sha", "message", "author", "author_email"):
+        arrays[f"{name}_data"], arrays[f"{name}_offsets"] = pack_strings([getattr(c, name) for c in commits])
+    arrays["files_changed_data"], arrays["files_changed_offsets"] = pack_strings(
+        [json.dumps(c.files_changed) for c in commits]
+    )
+    arrays["commit_date"] = np.array([to_micros(c.commit_date) for c in commits], dtype=np.int64)
+    arrays["additions"] = np.array([c.additions for c in commits], dtype=np.int64)
+    arrays["deletions"] = np.array([c.deletions for c in commits], dtype=np.int64)
+    arrays["embedded"] = embedded
+    arrays["embeddings"] = embeddings
+    meta = {**meta, "commits": len(commits), "embeddings": len(embeddings),
+            "dimension": int(arrays["embeddings"].shape[1])}
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+    return meta
+
+def read_snapshot(path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    #blocking, run in a thread. returns (meta, columns)
+    try:
+        with np.load(path, allow_pickle=False) as archive:
+            meta = json.loads(archive["meta"].tobytes().decode("utf-8"))
+            if meta.get("version") != SNAPSHOT_VERSION:
+                raise SnapshotError(f"unsupported snapshot version {meta.get('version')}")
+            columns: Dict[str, Any] = {}
+            for name in ("sha", "message", "author", "author_email", "files_changed"):
+                columns[name] = unpack_strings(archive[f"{name}_data"], archive[f"{name}_offsets"])
+            for name in ("commit_date", "additions", "deletions", "embedded", "embeddings"):
+                columns[name] = archive[name]
+    except SnapshotError:
+        raise
+    except Exception as e:
+        raise SnapshotError(f"unreadable snapshot: {e}")
+    if int(columns["embedded"].sum()) != len(columns["embeddings"]):
+        raise SnapshotError("embedding mask does not match the embedding matrix")
+    return meta, columns
+
+async def export_snapshot(storage, repo_id: int, path: str) -> Dict[str, Any]:
+    """write repository `repo_id` to `path`, returns the snapshot metadata"""
+    repository = await storage.get_repo(repo_id)
+    if repository is None:
+        raise SnapshotError("repository not found")
+
+    commits = await scan_commits(storage, repo_id, COMMIT_CARD)
+    #oldest first, the order a restore inserts in
+    commits.sort(key=lambda commit: (to_micros(commit.commit_date), commit.id))
+
+    embedded_positions = np.array([i for i, commit in enumerate(commits) if commit.embedding_id], dtype=np.int64)
+    found, embeddings = await fetch_embeddings(storage, [commits[i].id for i in embedded_positions.tolist()])
+    embedded = np.zeros(len(commits), dtype=bool)
+    embedded[embedded_positions[found]] = True
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "repository": repository.model_dump(
+            mode="json", include={"name", "description", "url", "language", "owner", "stars", "forks"}
+        )
+    }
+    meta = await asyncio.to_thread(write_snapshot, path, meta, commits, embedded, embeddings)
+    logger.info("snapshot exported", repo_id=repo_id, commits=meta["commits"], embeddings=meta["embeddings"])
+    return meta
+
+async def import_snapshot(storage, path: str, url: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+    """restore a snapshot, into the repository with the same url if there is one"""
+    meta, columns = await asyncio.to_thread(read_snapshot, path)
+    if meta.get("embedding_model") != settings.EMBEDDING_MODEL and meta["embeddings"] and not force:
+        raise SnapshotError(
+            f"snapshot embeddings come from {meta.get('embedding_model')}, this deployment uses "
+            f"{settings.EMBEDDING_MODEL}; they would not match query vectors"
+        )
+
+    repo_fields = {**meta["repository"], **({"url": url} if url else {})}
+    repository = await storage.get_repoURL(repo_fields["url"])
+    created = repository is None
+    if created:
+        repository = await storage.create_repo({**repo_fields, "status": RepoStatus.INDEXING.value})
+    else:
+        await storage.update_repoStatus(repository.id, RepoStatus.INDEXING)
+    repo_id = repository.id
+
+    try:
+        rows = [{
+            "sha": sha,
+            "message": message,
+            "author": author,
+            "author_email": author_email or None,
+            "commit_date": from_micros(commit_date),
+            "additions": additions,
+            "deletions": deletions,
+            "files_changed": json.loads(files_changed)
+        } for sha, message, author, author_email, files_changed, commit_date, additions, deletions in zip(
+            columns["sha"], columns["message"], columns["author"], columns["author_email"],
+            columns["files_changed"], columns["commit_date"].tolist(), columns["additions"].tolist(),
+            columns["deletions"].tolist()
+        )]
+        stored = await storage.store_commits(repo_id, rows)
+
+        #sha -> (commit id, already embedded)
+        if created:
+            commit_ids = {commit.sha: (commit.id, False) for commit in stored}
+        else:
+            commit_ids = {commit.sha: (commit.id, bool(commit.embedding_id))
+                          for commit in await scan_commits(storage, repo_id, EXISTENCE)}
+
+        embedded_rows = np.flatnonzero(columns["embedded"])
+        matrix = columns["embeddings"]
+        keep_ids, keep_rows, texts = [], [], []
+        for matrix_row, commit_row in enumerate(embedded_rows.tolist()):
+            commit_id, has_embedding = commit_ids.get(columns["sha"][commit_row], (None, True))
+            if has_embedding:
+                continue
+            keep_ids.append(commit_id)
+            keep_rows.append(matrix_row)
+            texts.append(commit_text(rows[commit_row]["message"], rows[commit_row]["files_changed"]))
+        vectors = matrix[keep_rows] if keep_rows else matrix[:0]
+        embedded = 0
+        if keep_ids:
+            embedded = await storage.store_embeddings(
+                repo_id, keep_ids, vectors, meta.get("embedding_model", settings.EMBEDDING_MODEL), texts
+            )
+            repo_stats.record_embeddings(repo_id, embedded)
+        if created and keep_ids:
+            #everything this repository has came from the matrix, no need to read it back
+            storage.load_vector_index(repo_id, keep_ids, vectors)
+
+        total_commits = await repo_stats.exact_total(storage, repo_id)
+        await storage.update_repoStatus(
+            repo_id,
+            RepoStatus.COMPLETED,
+            total_commits=total_commits,
+            indexed_commits=total_commits,
+            last_analyzed_at=datetime.now(timezone.utc).isoformat()
+        )
+        answer_cache.invalidate_repo(repo_id)
+    except Exception:
+        await storage.update_repoStatus(repo_id, RepoStatus.ERROR)
+        raise
+
+    logger.info("snapshot imported", repo_id=repo_id, commits=len(rows), inserted=len(stored), embedded=embedded)
+    return {"repository_id": repo_id, "created": created, "commits": len(rows),
+            "inserted_commits": len(stored), "embeddings": embedded}
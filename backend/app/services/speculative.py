@@ -0,0 +1,172 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.llm_executor import llm_executor
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Awaitable, Tuple
+import asyncio
+import hashlib
+import itertools
+import time
+
+logger = get_logger(__name__)
+
+#lower runs first
+FOLLOW_UP_PRIORITY = 0
+SUMMARY_PRIORITY = 1
+
+def follow_up_key(repo_id: int, version: str, question: str) -> str:
+    #scoped to the commit-set version like the answer cache, re-ingesting orphans old entries
+    digest = hashlib.sha256(question.strip().lower().encode("utf-8")).hexdigest()
+    return f"followups:{repo_id}:{version}:{digest}"
+
+def summary_key(repo_id: int, days: int) -> str:
+    return f"summary:{repo_id}:{days}"
+
+class SpeculativeQueue:
+    """low-priority precomputation of results users usually ask for next.
+
+    a single worker drains a bounded priority queue. load is checked before work is
+    submitted and again before it starts, and work is skipped while the LLM executor
+    is busy; once started an item runs to completion, a shared LLM call can't be
+    taken back from the executor anyway. finished results are kept for a TTL and
+    served once requested.
+    """
+
+    def __init__(self, max_pending: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 max_results: Optional[int] = None, load_threshold: Optional[int] = None):
+        self.max_pending = max_pending or settings.SPECULATIVE_MAX_PENDING
+        self.ttl_seconds = ttl_seconds or settings.SPECULATIVE_TTL_SECONDS
+        self.max_results = max_results or settings.SPECULATIVE_MAX_RESULTS
+        self.load_threshold = load_threshold or settings.SPECULATIVE_LOAD_THRESHOLD
+        self.ai_service = None
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._pending: set = set()
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._seq = itertools.count()
+        self._worker: Optional[asyncio.Task] = None
+        self._metrics = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "skipped_under_load": 0,
+            "served": 0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    def under_load(self) -> bool:
+        return llm_executor.queue_depth > 0 or llm_executor.active >= self.load_threshold
+
+    def submit(self, key: str, make_work: Callable[[], Awaitable[Any]], priority: int = SUMMARY_PRIORITY) -> bool:
+        if not settings.SPECULATIVE_ENABLED or not self.running:
+            return False
+        if key in self._pending or self.get(key, count=False) is not None:
+            return False
+        if len(self._pending) >= self.max_pending or self.under_load():
+            self._metrics["rejected"] += 1
+            return False
+
+        self._pending.add(key)
+        self._queue.put_nowait((priority, next(self._seq), key, make_work))
+        self._metrics["submitted"] += 1
+        return True
+
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._results[key]
+            return None
+        if count:
+            self._metrics["served"] += 1
+        return result
+
+    def discard(self, prefix: str):
+        #drop stored results whose inputs changed (e.g. new commits ingested)
+        for key in [key for key in self._results if key.startswith(prefix)]:
+            del self._results[key]
+
+    def _store(self, key: str, result: Any):
+        self._results[key] = (time.monotonic(), result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    async def _run_item(self, key: str, make_work: Callable[[], Awaitable[Any]]):
+        try:
+            result = await make_work()
+        except Exception as e:
+            self._metrics["failed"] += 1
+            logger.debug("speculative work failed", key=key, error=str(e))
+            return
+        self._store(key, result)
+        self._metrics["completed"] += 1
+
+    async def _loop(self):
+        while True:
+            _, _, key, make_work = await self._queue.get()
+            try:
+                if self.under_load():
+                    self._metrics["skipped_under_load"] += 1
+                    continue
+                await self._run_item(key, make_work)
+            finally:
+                self._pending.discard(key)
+
+    def start(self, ai_service=None):
+        self.ai_service = ai_service
+        if self._worker is None and settings.SPECULATIVE_ENABLED:
+            self._queue = asyncio.PriorityQueue()
+            self._worker = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._metrics,
+            "pending": len(self._pending),
+            "stored": len(self._results),
+            "under_load": self.under_load()
+        }
+
+speculative_queue = SpeculativeQueue()
+
+def speculate_follow_ups(ai_service, repo_id: int, version: str, question: str, answer: str,
+                         commit_count: int) -> bool:
+    async def work():
+        #generate_retry raises on failure, so an error is never stored as "no questions"
+        response = await ai_service.generate_retry(ai_service.followupP(question, answer, commit_count))
+        return ai_service.parse_questions(response)
+    return speculative_queue.submit(follow_up_key(repo_id, version, question), work, FOLLOW_UP_PRIORITY)
+
+def speculate_summary(repo_id: int, days: Optional[int] = None) -> bool:
+    #imported lazily, the summary service pulls in the storage layer
+    from app.services.backends import create_storage_service
+    from app.services.summary_service import SummaryService
+
+    days = days or settings.SPECULATIVE_SUMMARY_DAYS
+    speculative_queue.discard(f"summary:{repo_id}:")
+    if speculative_queue.ai_service is None:
+        return False
+
+    async def work():
+        service = SummaryService(create_storage_service(), speculative_queue.ai_service)
+        result = await service.summarize(repo_id, days)
+        if not result["commit_count"]:
+            raise ValueError("no commits to summarize")
+        return result
+    return speculative_queue.submit(summary_key(repo_id, days), work, SUMMARY_PRIORITY)
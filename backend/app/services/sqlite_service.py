@@ -0,0 +1,613 @@
+from app.core.logging import get_logger
+from app.core.metrics import db_metrics, payload_bytes
+from app.core.projections import LIST_ROW, COMMIT_CARD, FULL, select_columns
+from app.core.sqlite import SqliteDatabase
+from app.services.supabase_service import SupabaseService, commit_from_row
+from app.services.repo_cache import repo_cache
+from app.services.stats_service import repo_stats
+from app.models.repo import Repo, RepoStatus
+from app.models.commit import Commit
+from app.models.embedding import Embeddings
+from typing import Optional, List, Dict, Any, Tuple, Callable, Union
+from datetime import datetime, timezone, timedelta
+import json
+import threading
+import time
+import numpy as np
+
+logger = get_logger(__name__)
+
+REPO_COLUMNS = ("name", "description", "url", "language", "owner", "default_branch", "github_id", "stars",
+                "forks", "status", "total_commits", "indexed_commits", "last_analyzed_at")
+COMMIT_COLUMNS = ("repository_id", "sha", "message", "author", "author_email", "commit_date", "additions",
+                  "deletions", "files_changed", "created_at", "updated_at")
+
+INSERT_COMMIT = (
+    f"INSERT INTO commits ({', '.join(COMMIT_COLUMNS)}) VALUES ({', '.join('?' * len(COMMIT_COLUMNS))}) "
+    "ON CONFLICT (repository_id, sha) DO NOTHING"
+)
+
+ANALYSIS_COLUMNS = ("repository_id", "question", "answer", "confidence_score", "processing_time",
+                    "relevant_commit_count", "created_at")
+
+INSERT_ANALYSIS = (
+    f"INSERT INTO analyses ({', '.join(ANALYSIS_COLUMNS)}) VALUES ({', '.join('?' * len(ANALYSIS_COLUMNS))})"
+)
+
+UPSERT_EMBEDDING = (
+    "INSERT INTO embeddings (commit_id, embedding_vector, model_name, text_content, embedding_type, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (commit_id) DO UPDATE SET embedding_vector = excluded.embedding_vector, "
+    "model_name = excluded.model_name, text_content = excluded.text_content, "
+    "embedding_type = excluded.embedding_type, created_at = excluded.created_at"
+)
+INSERT_EMBEDDING = UPSERT_EMBEDDING + " RETURNING id, commit_id, model_name, text_content, embedding_type, created_at"
+
+#taken when free, expired or already ours; the row left behind says who holds it
+ACQUIRE_LEASE = (
+    "INSERT INTO leases (key, holder, operation, acquired_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET holder = excluded.holder, operation = excluded.operation, "
+    "acquired_at = excluded.acquired_at, expires_at = excluded.expires_at "
+    "WHERE leases.expires_at < excluded.acquired_at OR leases.holder = excluded.holder"
+)
+
+def utc_iso(value: Union[str, datetime]) -> str:
+    #one fixed format so text comparison on dates orders correctly
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+def now_iso() -> str:
+    return utc_iso(datetime.now(timezone.utc))
+
+def to_blob(vector) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+def from_blob(blob: bytes) -> List[float]:
+    return np.frombuffer(blob, dtype=np.float32).tolist()
+
+def row_dict(row) -> Dict[str, Any]:
+    data = dict(row)
+    if isinstance(data.get("files_changed"), str):
+        data["files_changed"] = json.loads(data["files_changed"])
+    return data
+
+class VectorCache:
+    """normalized embedding matrix per repository for in-process similarity search.
+
+    loaded from the blobs on first search and dropped whenever that repository's
+    embeddings change. the generation check stops a search that read the table
+    before a write from caching the stale matrix after it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._generations: Dict[int, int] = {}
+
+    def get(self, repo_id: int) -> Tuple[int, Optional[Tuple[np.ndarray, np.ndarray]]]:
+        with self._lock:
+            return self._generations.get(repo_id, 0), self._entries.get(repo_id)
+
+    def put(self, repo_id: int, generation: int, ids: np.ndarray, matrix: np.ndarray):
+        with self._lock:
+            if self._generations.get(repo_id, 0) == generation:
+                self._entries[repo_id] = (ids, matrix)
+
+    def invalidate(self, repo_id: int):
+        with self._lock:
+            self._generations[repo_id] = self._generations.get(repo_id, 0) + 1
+            self._entries.pop(repo_id, None)
+
+vector_cache = VectorCache()
+
+class SqliteService(SupabaseService):
+    """SupabaseService over the embedded SQLite database, same method contract"""
+
+    def __init__(self, database: SqliteDatabase):
+        super().__init__(None)
+        self.db = database
+
+    async def _run(self, op: str, fn: Callable, write: bool = False):
+        #same per-operation metrics as the Supabase data layer
+        start = time.perf_counter()
+        db_metrics.in_flight += 1
+        error = False
+        nbytes = 0
+        try:
+            result = await (self.db.write(fn) if write else self.db.read(fn))
+            if not write:
+                nbytes = payload_bytes(result)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            db_metrics.in_flight -= 1
+            db_metrics.record(op, (time.perf_counter() - start) * 1000, error, nbytes)
+
+    #repository operations
+    async def create_repo(self, repo_data: Dict[str, Any]) -> Repo:
+        try:
+            data = {column: repo_data[column] for column in REPO_COLUMNS if column in repo_data}
+            data["created_at"] = data["updated_at"] = now_iso()
+            columns = list(data)
+
+            def insert(connection):
+                row = connection.execute(
+                    f"INSERT INTO repositories ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) RETURNING *",
+                    [data[column] for column in columns]
+                ).fetchone()
+                return dict(row)
+
+            row = await self._run("create_repo", insert, write=True)
+            logger.info("repository created", repo_id=row["id"])
+            repo = Repo(**row)
+            repo_cache.put(repo.id, repo, publish=True)
+            repo_stats.record_repo_created()
+            return repo
+
+        except Exception as e:
+            logger.error("error creating repository", error=str(e))
+            raise
+
+    async def get_repoURL(self, url: str, projection: str = FULL) -> Optional[Repo]:
+        columns = select_columns('repositories', projection)
+        try:
+            rows = await self._run("get_repoURL", lambda connection: [dict(row) for row in connection.execute(
+                f"SELECT {columns} FROM repositories WHERE url = ?", (str(url),)
+            )])
+            return Repo(**rows[0]) if rows else None
+        except Exception as e:
+            logger.error("error fetching repostiory by url", error=str(e))
+            return None
+
+    async def fetch_repo(self, repo_id: int, projection: str = FULL) -> Optional[Repo]:
+        columns = select_columns('repositories', projection)
+        try:
+            op = "get_repo" if projection == FULL else f"get_repo:{projection}"
+            rows = await self._run(op, lambda connection: [dict(row) for row in connection.execute(
+                f"SELECT {columns} FROM repositories WHERE id = ?", (repo_id,)
+            )])
+            return Repo(**rows[0]) if rows else None
+        except Exception as e:
+            logger.error("Error fetching repository", repo_id=repo_id, error=str(e))
+            raise
+
+    async def update_repoStatus(self, repo_id: int, status: RepoStatus, **kwargs) -> bool:
+        try:
+            data = {column: kwargs[column] for column in REPO_COLUMNS if column in kwargs}
+            data.update(status=status.value, updated_at=now_iso())
+            for column, value in data.items():
+                if isinstance(value, datetime):
+                    data[column] = utc_iso(value)
+            columns = list(data)
+
+            def update(connection):
+                row = connection.execute(
+                    f"UPDATE repositories SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ? RETURNING *",
+                    [data[column] for column in columns] + [repo_id]
+                ).fetchone()
+                return dict(row) if row else None
+
+            row = await self._run("update_repoStatus", update, write=True)
+            if row:
+                logger.info("repository status updated", repo_id=repo_id, status=status.value)
+                repo_cache.put(repo_id, Repo(**row), publish=True)
+                return True
+            repo_cache.invalidate(repo_id)
+            return False
+
+        except Exception as e:
+            logger.error("error updating repository", repo_id=repo_id, error=str(e))
+            repo_cache.invalidate(repo_id)
+            return False
+
+    async def delete_repo(self, repo_id: int) -> bool:
+        #commits, embeddings and analyses go with it through the foreign key cascade
+        repo_cache.invalidate(repo_id)
+        try:
+            deleted = await self._run("delete_repo", lambda connection: connection.execute(
+                "DELETE FROM repositories WHERE id = ?", (repo_id,)
+            ).rowcount, write=True)
+            vector_cache.invalidate(repo_id)
+            if deleted:
+                repo_stats.record_repo_deleted(repo_id)
+                logger.info("repository deleted", repo_id=repo_id)
+                return True
+            return False
+
+        except Exception as e:
+            logger.error("error deleting repository", repo_id=repo_id, error=str(e))
+            return False
+
+    async def list_repo(self, limit: int = None, offset: int = 0, projection: str = LIST_ROW) -> List[Repo]:
+        columns = select_columns('repositories', projection)
+        try:
+            rows = await self._run("list_repo", lambda connection: [dict(row) for row in connection.execute(
+                f"SELECT {columns} FROM repositories ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                (limit or -1, offset or 0)
+            )])
+            return [Repo(**row) for row in rows]
+
+        except Exception as e:
+            logger.error("error fetching repositories", error=str(e))
+            raise Exception(f"error fetching repositories: {str(e)}")
+
+    async def list_repo_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                             projection: str = LIST_ROW) -> List[Repo]:
+        columns = select_columns('repositories', projection)
+        try:
+            if after:
+                created_at, last_id = utc_iso(after[0]), int(after[1])
+                query = (f"SELECT {columns} FROM repositories WHERE created_at < ? OR (created_at = ? AND id < ?) "
+                         "ORDER BY created_at DESC, id DESC LIMIT ?")
+                params = (created_at, created_at, last_id, limit)
+            else:
+                query = f"SELECT {columns} FROM repositories ORDER BY created_at DESC, id DESC LIMIT ?"
+                params = (limit,)
+            rows = await self._run("list_repo_page", lambda connection: [
+                dict(row) for row in connection.execute(query, params)
+            ])
+            return [Repo(**row) for row in rows]
+
+        except Exception as e:
+            logger.error("error fetching repository page", error=str(e))
+            raise Exception(f"error fetching repositories: {str(e)}")
+
+    async def count_repos(self) -> int:
+        #exact and cheap here, no need for the estimate cache
+        try:
+            return await self._run("count_repos", lambda connection: connection.execute(
+                "SELECT count(*) FROM repositories"
+            ).fetchone()[0])
+        except Exception as e:
+            logger.error("error counting repositories", error=str(e))
+            return 0
+
+    #commit operations
+    async def _upsert_commit_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        values = []
+        for row in batch:
+            row = {**row, "commit_date": utc_iso(row["commit_date"]),
+                   "files_changed": json.dumps(row.get("files_changed") or [])}
+            values.append([row.get(column) for column in COMMIT_COLUMNS])
+
+        def upsert(connection):
+            #the writer thread is the only writer, so every id past the old max is one of ours
+            last_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM commits").fetchone()[0]
+            connection.executemany(INSERT_COMMIT, values)
+            return [row_dict(row) for row in connection.execute(
+                "SELECT * FROM commits WHERE id > ? ORDER BY id", (last_id,)
+            )]
+
+        return await self._run("store_commits", upsert, write=True)
+
+    async def get_commits(self, repo_id: int, limit: int = 100, offset: int = 0,
+                          projection: str = COMMIT_CARD) -> List[Commit]:
+        columns = select_columns('commits', projection)
+        try:
+            rows = await self._run("get_commits", lambda connection: [row_dict(row) for row in connection.execute(
+                f"SELECT {columns} FROM commits WHERE repository_id = ? ORDER BY commit_date DESC LIMIT ? OFFSET ?",
+                (repo_id, limit, offset)
+            )])
+            return [commit_from_row(row, projection) for row in rows]
+
+        except Exception as e:
+            logger.error("Error fetching commits", repo_id=repo_id, error=str(e))
+            return []
+
+    async def get_commit_page(self, repo_id: int, after_id: int = 0, limit: int = 1000,
+                              projection: str = COMMIT_CARD) -> List[Commit]:
+        #keyset page by id for full scans
+        columns = select_columns('commits', projection)
+        rows = await self._run("get_commit_page", lambda connection: [row_dict(row) for row in connection.execute(
+            f"SELECT {columns} FROM commits WHERE repository_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (repo_id, after_id, limit)
+        )])
+        return [commit_from_row(row, projection) for row in rows]
+
+    async def get_commits_since(self, repo_id: int, since: datetime, page_size: int = 1000,
+                                max_commits: Optional[int] = None, projection: str = COMMIT_CARD) -> List[Commit]:
+        #no round trips to save, one query instead of pages. newest first so a capped fetch
+        #keeps the most recent commits, returned oldest first
+        columns = select_columns('commits', projection)
+        try:
+            rows = await self._run("get_commits_since", lambda connection: [row_dict(row) for row in connection.execute(
+                f"SELECT {columns} FROM commits WHERE repository_id = ? AND commit_date >= ? "
+                "ORDER BY commit_date DESC, id DESC LIMIT ?",
+                (repo_id, utc_iso(since), max_commits or -1)
+            )])
+            return [commit_from_row(row, projection) for row in reversed(rows)]
+
+        except Exception as e:
+            logger.error("Error fetching commits since", repo_id=repo_id, since=since.isoformat(), error=str(e))
+            return []
+
+    async def get_commit_stat_rows(self, repo_id: int, page_size: int = 1000) -> List[Dict[str, Any]]:
+        return await self._run("get_commit_stat_rows", lambda connection: [dict(row) for row in connection.execute(
+            "SELECT commit_date, additions, deletions, embedding_id FROM commits WHERE repository_id = ?",
+            (repo_id,)
+        )])
+
+    async def get_commit_by_sha(self, repo_id: int, sha: str, projection: str = FULL) -> Optional[Commit]:
+        columns = select_columns('commits', projection)
+        try:
+            rows = await self._run("get_commit_by_sha", lambda connection: [row_dict(row) for row in connection.execute(
+                f"SELECT {columns} FROM commits WHERE repository_id = ? AND sha = ?", (repo_id, sha)
+            )])
+            return commit_from_row(rows[0], projection) if rows else None
+
+        except Exception as e:
+            logger.error("error fetching commit by SHA", repo_id=repo_id, sha=sha[:8], error=str(e))
+            return None
+
+    #embedding operations
+    async def store_embedding(self, embedding: Embeddings) -> Embeddings:
+        try:
+            created_at = now_iso()
+
+            def insert(connection):
+                row = dict(connection.execute(INSERT_EMBEDDING, (
+                    embedding.commit_id, to_blob(embedding.embedding_vector), embedding.model_name,
+                    embedding.text_content, embedding.embedding_type, created_at
+                )).fetchone())
+                commit = connection.execute(
+                    "UPDATE commits SET embedding_id = ?, embedding_created_at = ?, updated_at = ? "
+                    "WHERE id = ? RETURNING repository_id",
+                    (str(row["id"]), created_at, created_at, embedding.commit_id)
+                ).fetchone()
+                return row, commit["repository_id"] if commit else None
+
+            row, repo_id = await self._run("store_embedding", insert, write=True)
+            if repo_id is not None:
+                vector_cache.invalidate(repo_id)
+            logger.debug("embedding stored", commit_id=embedding.commit_id)
+            return Embeddings(**row, embedding_vector=embedding.embedding_vector)
+
+        except Exception as e:
+            logger.error("Error storing embedding", commit_id=embedding.commit_id, error=str(e))
+            raise
+
+    async def store_embeddings(self, repo_id: int, commit_ids: List[int], vectors: np.ndarray, model_name: str,
+                               text_contents: List[str], embedding_type: str = "commit_message") -> int:
+        created_at = now_iso()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        values = [(int(commit_id), vector.tobytes(), model_name, text_content, embedding_type, created_at)
+                  for commit_id, vector, text_content in zip(commit_ids, vectors, text_contents)]
+        links = [(int(commit_id), created_at, created_at, int(commit_id)) for commit_id in commit_ids]
+
+        def insert(connection):
+            connection.executemany(UPSERT_EMBEDDING, values)
+            connection.executemany(
+                "UPDATE commits SET embedding_id = (SELECT CAST(id AS TEXT) FROM embeddings WHERE commit_id = ?), "
+                "embedding_created_at = ?, updated_at = ? WHERE id = ?", links
+            )
+            return len(values)
+
+        stored = await self._run("store_embeddings", insert, write=True)
+        vector_cache.invalidate(repo_id)
+        logger.info("embeddings stored", repo_id=repo_id, count=stored)
+        return stored
+
+    def load_vector_index(self, repo_id: int, commit_ids: List[int], vectors: np.ndarray) -> bool:
+        #seed the search matrix directly, must be every embedding the repository has
+        generation, _ = vector_cache.get(repo_id)
+        ids = np.asarray(commit_ids, dtype=np.int64)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        vector_cache.put(repo_id, generation, ids, matrix / np.where(norms == 0, 1.0, norms))
+        return True
+
+    async def delete_embedding(self, commit_id: int) -> bool:
+        try:
+            def delete(connection):
+                deleted = connection.execute("DELETE FROM embeddings WHERE commit_id = ?", (commit_id,)).rowcount
+                commit = connection.execute(
+                    "UPDATE commits SET embedding_id = NULL, updated_at = ? WHERE id = ? RETURNING repository_id",
+                    (now_iso(), commit_id)
+                ).fetchone()
+                return deleted, commit["repository_id"] if commit else None
+
+            deleted, repo_id = await self._run("delete_embedding", delete, write=True)
+            if repo_id is not None:
+                vector_cache.invalidate(repo_id)
+            return bool(deleted)
+
+        except Exception as e:
+            logger.error("Error deleting embedding", commit_id=commit_id, error=str(e))
+            return False
+
+    async def update_commit_embedding(self, commit_id: int, embedding_id: int) -> bool:
+        try:
+            updated = await self._run("update_commit_embedding", lambda connection: connection.execute(
+                "UPDATE commits SET embedding_id = ?, updated_at = ? WHERE id = ?",
+                (str(embedding_id), now_iso(), commit_id)
+            ).rowcount, write=True)
+            if updated:
+                logger.debug("Commit updated with embedding", commit_id=commit_id, embedding_id=embedding_id)
+            return bool(updated)
+
+        except Exception as e:
+            logger.error("Error updating commit embedding", commit_id=commit_id, error=str(e))
+            return False
+
+    async def search_similarCommits(self, query_embedding: List[float], repo_id: int,
+                                    limit: int = 10, threshold: float = 0.7) -> List[Dict]:
+        #cosine similarity over the cached per-repository matrix, computed on the reader thread
+        def search(connection):
+            generation, cached = vector_cache.get(repo_id)
+            if cached is None:
+                rows = connection.execute(
+                    "SELECT e.commit_id, e.embedding_vector FROM embeddings e JOIN commits c ON c.id = e.commit_id "
+                    "WHERE c.repository_id = ? ORDER BY e.commit_id", (repo_id,)
+                ).fetchall()
+                if not rows:
+                    return []
+                ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+                matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), -1)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix = matrix / np.where(norms == 0, 1.0, norms)
+                vector_cache.put(repo_id, generation, ids, matrix)
+                cached = (ids, matrix)
+            ids, matrix = cached
+
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+            similarities = matrix @ query
+            count = min(limit, len(ids))
+            top = np.argpartition(-similarities, count - 1)[:count]
+            top = top[np.argsort(-similarities[top])]
+            top = [idx for idx in top if similarities[idx] >= threshold]
+            if not top:
+                return []
+
+            matched = [int(ids[idx]) for idx in top]
+            commits = {row["id"]: row_dict(row) for row in connection.execute(
+                "SELECT id, sha, message, author, commit_date, files_changed, additions, deletions "
+                f"FROM commits WHERE id IN ({', '.join('?' * len(matched))})", matched
+            )}
+            results = []
+            for idx, commit_id in zip(top, matched):
+                commit = commits.get(commit_id)
+                if commit is None:
+                    continue
+                results.append({
+                    "commit_id": commit_id,
+                    "sha": commit["sha"],
+                    "message": commit["message"],
+                    "author": commit["author"],
+                    "commit_date": commit["commit_date"],
+                    "similarity": float(similarities[idx]),
+                    "files_changed": commit["files_changed"],
+                    "additions": commit["additions"],
+                    "deletions": commit["deletions"]
+                })
+            return results
+
+        try:
+            return await self._run("search_similarCommits", search)
+        except Exception as e:
+            logger.error("Error searching similar commits", repo_id=repo_id, error=str(e))
+            return []
+
+    async def get_commit_embeddings(self, commit_ids: List[int]) -> Dict[int, List[float]]:
+        if not commit_ids:
+            return {}
+        try:
+            def fetch(connection):
+                vectors = {}
+                #stay well under SQLite's bound parameter limit
+                for i in range(0, len(commit_ids), 500):
+                    chunk = commit_ids[i:i + 500]
+                    for row in connection.execute(
+                        f"SELECT commit_id, embedding_vector FROM embeddings WHERE commit_id IN ({', '.join('?' * len(chunk))})",
+                        chunk
+                    ):
+                        vectors[row[0]] = from_blob(row[1])
+                return vectors
+
+            return await self._run("get_commit_embeddings", fetch)
+
+        except Exception as e:
+            logger.error("Error fetching commit embeddings", count=len(commit_ids), error=str(e))
+            return {}
+
+    #analysis history
+    async def store_analyses(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        values = [[row.get(column) for column in ANALYSIS_COLUMNS] for row in rows]
+        await self._run("store_analyses", lambda connection: connection.executemany(INSERT_ANALYSIS, values),
+                        write=True)
+        return len(rows)
+
+    async def get_analyses(self, repo_id: int, limit: int, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        try:
+            return await self._run("get_analyses", lambda connection: [dict(row) for row in connection.execute(
+                "SELECT id, question, answer, confidence_score, processing_time, relevant_commit_count, created_at "
+                "FROM analyses WHERE repository_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (repo_id, before_id if before_id is not None else 2 ** 63 - 1, limit)
+            )])
+        except Exception as e:
+            logger.error("error fetching analysis history", repo_id=repo_id, error=str(e))
+            raise
+
+    async def count_analyses(self, repo_id: int) -> int:
+        try:
+            return await self._run("count_analyses", lambda connection: connection.execute(
+                "SELECT count(*) FROM analyses WHERE repository_id = ?", (repo_id,)
+            ).fetchone()[0])
+        except Exception as e:
+            logger.error("error counting analyses", repo_id=repo_id, error=str(e))
+            return 0
+
+    #leases
+    async def acquire_lease(self, key: str, holder: str, operation: str,
+                            ttl_seconds: float) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        now = datetime.now(timezone.utc)
+        values = (key, holder, operation, utc_iso(now), utc_iso(now + timedelta(seconds=ttl_seconds)))
+
+        def acquire(connection):
+            connection.execute(ACQUIRE_LEASE, values)
+            return dict(connection.execute("SELECT * FROM leases WHERE key = ?", (key,)).fetchone())
+
+        lease = await self._run("acquire_lease", acquire, write=True)
+        return lease["holder"] == holder, lease
+
+    async def renew_lease(self, key: str, holder: str, ttl_seconds: float) -> bool:
+        expires_at = utc_iso(datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds))
+        return await self._run("renew_lease", lambda connection: connection.execute(
+            "UPDATE leases SET expires_at = ? WHERE key = ? AND holder = ?", (expires_at, key, holder)
+        ).rowcount > 0, write=True)
+
+    async def release_lease(self, key: str, holder: str) -> bool:
+        return await self._run("release_lease", lambda connection: connection.execute(
+            "DELETE FROM leases WHERE key = ? AND holder = ?", (key, holder)
+        ).rowcount > 0, write=True)
+
+    async def get_lease(self, key: str) -> Optional[Dict[str, Any]]:
+        row = await self._run("get_lease", lambda connection: connection.execute(
+            "SELECT * FROM leases WHERE key = ? AND expires_at >= ?", (key, now_iso())
+        ).fetchone())
+        return dict(row) if row else None
+
+    #statistics
+    async def get_repository_stats(self, repo_id: int) -> Dict[str, Any]:
+        try:
+            total_commits, total_embeddings = await self._run("get_repository_stats", lambda connection: tuple(
+                connection.execute(
+                    "SELECT count(*), count(embedding_id) FROM commits WHERE repository_id = ?", (repo_id,)
+                ).fetchone()
+            ))
+            return {
+                "total_commits": total_commits,
+                "total_embeddings": total_embeddings,
+                "embedding_progress": total_embeddings / total_commits if total_commits > 0 else 0.0,
+                "last_updated": datetime.now(timezone.utc).isoformat()
+            }
+
+        except Exception as e:
+            logger.error("error getting repository stats", repo_id=repo_id, error=str(e))
+            return {}
+
+    async def get_global(self) -> Dict[str, Any]:
+        try:
+            repositories, commits, embeddings = await self._run("get_global", lambda connection: tuple(
+                connection.execute(
+                    "SELECT (SELECT count(*) FROM repositories), (SELECT count(*) FROM commits), "
+                    "(SELECT count(*) FROM embeddings)"
+                ).fetchone()
+            ))
+            return {
+                "total_repositories": repositories,
+                "total_commits": commits,
+                "total_embeddings": embeddings,
+                "last_updated": datetime.now(timezone.utc).isoformat()
+            }
+
+        except Exception as e:
+            logger.error("Error getting global stats", error=str(e))
+            return {}
@@ -0,0 +1,232 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.commit import Commit
+from typing import Optional, Dict, Any, Union, Iterable
+from datetime import datetime, timezone
+import asyncio
+
+logger = get_logger(__name__)
+
+#days of per-day commit counts kept for the 7/30 day windows
+HISTORY_DAYS = 30
+
+def commit_day(commit_date: Union[str, datetime]) -> int:
+    if isinstance(commit_date, str):
+        commit_date = datetime.fromisoformat(commit_date.replace('Z', '+00:00'))
+    if commit_date.tzinfo is None:
+        commit_date = commit_date.replace(tzinfo=timezone.utc)
+    return commit_date.astimezone(timezone.utc).date().toordinal()
+
+def today() -> int:
+    return datetime.now(timezone.utc).date().toordinal()
+
+class RepoCounters:
+    """running totals for one repository plus per-day commit counts for the recent windows"""
+
+    def __init__(self):
+        self.total_commits = 0
+        self.embedded_commits = 0
+        self.additions = 0
+        self.deletions = 0
+        self.days: Dict[int, int] = {}
+
+    def add_commit(self, commit_date: Union[str, datetime], additions: int, deletions: int):
+        self.total_commits += 1
+        self.additions += additions or 0
+        self.deletions += deletions or 0
+        day = commit_day(commit_date)
+        if day > today() - HISTORY_DAYS:
+            self.days[day] = self.days.get(day, 0) + 1
+
+    def recent(self, days: int) -> int:
+        cutoff = today() - days
+        #prune as we go so the histogram never outgrows the window
+        for day in [day for day in self.days if day <= today() - HISTORY_DAYS]:
+            del self.days[day]
+        return sum(count for day, count in self.days.items() if day > cutoff)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_commits": self.total_commits,
+            "embedded_commits": self.embedded_commits,
+            "embedding_progress": self.embedded_commits / self.total_commits if self.total_commits > 0 else 0.0,
+            "commits_7d": self.recent(7),
+            "commits_30d": self.recent(30),
+            "additions": self.additions,
+            "deletions": self.deletions
+        }
+
+class StatsService:
+    """incrementally maintained repository and global statistics.
+
+    ingestion and embedding writes bump the counters, so reads are O(1). a repo's
+    counters are loaded from storage the first time it is asked for, and a periodic
+    reconciliation corrects drift (writes from other workers, failed partial batches,
+    rows changed outside the API). it compares cheap commit/embedding counts first and
+    only reloads a repo whose counts disagree; a reload that raced with local writes
+    is thrown away rather than swapped in, the next cycle checks that repo again.
+    """
+
+    def __init__(self, reconcile_seconds: Optional[int] = None):
+        self.reconcile_seconds = reconcile_seconds or settings.STATS_RECONCILE_SECONDS
+        self._repos: Dict[int, RepoCounters] = {}
+        #bumped on every local write, a load that saw it change is stale
+        self._writes: Dict[int, int] = {}
+        self._global: Optional[Dict[str, int]] = None
+        self.last_reconciled_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._metrics = {"reconciliations": 0, "repos_reconciled": 0, "repos_reloaded": 0,
+                         "drift_corrections": 0, "stale_reloads": 0}
+
+    #write path
+    def record_commits(self, repo_id: int, commits: Iterable[Union[Commit, Dict[str, Any]]]):
+        self._writes[repo_id] = self._writes.get(repo_id, 0) + 1
+        counters = self._repos.get(repo_id)
+        added = 0
+        for commit in commits:
+            added += 1
+            if counters is not None:
+                if isinstance(commit, dict):
+                    counters.add_commit(commit["commit_date"], commit.get("additions", 0), commit.get("deletions", 0))
+                else:
+                    counters.add_commit(commit.commit_date, commit.additions, commit.deletions)
+        if self._global is not None:
+            self._global["total_commits"] += added
+
+    def record_embeddings(self, repo_id: int, count: int):
+        self._writes[repo_id] = self._writes.get(repo_id, 0) + 1
+        counters = self._repos.get(repo_id)
+        if counters is not None:
+            counters.embedded_commits = max(0, counters.embedded_commits + count)
+        if self._global is not None:
+            self._global["total_embeddings"] = max(0, self._global["total_embeddings"] + count)
+
+    def record_repo_created(self):
+        if self._global is not None:
+            self._global["total_repositories"] += 1
+
+    def record_repo_deleted(self, repo_id: int):
+        counters = self._repos.pop(repo_id, None)
+        self._writes.pop(repo_id, None)
+        if self._global is not None:
+            self._global["total_repositories"] = max(0, self._global["total_repositories"] - 1)
+            if counters is not None:
+                self._global["total_commits"] = max(0, self._global["total_commits"] - counters.total_commits)
+                self._global["total_embeddings"] = max(0, self._global["total_embeddings"] - counters.embedded_commits)
+            else:
+                #unknown share of the totals, let reconciliation recount
+                self._global = None
+
+    #read path
+    async def load_repo(self, storage, repo_id: int) -> RepoCounters:
+        counters = RepoCounters()
+        for row in await storage.get_commit_stat_rows(repo_id):
+            counters.add_commit(row["commit_date"], row.get("additions", 0), row.get("deletions", 0))
+            if row.get("embedding_id"):
+                counters.embedded_commits += 1
+        return counters
+
+    async def repo_stats(self, storage, repo_id: int) -> Dict[str, Any]:
+        counters = self._repos.get(repo_id)
+        if counters is None:
+            writes = self._writes.get(repo_id, 0)
+            counters = await self.load_repo(storage, repo_id)
+            #writes that landed mid-load may be missing from it, don't cache it
+            if self._writes.get(repo_id, 0) == writes:
+                counters = self._repos.setdefault(repo_id, counters)
+        return counters.as_dict()
+
+    async def exact_total(self, storage, repo_id: int) -> int:
+        """commit count straight from storage, for values persisted on the repository row.
+
+        the counters only see this process's writes until the next reconciliation, so
+        they are the fallback here rather than the source.
+        """
+        counts = await storage.get_repository_stats(repo_id)
+        if counts:
+            return counts["total_commits"]
+        logger.warning("exact commit count unavailable, using counters", repo_id=repo_id)
+        return (await self.repo_stats(storage, repo_id))["total_commits"]
+
+    async def global_stats(self, storage) -> Dict[str, Any]:
+        if self._global is None:
+            await self.reconcile_global(storage)
+        return {
+            **self._global,
+            "last_reconciled_at": self.last_reconciled_at
+        }
+
+    #reconciliation
+    async def reconcile_global(self, storage):
+        totals = await storage.get_global()
+        if not totals:
+            raise Exception("global stats unavailable")
+        fresh = {key: totals.get(key, 0) for key in ("total_repositories", "total_commits", "total_embeddings")}
+        if self._global is not None and fresh != self._global:
+            self._metrics["drift_corrections"] += 1
+            logger.info("global stats drift corrected", counted=self._global, actual=fresh)
+        self._global = fresh
+        self.last_reconciled_at = datetime.now(timezone.utc)
+
+    async def reconcile(self, storage):
+        await self.reconcile_global(storage)
+        for repo_id in list(self._repos):
+            await self.reconcile_repo(storage, repo_id)
+        self._metrics["reconciliations"] += 1
+
+    async def reconcile_repo(self, storage, repo_id: int):
+        #two count queries, the full per-commit reload only runs when they disagree
+        counts = await storage.get_repository_stats(repo_id)
+        current = self._repos.get(repo_id)
+        if current is None or not counts:
+            return
+        self._metrics["repos_reconciled"] += 1
+        actual = (counts.get("total_commits", 0), counts.get("total_embeddings", 0))
+        if (current.total_commits, current.embedded_commits) == actual:
+            return
+
+        writes = self._writes.get(repo_id, 0)
+        fresh = await self.load_repo(storage, repo_id)
+        self._metrics["repos_reloaded"] += 1
+        current = self._repos.get(repo_id)
+        if current is None:
+            #deleted while we were counting
+            return
+        if self._writes.get(repo_id, 0) != writes:
+            #ingestion or embedding wrote meanwhile, fresh may miss or double count those rows
+            self._metrics["stale_reloads"] += 1
+            logger.debug("repository stats reload raced with writes, kept counters", repo_id=repo_id)
+            return
+        if (current.total_commits, current.embedded_commits) != (fresh.total_commits, fresh.embedded_commits):
+            self._metrics["drift_corrections"] += 1
+            logger.info("repository stats drift corrected", repo_id=repo_id,
+                        counted=current.total_commits, actual=fresh.total_commits)
+        self._repos[repo_id] = fresh
+
+    async def _loop(self):
+        from app.services.backends import create_storage_service
+        while True:
+            try:
+                await self.reconcile(create_storage_service())
+            except Exception as e:
+                logger.error("stats reconciliation failed", error=str(e))
+            await asyncio.sleep(self.reconcile_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._metrics, "repos_tracked": len(self._repos),
+                "last_reconciled_at": self.last_reconciled_at.isoformat() if self.last_reconciled_at else None}
+
+repo_stats = StatsService()
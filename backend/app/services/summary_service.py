@@ -0,0 +1,160 @@
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.commit import Commit
+from app.models.embedding import EmbeddingResult
+from app.services.ai_services import AIService
+from app.services.supabase_service import SupabaseService
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone, timedelta
+import asyncio
+import hashlib
+
+logger = get_logger(__name__)
+
+class SummaryCache:
+    """LRU of generated summaries keyed by the commit set (or child summaries) they cover"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.SUMMARY_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        summary = self._entries.get(key)
+        if summary is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return summary
+
+    def put(self, key: str, summary: str):
+        self._entries[key] = summary
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+summary_cache = SummaryCache()
+
+def commit_to_result(commit: Commit) -> EmbeddingResult:
+    return EmbeddingResult(
+        commit_id=commit.id or 0,
+        sha=commit.sha,
+        message=commit.message,
+        author=commit.author,
+        commit_date=commit.commit_date,
+        similarity_score=1.0,
+        files_changed=commit.files_changed,
+        additions=commit.additions,
+        deletions=commit.deletions
+    )
+
+class SummaryService:
+    """map-reduce repository summaries over fixed time windows.
+
+    history is split into windows aligned to the epoch, so the same window has the
+    same commit set on every request. each window is summarized once and cached by
+    its commit set; window summaries are then reduced in groups of `fan_in` aligned
+    windows (window index // fan_in, then again per level) until one summary
+    remains, so a moving `since` only changes the groups at the edges. reduce steps
+    are cached by their children as well, so a repeat request only pays for windows
+    that gained commits.
+    """
+
+    def __init__(self, supabase_service: SupabaseService, ai_service: AIService,
+                 window_days: Optional[int] = None, fan_in: Optional[int] = None,
+                 cache: Optional[SummaryCache] = None):
+        self.supabase_service = supabase_service
+        self.ai_service = ai_service
+        self.window_days = window_days or settings.SUMMARY_WINDOW_DAYS
+        self.fan_in = max(2, fan_in or settings.SUMMARY_REDUCE_FAN_IN)
+        self.cache = cache or summary_cache
+
+    def _key(self, kind: str, parts: List[str]) -> str:
+        digest = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+        return f"{kind}:{self.ai_service.model_name}:{digest}"
+
+    def split_windows(self, commits: List[Commit]) -> List[Tuple[int, List[Commit]]]:
+        """(epoch window index, commits) pairs, oldest window first"""
+        window_seconds = self.window_days * 86400
+        windows: Dict[int, List[Commit]] = {}
+        for commit in commits:
+            commit_date = commit.commit_date
+            if commit_date.tzinfo is None:
+                commit_date = commit_date.replace(tzinfo=timezone.utc)
+            windows.setdefault(int(commit_date.timestamp() // window_seconds), []).append(commit)
+        return [(index, sorted(windows[index], key=lambda c: c.commit_date)) for index in sorted(windows)]
+
+    async def summarize_window(self, commits: List[Commit]) -> Tuple[str, str, bool]:
+        key = self._key("window", sorted(commit.sha for commit in commits))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return key, cached, True
+
+        context, _ = self.ai_service.commit_context([commit_to_result(commit) for commit in commits])
+        #errors propagate so a failed window is never cached
+        summary = await self.ai_service.generate_retry(self.ai_service.summaryP(context))
+        self.cache.put(key, summary)
+        return key, summary, False
+
+    async def reduce_group(self, group: List[Tuple[str, str]]) -> Tuple[str, str, bool]:
+        if len(group) == 1:
+            return group[0][0], group[0][1], True
+        key = self._key("reduce", [child_key for child_key, _ in group])
+        cached = self.cache.get(key)
+        if cached is not None:
+            return key, cached, True
+
+        summary = await self.ai_service.generate_retry(
+            self.ai_service.reduceP([child_summary for _, child_summary in group])
+        )
+        self.cache.put(key, summary)
+        return key, summary, False
+
+    async def summarize(self, repo_id: int, days: int) -> Dict[str, Any]:
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        commits = await self.supabase_service.get_commits_since(
+            repo_id, since, max_commits=settings.SUMMARY_MAX_COMMITS
+        )
+        if not commits:
+            return {"summary": None, "commit_count": 0, "window_count": 0,
+                    "llm_calls": 0, "cached_parts": 0}
+
+        windows = self.split_windows(commits)
+        if len(commits) >= settings.SUMMARY_MAX_COMMITS and len(windows) > 1:
+            #capped to the newest commits, the oldest window is likely cut short and its
+            #commit set would shift with every new commit
+            windows = windows[1:]
+            commits = [commit for _, window in windows for commit in window]
+        mapped = await asyncio.gather(*[self.summarize_window(window) for _, window in windows])
+        llm_calls = sum(1 for _, _, was_cached in mapped if not was_cached)
+        cached_parts = len(mapped) - llm_calls
+
+        level = [(index, key, summary) for (index, _), (key, summary, _) in zip(windows, mapped)]
+        while len(level) > 1:
+            #children grouped by aligned boundary, not list position
+            grouped: Dict[int, List[Tuple[str, str]]] = {}
+            for index, key, summary in level:
+                grouped.setdefault(index // self.fan_in, []).append((key, summary))
+            parents = sorted(grouped)
+            groups = [grouped[parent] for parent in parents]
+            reduced = await asyncio.gather(*[self.reduce_group(group) for group in groups])
+            llm_calls += sum(1 for _, _, was_cached in reduced if not was_cached)
+            cached_parts += sum(1 for group, (_, _, was_cached) in zip(groups, reduced)
+                                if was_cached and len(group) > 1)
+            level = [(parent, key, summary) for parent, (key, summary, _) in zip(parents, reduced)]
+
+        logger.info("repository summary reduced", repo_id=repo_id, days=days, commits=len(commits),
+                    windows=len(windows), llm_calls=llm_calls, cached_parts=cached_parts)
+        return {
+            "summary": level[0][2],
+            "commit_count": len(commits),
+            "window_count": len(windows),
+            "llm_calls": llm_calls,
+            "cached_parts": cached_parts
+        }
@@ -1,18 +1,72 @@
+from app.core.config import settings
 from app.core.logging import get_logger
-from app.core.supabase import get_supabase
+from app.core.metrics import db_metrics, payload_bytes
+from app.core.projections import EXISTENCE, LIST_ROW, COMMIT_CARD, FULL, select_columns
+from app.services.repo_cache import repo_cache
+from app.services.stats_service import repo_stats
 from app.models.repo import Repo, RepoStatus
 from app.models.commit import Commit, CommitDiff
 from app.models.embedding import Embeddings
-from supabase import Client
-from typing import Optional, List, Dict, Union, Any
-from datetime import datetime, timezone
+from supabase import AsyncClient
+from postgrest.types import ReturnMethod
+from postgrest.exceptions import APIError
+from typing import Optional, List, Dict, Union, Any, Tuple
+from datetime import datetime, timezone, timedelta
+import asyncio
+import json
+import time
+import numpy as np
 
 logger = get_logger(__name__)
 
+def payload_batches(rows: List[Dict[str, Any]], max_bytes: int, max_rows: int) -> List[List[Dict[str, Any]]]:
+    #split by serialized size as well as row count, commit messages vary a lot in length
+    batches: List[List[Dict[str, Any]]] = []
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    for row in rows:
+        row_bytes = len(json.dumps(row, default=str))
+        if batch and (batch_bytes + row_bytes > max_bytes or len(batch) >= max_rows):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(row)
+        batch_bytes += row_bytes
+    if batch:
+        batches.append(batch)
+    return batches
+
+def commit_from_row(commit_data: Dict[str, Any], projection: str = FULL) -> Commit:
+    if isinstance(commit_data.get('commit_date'),str):
+        commit_data['commit_date']=datetime.fromisoformat(commit_data['commit_date'].replace('Z','+00:00'))
+    if projection == EXISTENCE:
+        #too few columns to validate, callers only read id, sha and embedding_id
+        return Commit.model_construct(**commit_data)
+    return Commit(**commit_data)
+
+#shared estimated repository count, reset when repositories are created or deleted
+repo_count_cache: Dict[str, Any] = {"value": None, "at": 0.0}
+
 class SupabaseService:
-    def __init__(self, client: Client):
+    def __init__(self, client: AsyncClient):
         self.client =client
 
+    async def _execute(self, op: str, query):
+        #every query goes through here so per-operation latency shows up in /metrics
+        start = time.perf_counter()
+        db_metrics.in_flight += 1
+        error = False
+        nbytes = 0
+        try:
+            response = await query.execute()
+            nbytes = payload_bytes(response.data)
+            return response
+        except Exception:
+            error = True
+            raise
+        finally:
+            db_metrics.in_flight -= 1
+            db_metrics.record(op, (time.perf_counter() - start) * 1000, error, nbytes)
+
     #repository operations
     async def create_repo(self, repo_data: Dict[str, Any])-> Repo:
         """new repository record"""
@@ -22,11 +76,15 @@ class SupabaseService:
                 "created_at":datetime.now(timezone.utc).isoformat(),
                 "updated_at":datetime.now(timezone.utc).isoformat()
             }
-            response =self.client.table('repositories').insert(insert_data).execute()
+            response = await self._execute("create_repo", self.client.table('repositories').insert(insert_data))
 
             if response.data:
                 logger.info("repository created", repo_id = response.data[0]['id'])
-                return Repo(**response.data[0])
+                repo = Repo(**response.data[0])
+                repo_cache.put(repo.id, repo, publish=True)
+                repo_count_cache["value"] = None
+                repo_stats.record_repo_created()
+                return repo
             else:
                 raise Exception("failed to create repository")
             
@@ -34,10 +92,12 @@ class SupabaseService:
             logger.error("error creating repository", error=str(e))
             raise
 
-    async def get_repoURL(self, url:str)->Optional[Repo]:
+    async def get_repoURL(self, url:str, projection: str = FULL)->Optional[Repo]:
         # get repo by url
         try:
-            response = self.client.table('repositories').select('*').eq('url',str(url)).execute()
+            response = await self._execute("get_repoURL", (
+                self.client.table('repositories').select(select_columns('repositories', projection)).eq('url',str(url))
+            ))
 
             if response.data:
                 return Repo(**response.data[0])
@@ -47,10 +107,26 @@ class SupabaseService:
             logger.error("error fetching repostiory by url" ,error=str(e))
             return None
         
-    async def get_repo(self, repo_id:int)-> Optional[Repo]:
-        # get repository bu id
+    async def get_repo(self, repo_id:int, projection: str = FULL)-> Optional[Repo]:
+        # get repository bu id, served from the metadata cache when fresh.
+        # EXISTENCE is enough for 404 checks and status gates, only id, name, url and status are real
+        found, repo = repo_cache.get(repo_id, projection)
+        if found:
+            return repo
+        try:
+            repo = await self.fetch_repo(repo_id, projection)
+        except Exception:
+            #a transient error must not turn into a cached 404
+            return None
+        repo_cache.put(repo_id, repo, projection=projection)
+        return repo
+
+    async def fetch_repo(self, repo_id:int, projection: str = FULL)-> Optional[Repo]:
         try:
-            response = self.client.table('repositories').select('*').eq('id', repo_id).execute()
+            op = "get_repo" if projection == FULL else f"get_repo:{projection}"
+            response = await self._execute(op, (
+                self.client.table('repositories').select(select_columns('repositories', projection)).eq('id', repo_id)
+            ))
             
             if response.data:
                 return Repo(**response.data[0])
@@ -58,8 +134,8 @@ class SupabaseService:
             
         except Exception as e:
             logger.error("Error fetching repository", repo_id=repo_id, error=str(e))
-            return None
-        
+            raise
+
     async def update_repoStatus(self, repo_id:int, status: RepoStatus, **kwargs)-> bool:
         try:
             update_data = {
@@ -68,28 +144,48 @@ class SupabaseService:
                 **kwargs
             }
             
-            response = self.client.table('repositories').update(update_data).eq('id', repo_id).execute()
+            response = await self._execute("update_repoStatus", self.client.table('repositories').update(update_data).eq('id', repo_id))
             
             if response.data:
                 logger.info("repository status updated", repo_id=repo_id, status=status.value)
+                repo_cache.put(repo_id, Repo(**response.data[0]), publish=True)
                 return True
+            repo_cache.invalidate(repo_id)
             return False
             
         except Exception as e:
             logger.error("error updating repository", repo_id=repo_id, error=str(e))
+            repo_cache.invalidate(repo_id)
+            return False
+    
+    async def delete_repo(self, repo_id: int) -> bool:
+        #commits and embeddings go with it through the foreign key cascade
+        repo_cache.invalidate(repo_id)
+        try:
+            response = await self._execute("delete_repo", self.client.table('repositories').delete().eq('id', repo_id))
+            if response.data:
+                repo_count_cache["value"] = None
+                repo_stats.record_repo_deleted(repo_id)
+                logger.info("repository deleted", repo_id=repo_id)
+                return True
+            return False
+
+        except Exception as e:
+            logger.error("error deleting repository", repo_id=repo_id, error=str(e))
             return False
     
-    async def list_repo(self, limit:int=None, offset:int=0)-> List[Repo]:
+    async def list_repo(self, limit:int=None, offset:int=0, projection: str = LIST_ROW)-> List[Repo]:
         try:
-            query = self.client.table("repositories").select("*")
+            query = self.client.table("repositories").select(select_columns('repositories', projection))
         
             if limit:
                 query = query.limit(limit)
             if offset:
                 query = query.offset(offset)
             
-            query = query.order('created_at', desc=True)
-            response = query.execute()
+            #same order as list_repo_page so offset and cursor pages agree
+            query = query.order('created_at', desc=True).order('id', desc=True)
+            response = await self._execute("list_repo", query)
             repositories = []
             if response.data:
                 for repo_data in response.data:
@@ -102,123 +198,226 @@ class SupabaseService:
             raise Exception(f"error fetching repositories: {str(e)}")
         
         
+    async def list_repo_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                             projection: str = LIST_ROW) -> List[Repo]:
+        #keyset page over (created_at, id) newest first; fetch limit + 1 to know if there is a next page
+        try:
+            query = self.client.table("repositories").select(select_columns('repositories', projection))
+            if after:
+                created_at, repo_id = after
+                query = query.or_(
+                    f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{int(repo_id)})'
+                )
+            query = query.order('created_at', desc=True).order('id', desc=True).limit(limit)
+            response = await self._execute("list_repo_page", query)
+            return [Repo(**repo_data) for repo_data in response.data or []]
+
+        except Exception as e:
+            logger.error("error fetching repository page", error=str(e))
+            raise Exception(f"error fetching repositories: {str(e)}")
+
+    async def count_repos(self) -> int:
+        #planner estimate, exact counts scan the whole table. cached briefly across requests
+        cached = repo_count_cache.get("value")
+        if cached is not None and time.monotonic() - repo_count_cache["at"] < settings.REPO_COUNT_CACHE_SECONDS:
+            return cached
+        try:
+            response = await self._execute(
+                "count_repos", self.client.table("repositories").select("id", count="estimated").limit(1)
+            )
+            count = response.count or 0
+        except Exception as e:
+            logger.error("error counting repositories", error=str(e))
+            return cached or 0
+        repo_count_cache.update(value=count, at=time.monotonic())
+        return count
+
+    def commit_rows(self, repo_id: int, commits: List[Union[Dict, Commit]]) -> List[Dict[str, Any]]:
+        #insert payloads for the commits table
+        commit_data = []
+        for commit in commits:
+            # Handle both dict and Commit object inputs
+            if isinstance(commit, dict):
+                commit_date = commit["commit_date"]
+                if isinstance(commit_date, datetime):
+                    commit_date = commit_date.isoformat()
+                elif isinstance(commit_date, str):
+                    # Ensure proper datetime format
+                    if commit_date.endswith('Z'):
+                        commit_date = commit_date.replace('Z', '+00:00')
+                
+                commit_data.append({
+                    "repository_id": repo_id,
+                    "sha": commit["sha"],
+                    "message": commit["message"],
+                    "author": commit["author"],
+                    "author_email": commit.get("author_email"),
+                    "commit_date": commit_date,
+                    "additions": commit.get("additions", 0),
+                    "deletions": commit.get("deletions", 0),
+                    "files_changed": commit.get("files_changed", []),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                })
+            else:
+                # Handle Commit object
+                commit_data.append({
+                    "repository_id": repo_id,
+                    "sha": commit.sha,
+                    "message": commit.message,
+                    "author": commit.author,
+                    "author_email": commit.author_email,
+                    "commit_date": commit.commit_date.isoformat(),
+                    "additions": commit.additions,
+                    "deletions": commit.deletions,
+                    "files_changed": commit.files_changed,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                })
+        return commit_data
+
+    async def _upsert_commit_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        #insert-or-skip on (repository_id, sha); only newly inserted rows come back
+        response = await self._execute("store_commits", self.client.table('commits').upsert(
+            batch, on_conflict="repository_id,sha", ignore_duplicates=True
+        ))
+        return response.data or []
+
     async def store_commits(self, repo_id: int, commits: List[Union[Dict, Commit]]) -> List[Commit]:
-        #store commit in batch
+        #idempotent bulk store, returns only the commits that were not stored before
         try:
             commit_data = []
-            for commit in commits:
-                # Handle both dict and Commit object inputs
-                if isinstance(commit, dict):
-                    commit_date = commit["commit_date"]
-                    if isinstance(commit_date, datetime):
-                        commit_date = commit_date.isoformat()
-                    elif isinstance(commit_date, str):
-                        # Ensure proper datetime format
-                        if commit_date.endswith('Z'):
-                            commit_date = commit_date.replace('Z', '+00:00')
-                    
-                    commit_data.append({
-                        "repository_id": repo_id,
-                        "sha": commit["sha"],
-                        "message": commit["message"],
-                        "author": commit["author"],
-                        "author_email": commit.get("author_email"),
-                        "commit_date": commit_date,
-                        "additions": commit.get("additions", 0),
-                        "deletions": commit.get("deletions", 0),
-                        "files_changed": commit.get("files_changed", []),
-                        "created_at": datetime.now(timezone.utc).isoformat(),
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    })
-                else:
-                    # Handle Commit object
-                    commit_data.append({
-                        "repository_id": repo_id,
-                        "sha": commit.sha,
-                        "message": commit.message,
-                        "author": commit.author,
-                        "author_email": commit.author_email,
-                        "commit_date": commit.commit_date.isoformat(),
-                        "additions": commit.additions,
-                        "deletions": commit.deletions,
-                        "files_changed": commit.files_changed,
-                        "created_at": datetime.now(timezone.utc).isoformat(),
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    })
-        
+            seen = set()
+            for row in self.commit_rows(repo_id, commits):
+                if row["sha"] not in seen:
+                    seen.add(row["sha"])
+                    commit_data.append(row)
+            batches = payload_batches(commit_data, settings.COMMIT_BATCH_MAX_BYTES, settings.COMMIT_BATCH_MAX_ROWS)
+            window = asyncio.Semaphore(settings.COMMIT_UPSERT_CONCURRENCY)
+
+            async def store_batch(batch_num: int, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                async with window:
+                    inserted = await self._upsert_commit_batch(batch)
+                logger.debug("Stored commit batch", batch_num=batch_num, rows=len(batch), inserted=len(inserted))
+                return inserted
+
+            results = await asyncio.gather(
+                *[store_batch(i + 1, batch) for i, batch in enumerate(batches)], return_exceptions=True
+            )
+
             stored_commits = []
-            batch_size = 100
-            
-            for i in range(0, len(commit_data), batch_size):
-                batch = commit_data[i:i + batch_size]
-                try:
-                    response = self.client.table('commits').insert(batch).execute()
-                
-                    if response.data:
-                        for commit_item in response.data:
-                            if isinstance(commit_item.get('commit_date'),str):
-                                commit_item['commit_date']=datetime.fromisoformat(
-                                    commit_item['commit_date'].replace('Z','+00:00')
-                                )
-                            stored_commits.append(Commit(**commit_item))
-                        logger.debug("Stored commit batch", batch_num=i//batch_size + 1, count=len(response.data))
-                
-                except Exception as batch_error:
-                    if "duplicate" in str(batch_error).lower() or "unique" in str(batch_error).lower():
-                        logger.debug("skipping duplicate commits")
-                        continue
-                    else:
-                        raise batch_error
-                
+            for result in results:
+                if isinstance(result, Exception):
+                    continue
+                for commit_item in result:
+                    if isinstance(commit_item.get('commit_date'),str):
+                        commit_item['commit_date']=datetime.fromisoformat(
+                            commit_item['commit_date'].replace('Z','+00:00')
+                        )
+                    stored_commits.append(Commit(**commit_item))
+            repo_stats.record_commits(repo_id, stored_commits)
 
-            logger.info("Commits stored successfully", repo_id=repo_id, total=len(stored_commits))
+            #batches that made it stay stored, a retry only re-sends what is missing
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                raise errors[0]
+
+            logger.info("Commits stored successfully", repo_id=repo_id, total=len(commit_data),
+                        inserted=len(stored_commits), batches=len(batches))
             return stored_commits
             
         except Exception as e:
             logger.error("Error storing commits", repo_id=repo_id, error=str(e))
             raise
 
-    async def get_commits(self, repo_id: int, limit: int = 100, offset: int = 0) -> List[Commit]:
+    async def get_commits(self, repo_id: int, limit: int = 100, offset: int = 0,
+                          projection: str = COMMIT_CARD) -> List[Commit]:
         #get commit with pagination
         try:
-            response = (
+            response = await self._execute("get_commits", (
                 self.client.table('commits')
-                .select('*')
+                .select(select_columns('commits', projection))
                 .eq('repository_id', repo_id)
                 .order('commit_date', desc=True)
                 .range(offset, offset + limit - 1)
-                .execute()
-            )
-            commits=[]
-            for commit_data in response.data:
-                if isinstance(commit_data.get('commit_date'),str):
-                    commit_data['commit_date']=datetime.fromisoformat(commit_data['commit_date'].replace('Z','+00:00'))
-                commits.append(Commit(**commit_data))
-
-            return commits
+            ))
+            return [commit_from_row(commit_data, projection) for commit_data in response.data]
             
         except Exception as e:
             logger.error("Error fetching commits", repo_id=repo_id, error=str(e))
             return []
         
-    async def get_commit_by_sha(self, repo_id: int, sha: str) -> Optional[Commit]:
+    async def get_commit_page(self, repo_id: int, after_id: int = 0, limit: int = 1000,
+                              projection: str = COMMIT_CARD) -> List[Commit]:
+        #keyset page by id for full scans, stable under ties and concurrent inserts unlike offset paging
+        response = await self._execute("get_commit_page", (
+            self.client.table('commits')
+            .select(select_columns('commits', projection))
+            .eq('repository_id', repo_id)
+            .gt('id', after_id)
+            .order('id')
+            .limit(limit)
+        ))
+        return [commit_from_row(commit_data, projection) for commit_data in response.data]
+
+    async def get_commits_since(self, repo_id: int, since: datetime, page_size: int = 1000,
+                                max_commits: Optional[int] = None, projection: str = COMMIT_CARD) -> List[Commit]:
+        #commits on or after `since`, oldest first, fetched page by page newest first so a
+        #capped fetch keeps the most recent `max_commits`
+        commits: List[Commit] = []
+        try:
+            offset = 0
+            while max_commits is None or len(commits) < max_commits:
+                response = await self._execute("get_commits_since", (
+                    self.client.table('commits')
+                    .select(select_columns('commits', projection))
+                    .eq('repository_id', repo_id)
+                    .gte('commit_date', since.isoformat())
+                    .order('commit_date', desc=True)
+                    .order('id', desc=True)
+                    .range(offset, offset + page_size - 1)
+                ))
+                commits.extend(commit_from_row(commit_data, projection) for commit_data in response.data)
+                if len(response.data) < page_size:
+                    break
+                offset += page_size
+
+            commits = commits[:max_commits] if max_commits else commits
+            return commits[::-1]
+
+        except Exception as e:
+            logger.error("Error fetching commits since", repo_id=repo_id, since=since.isoformat(), error=str(e))
+            return commits[::-1]
+
+    async def get_commit_stat_rows(self, repo_id: int, page_size: int = 1000) -> List[Dict[str, Any]]:
+        #just the columns statistics are computed from, for (re)building counters
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            response = await self._execute("get_commit_stat_rows", (
+                self.client.table('commits')
+                .select('commit_date, additions, deletions, embedding_id')
+                .eq('repository_id', repo_id)
+                .order('id')
+                .range(offset, offset + page_size - 1)
+            ))
+            rows.extend(response.data or [])
+            if len(response.data or []) < page_size:
+                return rows
+            offset += page_size
+
+    async def get_commit_by_sha(self, repo_id: int, sha: str, projection: str = FULL) -> Optional[Commit]:
         #get commit by sha
         try:
-            response = (
+            response = await self._execute("get_commit_by_sha", (
                 self.client.table('commits')
-                .select('*')
+                .select(select_columns('commits', projection))
                 .eq('repository_id', repo_id)
                 .eq('sha', sha)
-                .execute()
-            )
+            ))
             
             if response.data:
-                commit_data=response.data[0]
-                if isinstance(commit_data.get('commit_date'),str):
-                              commit_data['commit_date'] = datetime.fromisoformat(
-                    commit_data['commit_date'].replace('Z', '+00:00')
-                )
-                return Commit(**response.data[0])
+                return commit_from_row(response.data[0], projection)
             return None
             
         except Exception as e:
@@ -237,7 +436,7 @@ class SupabaseService:
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
             
-            response = self.client.table('embeddings').insert(embedding_data).execute()
+            response = await self._execute("store_embedding", self.client.table('embeddings').insert(embedding_data))
             
             if response.data:
                 logger.debug("embedding stored", commit_id=embedding.commit_id)
@@ -249,12 +448,55 @@ class SupabaseService:
             logger.error("Error storing embedding", commit_id=embedding.commit_id, error=str(e))
             raise
     
+    async def store_embeddings(self, repo_id: int, commit_ids: List[int], vectors: np.ndarray, model_name: str,
+                               text_contents: List[str], embedding_type: str = "commit_message") -> int:
+        #bulk store for restores, rows go straight from the matrix without building Embeddings models
+        created_at = datetime.now(timezone.utc).isoformat()
+        rows = [{
+            "commit_id": int(commit_id),
+            "embedding_vector": vector.tolist(),
+            "model_name": model_name,
+            "text_content": text_content,
+            "embedding_type": embedding_type,
+            "created_at": created_at
+        } for commit_id, vector, text_content in zip(commit_ids, vectors, text_contents)]
+        window = asyncio.Semaphore(settings.COMMIT_UPSERT_CONCURRENCY)
+
+        async def store_batch(batch: List[Dict[str, Any]]):
+            async with window:
+                await self._execute("store_embeddings", self.client.table('embeddings').upsert(
+                    batch, on_conflict="commit_id", returning=ReturnMethod.minimal
+                ))
+
+        await asyncio.gather(*[store_batch(batch) for batch in payload_batches(
+            rows, settings.COMMIT_BATCH_MAX_BYTES, settings.COMMIT_BATCH_MAX_ROWS
+        )])
+        logger.info("embeddings stored", repo_id=repo_id, count=len(rows))
+        return len(rows)
+
+    def load_vector_index(self, repo_id: int, commit_ids: List[int], vectors: np.ndarray) -> bool:
+        #similarity search runs in postgres here, nothing to preload
+        return False
+
+    async def delete_embedding(self, commit_id: int) -> bool:
+        try:
+            response = await self._execute("delete_embedding", self.client.table('embeddings').delete().eq('commit_id', commit_id))
+            await self._execute("delete_embedding", self.client.table('commits').update({
+                "embedding_id": None,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }).eq('id', commit_id))
+            return bool(response.data)
+
+        except Exception as e:
+            logger.error("Error deleting embedding", commit_id=commit_id, error=str(e))
+            return False
+
     async def update_commit_embedding(self, commit_id: int, embedding_id: int) -> bool:
         try:
-            response = self.client.table('commits').update({
+            response = await self._execute("update_commit_embedding", self.client.table('commits').update({
                 "embedding_id": embedding_id,
                 "updated_at": datetime.now(timezone.utc).isoformat()
-            }).eq('id', commit_id).execute()
+            }).eq('id', commit_id))
             
             if response.data:
                 logger.debug("Commit updated with embedding", commit_id=commit_id, embedding_id=embedding_id)
@@ -270,12 +512,12 @@ class SupabaseService:
         #search for similar commits using vector 
         try:
             #supabase vector search function
-            response = self.client.rpc('search_similar_commits', {
+            response = await self._execute("search_similarCommits", self.client.rpc('search_similar_commits', {
                 'query_embedding': query_embedding,
                 'repo_id': repo_id,
                 'match_threshold': threshold,
                 'match_count': limit
-            }).execute()
+            }))
             
             return response.data if response.data else []
             
@@ -284,26 +526,129 @@ class SupabaseService:
             return []
     
         
+    async def get_commit_embeddings(self, commit_ids: List[int]) -> Dict[int, List[float]]:
+        #embedding vectors keyed by commit id
+        if not commit_ids:
+            return {}
+        try:
+            response = await self._execute("get_commit_embeddings", (
+                self.client.table('embeddings')
+                .select('commit_id, embedding_vector')
+                .in_('commit_id', commit_ids)
+            ))
+            vectors = {}
+            for row in response.data or []:
+                vector = row['embedding_vector']
+                #pgvector columns come back as "[0.1,0.2,...]" strings
+                if isinstance(vector, str):
+                    vector = json.loads(vector)
+                vectors[row['commit_id']] = vector
+            return vectors
+
+        except Exception as e:
+            logger.error("Error fetching commit embeddings", count=len(commit_ids), error=str(e))
+            return {}
+
+    #analysis history
+    async def store_analyses(self, rows: List[Dict[str, Any]]) -> int:
+        #one insert for a whole write-behind batch
+        if not rows:
+            return 0
+        await self._execute("store_analyses", self.client.table('analyses').insert(rows, returning=ReturnMethod.minimal))
+        return len(rows)
+
+    async def get_analyses(self, repo_id: int, limit: int, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        #keyset page by id, newest first
+        try:
+            query = (
+                self.client.table('analyses')
+                .select('id, question, answer, confidence_score, processing_time, relevant_commit_count, created_at')
+                .eq('repository_id', repo_id)
+            )
+            if before_id is not None:
+                query = query.lt('id', before_id)
+            response = await self._execute("get_analyses", query.order('id', desc=True).limit(limit))
+            return response.data or []
+
+        except Exception as e:
+            logger.error("error fetching analysis history", repo_id=repo_id, error=str(e))
+            raise
+
+    async def count_analyses(self, repo_id: int) -> int:
+        try:
+            response = await self._execute("count_analyses", (
+                self.client.table('analyses').select('id', count='exact').eq('repository_id', repo_id).limit(1)
+            ))
+            return response.count or 0
+        except Exception as e:
+            logger.error("error counting analyses", repo_id=repo_id, error=str(e))
+            return 0
+
+    #leases, rows of a `leases` table (key text primary key, holder, operation, acquired_at, expires_at timestamptz)
+    async def acquire_lease(self, key: str, holder: str, operation: str,
+                            ttl_seconds: float) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(acquired, current lease); taken when free, expired or already ours"""
+        now = datetime.now(timezone.utc)
+        lease = {
+            "key": key,
+            "holder": holder,
+            "operation": operation,
+            "acquired_at": now.isoformat(),
+            "expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat()
+        }
+        try:
+            response = await self._execute("acquire_lease", self.client.table('leases').insert(lease))
+            return True, response.data[0]
+        except APIError as e:
+            #23505: someone has a row for this key
+            if e.code != "23505":
+                raise
+        #a single conditional UPDATE, so two workers can't both take over an expired lease
+        response = await self._execute("acquire_lease", (
+            self.client.table('leases').update(lease).eq('key', key)
+            .or_(f'expires_at.lt."{now.isoformat()}",holder.eq."{holder}"')
+        ))
+        if response.data:
+            return True, response.data[0]
+        return False, await self.get_lease(key)
+
+    async def renew_lease(self, key: str, holder: str, ttl_seconds: float) -> bool:
+        expires_at = (datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)).isoformat()
+        response = await self._execute("renew_lease", (
+            self.client.table('leases').update({"expires_at": expires_at}).eq('key', key).eq('holder', holder)
+        ))
+        return bool(response.data)
+
+    async def release_lease(self, key: str, holder: str) -> bool:
+        response = await self._execute("release_lease", (
+            self.client.table('leases').delete().eq('key', key).eq('holder', holder)
+        ))
+        return bool(response.data)
+
+    async def get_lease(self, key: str) -> Optional[Dict[str, Any]]:
+        response = await self._execute("get_lease", (
+            self.client.table('leases').select('*').eq('key', key)
+            .gte('expires_at', datetime.now(timezone.utc).isoformat()).limit(1)
+        ))
+        return response.data[0] if response.data else None
+
     async def get_repository_stats(self, repo_id: int) -> Dict[str, Any]:
         #get repository statistics
         try:
             #commit count
-            commits_response = (
+            commits_response = await self._execute("get_repository_stats", (
                 self.client.table('commits')
                 .select('id', count='exact')
                 .eq('repository_id', repo_id)
-                .execute()
-            )
+            ))
             
             # embedding count
-            commits_with_embeddings = (
+            commits_with_embeddings = await self._execute("get_repository_stats", (
                 self.client.table('commits')
                 .select('embedding_id',count='exact')
                 .eq('repository_id',repo_id)
                 .not_.is_('embedding_id','null')
-                .execute()
-
-            )
+            ))
            
             total_commits = commits_response.count or 0
             total_embeddings = commits_with_embeddings.count or 0
@@ -323,9 +668,9 @@ class SupabaseService:
     
     async def get_global(self)-> Dict[str, Any]:
         try:
-            repos_response=self.client.table('repositories').select('id', count='exact').execute()
-            commits_response=self.client.table('commits').select('id', count='exact').execute()
-            embeddings_response=self.client.table('embeddings').select('id',count='exact').execute()
+            repos_response= await self._execute("get_global", self.client.table('repositories').select('id', count='exact'))
+            commits_response= await self._execute("get_global", self.client.table('commits').select('id', count='exact'))
+            embeddings_response= await self._execute("get_global", self.client.table('embeddings').select('id',count='exact'))
 
             return{
                 "total_repositories": repos_response.count or 0,
@@ -0,0 +1,99 @@
+"""bytes read from storage per endpoint call, with and without column projections.
+
+runs the app in-process against the fake backends, so no Supabase/GitHub/Gemini is
+needed. storage bytes come from the data layer metrics (json size of every response
+body), response bytes are what the endpoint sends to the client.
+
+    cd backend && python -m benchmarks.projection_bytes --repos 5 --commits 500
+    cd backend && python -m benchmarks.projection_bytes --baseline   #every read as select('*')
+"""
+import argparse
+import asyncio
+import json
+import os
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repos", type=int, default=5)
+    parser.add_argument("--commits", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=20, help="calls per endpoint")
+    parser.add_argument("--baseline", action="store_true", help="select every column on every read")
+    parser.add_argument("--output", help="write the json report here instead of stdout (logs go to stdout)")
+    return parser.parse_args()
+
+async def run(args):
+    import httpx
+    from app.core import projections
+    from app.core.metrics import db_metrics
+    from app.services.repo_cache import repo_cache
+    from app.main import app
+
+    if args.baseline:
+        for profiles in projections.PROJECTIONS.values():
+            for name in profiles:
+                profiles[name] = "*"
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            repo_ids = []
+            for i in range(args.repos):
+                response = await client.post("/api/repositories/", json={
+                    "url": f"https://github.com/bench/repo{i}", "max_commits": args.commits
+                })
+                repo_ids.append(response.json()["id"])
+            #wait for ingestion to finish
+            for repo_id in repo_ids:
+                while (await client.get(f"/api/repositories/{repo_id}")).json()["status"] not in ("completed", "error"):
+                    await asyncio.sleep(0.1)
+
+            repo_id = repo_ids[0]
+            endpoints = [
+                ("repository detail", f"/api/repositories/{repo_id}"),
+                ("repository list", "/api/repositories/?per_page=50"),
+                ("repository stats", f"/api/repositories/{repo_id}/stats"),
+                ("commit page", f"/api/repositories/{repo_id}/commits?per_page=100"),
+                ("summary", f"/api/analysis/repository/{repo_id}/summary?days=3650"),
+            ]
+            for name, path in endpoints:
+                db_metrics._ops.clear()
+                response_bytes = 0
+                for _ in range(args.calls):
+                    #cold metadata cache so every call reads from storage
+                    repo_cache._entries.clear()
+                    response = await client.get(path)
+                    response_bytes += len(response.content)
+                ops = db_metrics.stats()["operations"]
+                storage_bytes = sum(op["bytes"] for op in ops.values())
+                results.append({
+                    "endpoint": name,
+                    "storage_bytes_per_call": round(storage_bytes / args.calls),
+                    "response_bytes_per_call": round(response_bytes / args.calls),
+                    "storage_ops": {op: stats["avg_bytes"] for op, stats in ops.items()}
+                })
+
+    report = json.dumps({"baseline": args.baseline, "repos": args.repos, "commits": args.commits,
+                         "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+def main():
+    args = parse_args()
+    for backend in ("LLM_BACKEND", "EMBEDDING_BACKEND", "GITHUB_BACKEND", "STORAGE_BACKEND"):
+        os.environ.setdefault(backend, "fake")
+    os.environ.setdefault("FAKE_COMMITS_PER_REPO", str(args.commits))
+    #background summaries would read commits in the middle of a measurement
+    os.environ.setdefault("SPECULATIVE_ENABLED", "false")
+    os.environ.setdefault("FAKE_STORAGE_LATENCY_MS", "0")
+    os.environ.setdefault("FAKE_GITHUB_LATENCY_MS", "0")
+    os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+    #storage bytes come from the data layer metrics, off by default outside benchmarks
+    os.environ.setdefault("DB_METRICS_BYTES", "true")
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""throughput of the storage backends without the HTTP layer.
+
+stores commits, embeds them with random vectors and runs similarity searches
+straight through the storage service, so the numbers are the data layer alone.
+defaults to the embedded SQLite backend in a temp directory.
+
+    cd backend && python -m benchmarks.storage_throughput --commits 20000
+    cd backend && python -m benchmarks.storage_throughput --backend fake
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "fake"])
+    parser.add_argument("--commits", type=int, default=10000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--output", help="write the json report here instead of stdout")
+    return parser.parse_args()
+
+async def run(args):
+    import numpy as np
+    from app.core.metrics import percentile
+    from app.models.embedding import Embeddings
+    from app.services.backends import create_storage_service
+
+    rng = np.random.default_rng(0)
+    storage = create_storage_service()
+    repo = await storage.create_repo({"name": "bench", "url": f"https://github.com/bench/repo-{time.time_ns()}",
+                                      "owner": "bench", "status": "pending"})
+    commits = [{
+        "sha": f"{i:040x}",
+        "message": f"commit {i} " + "x" * int(rng.integers(20, 400)),
+        "author": "bench",
+        "commit_date": f"2026-01-01T00:00:{i % 60:02d}+00:00",
+        "additions": int(rng.integers(0, 500)),
+        "deletions": int(rng.integers(0, 500)),
+        "files_changed": [f"src/file_{i % 97}.py"]
+    } for i in range(args.commits)]
+
+    report = {"backend": args.backend, "commits": args.commits}
+    start = time.perf_counter()
+    stored = await storage.store_commits(repo.id, commits)
+    elapsed = time.perf_counter() - start
+    report["store_commits_per_s"] = round(len(stored) / elapsed)
+
+    start = time.perf_counter()
+    for commit in stored:
+        await storage.store_embedding(Embeddings(
+            commit_id=commit.id, embedding_vector=rng.standard_normal(args.dimension).tolist(),
+            model_name="bench", text_content=commit.message
+        ))
+    report["store_embedding_per_s"] = round(len(stored) / (time.perf_counter() - start))
+
+    latencies = []
+    for _ in range(args.searches):
+        query = rng.standard_normal(args.dimension).tolist()
+        start = time.perf_counter()
+        await storage.search_similarCommits(query, repo.id, limit=10, threshold=-1.0)
+        latencies.append((time.perf_counter() - start) * 1000)
+    report["search_p50_ms"] = round(percentile(latencies, 0.5), 2)
+    report["search_p95_ms"] = round(percentile(latencies, 0.95), 2)
+
+    start = time.perf_counter()
+    pages = 0
+    for offset in range(0, len(stored), 100):
+        await storage.get_commits(repo.id, limit=100, offset=offset)
+        pages += 1
+    report["commit_pages_per_s"] = round(pages / (time.perf_counter() - start))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("STORAGE_BACKEND", args.backend)
+    os.environ.setdefault("FAKE_STORAGE_LATENCY_MS", "0")
+    os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()